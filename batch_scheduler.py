@@ -0,0 +1,130 @@
+import logging
+import numpy as np
+from instrumentation import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class PaddingStats:
+    """Running count of real versus padded token slots across encoded batches."""
+
+    def __init__(self):
+        self.batches = 0
+        self.texts = 0
+        self.real_tokens = 0
+        self.padded_tokens = 0
+
+    def add(self, lengths) -> None:
+        self.batches += 1
+        self.texts += len(lengths)
+        self.real_tokens += int(np.sum(lengths))
+        self.padded_tokens += int(np.max(lengths)) * len(lengths)
+
+    @property
+    def efficiency(self) -> float:
+        """Share of computed token positions that hold real tokens (1.0 = no padding)."""
+        return self.real_tokens / self.padded_tokens if self.padded_tokens else 1.0
+
+    def to_dict(self) -> dict:
+        return {
+            'batches': self.batches,
+            'texts': self.texts,
+            'real_tokens': self.real_tokens,
+            'padded_tokens': self.padded_tokens,
+            'padding_efficiency': self.efficiency
+        }
+
+
+class TokenBudgetScheduler:
+    """
+    Group texts of similar token length into batches sized by a token budget.
+
+    Every text is tokenized once. Texts are sorted by length and packed so
+    that (longest length in batch) x (batch size) stays within token_budget,
+    which keeps padding low: short abstracts travel in large batches and long
+    ones in small batches. Results are returned in the original input order.
+    """
+
+    def __init__(self, tokenizer, token_budget: int = 16384, max_length: int = 256, max_batch_size: int = 512):
+        """
+        Args:
+            tokenizer: Hugging Face tokenizer of the model (SentenceTransformer.tokenizer)
+            token_budget (int): Maximum padded tokens per batch
+            max_length (int): Truncation length, normally the model's max_seq_length
+            max_batch_size (int): Upper bound on texts per batch regardless of length
+        """
+        self.tokenizer = tokenizer
+        self.token_budget = token_budget
+        self.max_length = max_length
+        self.max_batch_size = max_batch_size
+        self.stats = PaddingStats()
+
+    def tokenize(self, texts: list) -> list:
+        """Tokenize every text once, truncated to max_length; returns one encoding dict per text."""
+        with metrics.timer('tokenize'):
+            encoded = self.tokenizer(texts, truncation=True, max_length=self.max_length)
+        keys = list(encoded.keys())
+        return [{key: encoded[key][i] for key in keys} for i in range(len(texts))]
+
+    def plan(self, lengths) -> list:
+        """
+        Split positions into batches by token budget.
+
+        Args:
+            lengths (array-like): Token length of each text
+
+        Returns:
+            list: Arrays of original positions, one per batch, longest texts first
+        """
+        lengths = np.asarray(lengths)
+        order = np.argsort(-lengths, kind='stable')
+        batches = []
+        start = 0
+        while start < len(order):
+            # Sorted descending, so the first text of a batch sets its padded length
+            longest = max(int(lengths[order[start]]), 1)
+            size = max(1, min(self.token_budget // longest, self.max_batch_size))
+            batches.append(order[start:start + size])
+            start += size
+        return batches
+
+    def encode(self, model, texts: list) -> np.ndarray:
+        """
+        Encode texts with model in length-bucketed batches.
+
+        Args:
+            model: SentenceTransformer (or any object with an encode method)
+            texts (list): Texts to encode
+
+        Returns:
+            np.ndarray: float32 embeddings in the same order as texts
+        """
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        encodings = self.tokenize(texts)
+        lengths = np.array([len(encoding['input_ids']) for encoding in encodings])
+        result = None
+        for batch in self.plan(lengths):
+            self.stats.add(lengths[batch])
+            metrics.inc('real_tokens', int(lengths[batch].sum()))
+            metrics.inc('padded_tokens', int(lengths[batch].max()) * len(batch))
+            with metrics.timer('model_forward'):
+                embeddings = self._encode_batch(model, [texts[i] for i in batch], [encodings[i] for i in batch])
+            if result is None:
+                result = np.empty((len(texts), embeddings.shape[1]), dtype=np.float32)
+            result[batch] = embeddings
+        return result
+
+    def _encode_batch(self, model, texts: list, encodings: list) -> np.ndarray:
+        if not hasattr(model, 'forward'):
+            return np.asarray(model.encode(texts, batch_size=len(texts), convert_to_numpy=True), dtype=np.float32)
+
+        # Reuse the encodings from tokenize() instead of letting the model tokenize again
+        import torch
+        features = self.tokenizer.pad(encodings, padding='longest', return_tensors='pt')
+        device = getattr(model, 'device', 'cpu')
+        features = {key: value.to(device) for key, value in features.items()}
+        model.eval()
+        with torch.no_grad():
+            output = model(features)
+        return output['sentence_embedding'].float().cpu().numpy()
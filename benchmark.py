@@ -0,0 +1,333 @@
+import argparse
+import hashlib
+import json
+import os
+import platform
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+import logging
+import numpy as np
+from instrumentation import metrics
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+DEFAULT_SIZES = [500, 5000, 20000]
+DEFAULT_HISTORY = 'benchmark_history.json'
+PLOT_SCRIPT = Path(__file__).resolve().parent / 'generate_paper_plots.py'
+
+# A stage is only flagged when it is both relatively and absolutely slower than the baseline
+DEFAULT_THRESHOLD = 0.10
+MIN_DELTA_S = 0.005
+
+WORD = re.compile(r'\w+')
+
+class HashingEncoder:
+    """
+    Deterministic stand-in for a SentenceTransformer when model weights are unavailable.
+
+    Every lower-cased word is hashed into one of dim signed buckets, so texts
+    that share vocabulary get similar vectors and every run yields identical
+    embeddings. It does not cost what a transformer costs; it exercises
+    everything around the model (batching, caching, scoring, I/O).
+    """
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+        self.max_seq_length = 256
+        self._buckets = {}
+
+    def _bucket(self, word: str) -> tuple:
+        bucket = self._buckets.get(word)
+        if bucket is None:
+            digest = int.from_bytes(hashlib.blake2b(word.encode('utf-8'), digest_size=8).digest(), 'little')
+            bucket = self._buckets[word] = (digest % self.dim, 1.0 if (digest >> 32) & 1 else -1.0)
+        return bucket
+
+    def encode(self, sentences, batch_size: int = 32, convert_to_numpy: bool = True, **kwargs) -> np.ndarray:
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        embeddings = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in WORD.findall(str(text).lower()):
+                column, sign = self._bucket(word)
+                embeddings[row, column] += sign
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        embeddings /= np.maximum(norms, 1e-12)
+        return embeddings[0] if single else embeddings
+
+def load_encoder(model_name: str, encoder: str = 'auto') -> tuple:
+    """
+    Pick the encoder for the classification stages.
+
+    Args:
+        model_name (str): Sentence-transformer model to load
+        encoder (str): 'model' (fail if the weights are missing), 'stub', or
+            'auto' (the model if its weights are available locally, else the stub)
+
+    Returns:
+        tuple: (encoder object, name recorded in the results)
+    """
+    if encoder == 'stub':
+        return HashingEncoder(), 'stub'
+    if encoder == 'auto':
+        # Never download during a benchmark; missing weights mean the stub
+        os.environ.setdefault('HF_HUB_OFFLINE', '1')
+    try:
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(model_name), model_name
+    except Exception as e:
+        if encoder == 'model':
+            raise
+        logger.warning(f"Could not load {model_name} ({str(e)}); using the hashing stub encoder")
+        return HashingEncoder(), 'stub'
+
+def _time(fn, repeat: int) -> dict:
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - start)
+    return {'min_s': min(runs), 'median_s': float(np.median(runs)), 'runs': runs}
+
+def _git_commit() -> str:
+    try:
+        result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=PLOT_SCRIPT.parent,
+                                capture_output=True, text=True, check=True)
+        return result.stdout.strip()
+    except Exception:
+        return None
+
+def _run_plot_script(workdir: Path, cold: bool = True) -> None:
+    if cold:
+        # Drop the incremental build cache so every figure is rendered
+        shutil.rmtree(workdir / '.figure_cache', ignore_errors=True)
+    env = dict(os.environ, MPLBACKEND='Agg')
+    subprocess.run([sys.executable, str(PLOT_SCRIPT)], cwd=workdir, env=env, check=True, capture_output=True)
+
+def run_benchmarks(
+    sizes: list = DEFAULT_SIZES,
+    repeat: int = 3,
+    seed: int = 42,
+    encoder: str = 'auto',
+    model_name: str = 'all-MiniLM-L6-v2',
+    single_limit: int = 200,
+    batch_size: int = 64,
+    plots: bool = True,
+    workdir: str = None,
+    label: str = None
+) -> dict:
+    """
+    Time every pipeline stage at several corpus sizes.
+
+    Each size gets its own working directory holding the generated JSON, the
+    converted CSV and the plot outputs, so stages run exactly as they do from
+    the command line. Data generation is seeded and the stub encoder is
+    deterministic, so repeated runs do identical work.
+
+    Args:
+        sizes (list): Corpus sizes (number of papers) to benchmark
+        repeat (int): Timed runs per stage; min and median are recorded
+        seed (int): Seed for synthetic data generation
+        encoder (str): 'auto', 'model' or 'stub' (see load_encoder)
+        model_name (str): Sentence-transformer model for the 'model'/'auto' encoder
+        single_limit (int): Number of abstracts classified one at a time
+        batch_size (int): Batch size for batched classification
+        plots (bool): Also time generate_paper_plots.py
+        workdir (str, optional): Directory for the generated files (default: a temporary directory)
+        label (str, optional): Free-form note stored with the run
+
+    Returns:
+        dict: History record with environment details and per-stage timings,
+            keyed as results[stage][str(size)]
+    """
+    from create_synthetic_dataset import generate_synthetic_dataset
+    from json_to_csv_converter import convert_json_to_csv
+    from few_shot_classifier import DEFAULT_CATEGORIES, FewShotClassifier, load_data
+
+    model, encoder_name = load_encoder(model_name, encoder)
+    record = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'commit': _git_commit(),
+        'label': label,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'encoder': encoder_name,
+        'seed': seed,
+        'repeat': repeat,
+        'results': {}
+    }
+
+    def add(stage, size, timing):
+        record['results'].setdefault(stage, {})[str(size)] = timing
+        logger.info(f"{stage:>16} n={size:<7} median={timing['median_s']:.4f}s min={timing['min_s']:.4f}s")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(workdir or tmp)
+        for size in sizes:
+            size_dir = root / f"n{size}"
+            size_dir.mkdir(parents=True, exist_ok=True)
+            json_path = size_dir / 'synthetic_covid19_papers.json'
+            csv_path = size_dir / 'synthetic_covid19_papers.csv'
+
+            add('generate', size, _time(lambda: generate_synthetic_dataset(str(json_path), size, seed), repeat))
+            add('convert', size, _time(lambda: convert_json_to_csv(str(json_path), str(csv_path), workers=1),
+                                       repeat))
+            add('load_data', size, _time(lambda: load_data(str(csv_path)), repeat))
+
+            # A fresh classifier per run, since prepare_categories skips categories it already has
+            add('prepare', size, _time(
+                lambda: FewShotClassifier(model_name, model=model).prepare_categories(DEFAULT_CATEGORIES), repeat
+            ))
+            classifier = FewShotClassifier(model_name, model=model)
+            classifier.prepare_categories(DEFAULT_CATEGORIES)
+
+            abstracts = load_data(str(csv_path))['abstract'].fillna('').tolist()
+            single = abstracts[:single_limit]
+            timing = _time(lambda: [classifier.classify(text) for text in single], repeat)
+            timing['items'] = len(single)
+            add('classify_single', size, timing)
+            timing = _time(lambda: classifier.classify_batch(abstracts, batch_size=batch_size), repeat)
+            timing['items'] = len(abstracts)
+            # One extra instrumented run shows which step inside classification moved
+            metrics.reset()
+            metrics.enable()
+            classifier.classify_batch(abstracts, batch_size=batch_size)
+            timing['breakdown'] = metrics.summary()
+            metrics.disable()
+            add('classify_batch', size, timing)
+
+            if plots:
+                add('plots', size, _time(lambda: _run_plot_script(size_dir), repeat))
+                add('plots_cached', size, _time(lambda: _run_plot_script(size_dir, cold=False), repeat))
+    return record
+
+def load_history(history_file: str) -> list:
+    if not os.path.exists(history_file):
+        return []
+    with open(history_file, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def append_history(history_file: str, record: dict) -> int:
+    """Append a run to the JSON history file (written atomically); returns its index."""
+    history = load_history(history_file)
+    history.append(record)
+    tmp_path = f"{history_file}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(history, f, indent=2)
+    os.replace(tmp_path, history_file)
+    return len(history) - 1
+
+def compare_runs(baseline: dict, candidate: dict, threshold: float = DEFAULT_THRESHOLD,
+                 min_delta: float = MIN_DELTA_S) -> list:
+    """
+    Compare two history records by their fastest run per stage.
+
+    The minimum over repeats is used because it is the timing least affected by
+    other load on the machine.
+
+    Args:
+        baseline (dict): Earlier run
+        candidate (dict): Run to check
+        threshold (float): Relative slowdown (0.10 = 10%) that counts as a regression
+        min_delta (float): Absolute slowdown in seconds below which differences are noise
+
+    Returns:
+        list: One dict per (stage, size) with baseline/candidate times, ratio and
+            status ('regression', 'improvement', 'ok', 'new' or 'missing')
+    """
+    rows = []
+    stages = list(candidate['results']) + [s for s in baseline['results'] if s not in candidate['results']]
+    for stage in stages:
+        base_sizes = baseline['results'].get(stage, {})
+        cand_sizes = candidate['results'].get(stage, {})
+        for size in sorted(set(base_sizes) | set(cand_sizes), key=int):
+            base = base_sizes.get(size, {}).get('min_s')
+            cand = cand_sizes.get(size, {}).get('min_s')
+            row = {'stage': stage, 'size': int(size), 'baseline_s': base, 'candidate_s': cand, 'ratio': None}
+            if base is None:
+                row['status'] = 'new'
+            elif cand is None:
+                row['status'] = 'missing'
+            else:
+                row['ratio'] = cand / base if base else float('inf')
+                if cand - base > min_delta and cand > base * (1 + threshold):
+                    row['status'] = 'regression'
+                elif base - cand > min_delta and cand < base * (1 - threshold):
+                    row['status'] = 'improvement'
+                else:
+                    row['status'] = 'ok'
+            rows.append(row)
+    return rows
+
+def _describe(record: dict, index: int) -> str:
+    return f"#{index} {record['timestamp']} commit={record.get('commit')} encoder={record['encoder']}"
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark suite for the COVID-19 paper pipeline")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help="Time every stage and append the results to the history")
+    run_parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    run_parser.add_argument('--repeat', type=int, default=3)
+    run_parser.add_argument('--seed', type=int, default=42)
+    run_parser.add_argument('--encoder', choices=['auto', 'model', 'stub'], default='auto')
+    run_parser.add_argument('--model', default='all-MiniLM-L6-v2')
+    run_parser.add_argument('--single-limit', type=int, default=200)
+    run_parser.add_argument('--no-plots', action='store_true', help="Skip timing generate_paper_plots.py")
+    run_parser.add_argument('--workdir', help="Keep generated files here instead of a temporary directory")
+    run_parser.add_argument('--label', help="Note stored with the run, e.g. the change being measured")
+    run_parser.add_argument('--history', default=DEFAULT_HISTORY)
+
+    compare_parser = subparsers.add_parser('compare', help="Flag regressions between two runs in the history")
+    compare_parser.add_argument('--history', default=DEFAULT_HISTORY)
+    compare_parser.add_argument('--baseline', type=int, default=-2, help="History index of the baseline run")
+    compare_parser.add_argument('--candidate', type=int, default=-1, help="History index of the run to check")
+    compare_parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        record = run_benchmarks(args.sizes, args.repeat, args.seed, args.encoder, args.model,
+                                args.single_limit, plots=not args.no_plots, workdir=args.workdir,
+                                label=args.label)
+        index = append_history(args.history, record)
+        logger.info(f"Saved run #{index} to {args.history}")
+        return
+
+    history = load_history(args.history)
+    if len(history) < 2:
+        logger.error(f"Need at least two runs in {args.history} to compare")
+        sys.exit(2)
+    baseline_index = args.baseline % len(history)
+    candidate_index = args.candidate % len(history)
+    baseline, candidate = history[baseline_index], history[candidate_index]
+    logger.info(f"Baseline:  {_describe(baseline, baseline_index)}")
+    logger.info(f"Candidate: {_describe(candidate, candidate_index)}")
+    if baseline['encoder'] != candidate['encoder']:
+        logger.warning("Runs used different encoders; classification timings are not comparable")
+
+    rows = compare_runs(baseline, candidate, args.threshold)
+    for row in rows:
+        base = f"{row['baseline_s']:.4f}s" if row['baseline_s'] is not None else '-'
+        cand = f"{row['candidate_s']:.4f}s" if row['candidate_s'] is not None else '-'
+        ratio = f"{row['ratio']:.2f}x" if row['ratio'] is not None else ''
+        logger.info(f"{row['stage']:>16} n={row['size']:<7} {base:>10} -> {cand:>10} {ratio:>7}  {row['status']}")
+    regressions = [row for row in rows if row['status'] == 'regression']
+    if regressions:
+        logger.error(f"{len(regressions)} regression(s) above {args.threshold:.0%}")
+        sys.exit(1)
+    logger.info("No regressions")
+
+if __name__ == "__main__":
+    main()
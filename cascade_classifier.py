@@ -0,0 +1,347 @@
+import argparse
+import json
+import time
+import logging
+import numpy as np
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import make_pipeline
+from instrumentation import metrics
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+DEFAULT_OUTPUT = 'cascade_evaluation.json'
+
+# z-score of a one-sided 95% confidence bound
+Z_ONE_SIDED_95 = 1.644854
+
+# Labels of the synthetic dataset -> names of the few-shot categories
+SYNTHETIC_CATEGORY_MAP = {
+    'Treatment': 'treatment',
+    'Vaccine Development': 'vaccine',
+    'Epidemiology': 'epidemiology',
+    'Clinical Diagnosis': 'clinical_diagnosis',
+    'Immunology': 'immunology',
+    'Public Health': 'public_health',
+    'Virology': 'virology'
+}
+
+def calibrate_margin(margins: np.ndarray, agree: np.ndarray, target: float, z: float = Z_ONE_SIDED_95) -> float:
+    """
+    Smallest margin above which the lexical stage agrees with the transformer often enough.
+
+    Documents are ranked by margin; the threshold is the margin of the longest
+    prefix whose agreement reaches target at the lower end of its Wilson score
+    interval. Requiring the lower bound, not the observed rate, to reach the
+    target keeps the threshold from fitting the noise of the held-out sample,
+    which would otherwise leave unseen documents below target.
+
+    Args:
+        margins (np.ndarray): Lexical margin of each held-out document
+        agree (np.ndarray): Whether the lexical label matched the transformer's
+        target (float): Required agreement among documents kept by the lexical stage
+        z (float): z-score of the lower confidence bound; 0 uses the observed rate
+
+    Returns:
+        float: Margin threshold; inf when no prefix reaches the target
+    """
+    order = np.argsort(-margins, kind='stable')
+    n = np.arange(1, len(order) + 1)
+    agreement = np.cumsum(agree[order]) / n
+    lower = (agreement + z ** 2 / (2 * n) - z * np.sqrt(agreement * (1 - agreement) / n + z ** 2 / (4 * n ** 2))) \
+        / (1 + z ** 2 / n)
+    passing = np.flatnonzero(lower >= target)
+    if not len(passing):
+        return float('inf')
+    return float(margins[order][passing[-1]])
+
+class CascadeClassifier:
+    """
+    Two-stage classifier: a hashed TF-IDF linear model in front of the transformer.
+
+    The lexical stage is fitted on the few-shot category examples plus the
+    transformer's high-confidence labels on a calibration sample. At
+    classification time it scores every document; documents whose margin
+    between the two most probable categories reaches the calibrated threshold
+    keep the lexical label, and only the rest are encoded by the transformer.
+    The threshold is chosen on held-out calibration documents so that a lower
+    confidence bound on the agreement of the lexically resolved ones with the
+    transformer reaches target_agreement.
+    """
+
+    def __init__(self, classifier, target_agreement: float = 0.97, pseudo_label_quantile: float = 0.5,
+                 holdout_fraction: float = 0.3, n_features: int = 2 ** 16, confidence_z: float = Z_ONE_SIDED_95,
+                 seed: int = 0):
+        """
+        Args:
+            classifier (FewShotClassifier): Second stage, with prepared categories
+            target_agreement (float): Required agreement with the transformer on
+                documents the lexical stage resolves
+            pseudo_label_quantile (float): Per category, transformer labels scoring
+                below this quantile are not used for training
+            holdout_fraction (float): Share of the calibration sample held out to
+                choose the margin threshold
+            n_features (int): Hashed feature space of the lexical model
+            confidence_z (float): z-score of the lower confidence bound on held-out
+                agreement that must reach target_agreement (see calibrate_margin)
+            seed (int): Seed of the calibration split
+        """
+        self.classifier = classifier
+        self.target_agreement = target_agreement
+        self.pseudo_label_quantile = pseudo_label_quantile
+        self.holdout_fraction = holdout_fraction
+        self.confidence_z = confidence_z
+        self.seed = seed
+        self.model = make_pipeline(
+            HashingVectorizer(n_features=n_features, ngram_range=(1, 2), stop_words='english',
+                              alternate_sign=False, norm=None),
+            TfidfTransformer(sublinear_tf=True),
+            LogisticRegression(C=10.0, max_iter=1000)
+        )
+        self.threshold = float('inf')
+        self.documents = 0
+        self.routed = 0
+
+    @property
+    def routing_rate(self) -> float:
+        """Share of classified documents sent to the transformer."""
+        return self.routed / self.documents if self.documents else 0.0
+
+    def fit(self, texts: list, batch_size: int = 64) -> 'CascadeClassifier':
+        """
+        Fit the lexical stage and calibrate its margin threshold on a sample of the corpus.
+
+        Args:
+            texts (list): Calibration sample, labeled by the transformer
+            batch_size (int): Number of texts the transformer encodes per forward pass
+
+        Returns:
+            CascadeClassifier: self
+        """
+        texts = [text for text in texts if isinstance(text, str) and text.strip()]
+        labels, scores = self.classifier.classify_batch(texts, batch_size=batch_size)
+        labels = np.asarray(labels, dtype=object)
+
+        rng = np.random.default_rng(self.seed)
+        holdout = np.zeros(len(texts), dtype=bool)
+        holdout[rng.permutation(len(texts))[:int(len(texts) * self.holdout_fraction)]] = True
+
+        # Training data: every support example plus confident transformer labels outside the holdout
+        train_texts, train_labels = [], []
+        for category, examples in self.classifier.prototypes.examples.items():
+            train_texts.extend(examples)
+            train_labels.extend([category] * len(examples))
+        for category in np.unique(labels[~holdout]):
+            rows = np.flatnonzero((labels == category) & ~holdout)
+            cutoff = np.quantile(scores[rows], self.pseudo_label_quantile)
+            confident = rows[scores[rows] >= cutoff]
+            train_texts.extend(texts[i] for i in confident)
+            train_labels.extend(labels[confident])
+        self.model.fit(train_texts, np.asarray(train_labels, dtype=object))
+
+        held_out = np.flatnonzero(holdout)
+        if len(held_out):
+            predicted, _, margins = self.lexical_scores([texts[i] for i in held_out])
+            self.threshold = calibrate_margin(margins, predicted == labels[held_out], self.target_agreement,
+                                              self.confidence_z)
+        logger.info(f"Lexical stage fitted on {len(train_texts)} texts; margin threshold {self.threshold:.4f} "
+                    f"for {self.target_agreement:.0%} agreement on {len(held_out)} held-out texts")
+        return self
+
+    def lexical_scores(self, texts: list) -> tuple:
+        """
+        Score texts with the lexical stage only.
+
+        Returns:
+            tuple: (labels, top probability, margin between the two most probable categories)
+        """
+        with metrics.timer('lexical_scoring'):
+            probabilities = self.model.predict_proba(texts)
+            top_two = np.sort(probabilities, axis=1)[:, -2:] if probabilities.shape[1] > 1 else None
+            best = probabilities.argmax(axis=1)
+            labels = self.model.classes_[best].astype(object)
+            top = probabilities[np.arange(len(texts)), best]
+            margins = top_two[:, 1] - top_two[:, 0] if top_two is not None else np.ones(len(texts))
+        return labels, top, margins
+
+    def classify(self, text):
+        """Classify a single text"""
+        labels, scores = self.classify_batch([text])
+        return labels[0], scores[0]
+
+    def classify_batch(self, texts, batch_size=64):
+        """
+        Classify texts, sending only the ones below the margin threshold to the transformer.
+
+        Args:
+            texts (list): Texts to classify
+            batch_size (int): Number of texts the transformer encodes per forward pass
+
+        Returns:
+            tuple: (labels, scores) arrays; the score is the lexical probability for
+                lexically resolved texts and the cosine similarity for the others
+        """
+        texts = list(texts)
+        if not texts:
+            return np.array([], dtype=object), np.array([], dtype=np.float32)
+        labels, scores, margins = self.lexical_scores(texts)
+        scores = scores.astype(np.float32)
+        routed = np.flatnonzero(margins < self.threshold)
+        if len(routed):
+            routed_labels, routed_scores = self.classifier.classify_batch([texts[i] for i in routed],
+                                                                          batch_size=batch_size)
+            labels[routed] = routed_labels
+            scores[routed] = routed_scores
+        self.documents += len(texts)
+        self.routed += len(routed)
+        metrics.inc('cascade_lexical', len(texts) - len(routed))
+        metrics.inc('cascade_routed', len(routed))
+        return labels, scores
+
+    def save_cache(self):
+        """Persist the transformer's embedding cache and log the routing rate."""
+        self.classifier.save_cache()
+        logger.info(f"Cascade: {self.documents - self.routed} of {self.documents} texts resolved lexically, "
+                    f"routing rate {self.routing_rate:.1%}")
+
+    def evaluate(self, texts: list, true_labels=None, batch_size: int = 64) -> dict:
+        """
+        Compare the cascade with running the transformer on every text.
+
+        Args:
+            texts (list): Evaluation texts, not part of the calibration sample
+            true_labels (list, optional): Reference categories, for the accuracy delta
+            batch_size (int): Number of texts the transformer encodes per forward pass
+
+        Returns:
+            dict: Routing rate, agreement with the transformer and, with true labels,
+                the accuracy of both and their difference
+        """
+        texts = list(texts)
+        transformer_labels, _ = self.classifier.classify_batch(texts, batch_size=batch_size)
+        lexical_labels, _, margins = self.lexical_scores(texts)
+        resolved = margins >= self.threshold
+        cascade_labels = np.where(resolved, lexical_labels, transformer_labels)
+
+        report = {
+            'documents': len(texts),
+            'margin_threshold': self.threshold,
+            'routing_rate': float(1 - resolved.mean()),
+            'lexical_agreement': float((lexical_labels[resolved] == transformer_labels[resolved]).mean())
+            if resolved.any() else None,
+            'agreement_with_transformer': float((cascade_labels == transformer_labels).mean())
+        }
+        if true_labels is not None:
+            true_labels = np.asarray(true_labels, dtype=object)
+            report['transformer_accuracy'] = float((transformer_labels == true_labels).mean())
+            report['cascade_accuracy'] = float((cascade_labels == true_labels).mean())
+            report['accuracy_delta'] = report['cascade_accuracy'] - report['transformer_accuracy']
+        return report
+
+def evaluate_cascade(
+    data_file: str,
+    classifier,
+    label_column: str = 'category',
+    label_map: dict = SYNTHETIC_CATEGORY_MAP,
+    calibration_size: int = 2000,
+    target_agreement: float = 0.97,
+    limit: int = None,
+    batch_size: int = 64,
+    seed: int = 0,
+    output_file: str = DEFAULT_OUTPUT
+) -> dict:
+    """
+    Calibrate a cascade on part of a labeled corpus and evaluate it on the rest.
+
+    Args:
+        data_file (str): Papers CSV or columnar corpus with abstracts and labels
+        classifier (FewShotClassifier): Transformer stage, with prepared categories
+        label_column (str): Column holding the true category
+        label_map (dict, optional): Maps dataset labels to the classifier's category
+            names; labels missing from it are compared as they are
+        calibration_size (int): Papers used to fit and calibrate the lexical stage; at
+            most half of the papers, so the rest are left to evaluate
+        target_agreement (float): Required agreement of the lexical stage with the transformer
+        limit (int, optional): Only use the first limit papers
+        batch_size (int): Number of abstracts encoded per forward pass
+        seed (int): Seed of the calibration sample
+        output_file (str, optional): Write the report as JSON to this file
+
+    Returns:
+        dict: The evaluation report (see CascadeClassifier.evaluate)
+    """
+    from few_shot_classifier import load_data
+
+    try:
+        df = load_data(data_file, nrows=limit)
+        shuffled = df.sample(frac=1.0, random_state=seed)
+        if calibration_size > len(df) // 2:
+            logger.info(f"Calibrating on {len(df) // 2} of {len(df)} papers instead of {calibration_size}")
+            calibration_size = len(df) // 2
+        calibration, evaluation = shuffled.iloc[:calibration_size], shuffled.iloc[calibration_size:]
+        if not len(evaluation):
+            raise ValueError(f"No papers left to evaluate after a calibration sample of {calibration_size}")
+
+        start = time.perf_counter()
+        cascade = CascadeClassifier(classifier, target_agreement=target_agreement, seed=seed)
+        cascade.fit(calibration['abstract'].tolist(), batch_size=batch_size)
+        fit_seconds = time.perf_counter() - start
+
+        true_labels = None
+        if label_column in evaluation:
+            true_labels = evaluation[label_column].map(lambda label: (label_map or {}).get(label, label))
+        report = cascade.evaluate(evaluation['abstract'].tolist(), true_labels, batch_size=batch_size)
+        report.update({'data_file': str(data_file), 'calibration_size': len(calibration),
+                       'target_agreement': target_agreement, 'fit_seconds': fit_seconds})
+        logger.info(f"Routing rate {report['routing_rate']:.1%}, agreement with transformer "
+                    f"{report['agreement_with_transformer']:.4f}"
+                    + (f", accuracy delta {report['accuracy_delta']:+.4f}" if 'accuracy_delta' in report else ""))
+
+        classifier.save_cache()
+        if output_file:
+            with open(output_file, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2)
+            logger.info(f"Evaluation saved to {output_file}")
+        return report
+
+    except Exception as e:
+        logger.error(f"Error evaluating cascade: {str(e)}")
+        raise
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate the lexical + transformer cascade classifier")
+    parser.add_argument('--data', default='synthetic_covid19_papers.csv', help="Labeled papers CSV or corpus")
+    parser.add_argument('--label-column', default='category')
+    parser.add_argument('--calibration-size', type=int, default=2000,
+                        help="Papers used to calibrate the lexical stage (at most half of the data)")
+    parser.add_argument('--target-agreement', type=float, default=0.97)
+    parser.add_argument('--limit', type=int, help="Only use the first N papers")
+    parser.add_argument('--model', default='all-MiniLM-L6-v2')
+    parser.add_argument('--encoder', choices=['auto', 'model', 'stub'], default='model',
+                        help="'stub' uses the benchmark's deterministic hashing encoder")
+    parser.add_argument('--categories', help="JSON file mapping category -> example sentences")
+    parser.add_argument('--cache-dir', help="Embedding cache directory")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=DEFAULT_OUTPUT)
+    args = parser.parse_args()
+
+    from benchmark import load_encoder
+    from few_shot_classifier import DEFAULT_CATEGORIES, FewShotClassifier
+    model, encoder_name = load_encoder(args.model, args.encoder)
+    classifier = FewShotClassifier(encoder_name, cache_dir=args.cache_dir, model=model)
+    categories = DEFAULT_CATEGORIES
+    if args.categories:
+        with open(args.categories, 'r', encoding='utf-8') as f:
+            categories = json.load(f)
+    classifier.prepare_categories(categories)
+    evaluate_cascade(args.data, classifier, args.label_column, calibration_size=args.calibration_size,
+                     target_agreement=args.target_agreement, limit=args.limit, seed=args.seed,
+                     output_file=args.output)
+
+if __name__ == "__main__":
+    main()
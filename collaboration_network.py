@@ -0,0 +1,376 @@
+import argparse
+import json
+from itertools import chain
+import logging
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from scipy.sparse.csgraph import connected_components
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+NETWORK_COLUMNS = ('authors', 'author_affiliations')
+GRAPH_KINDS = ('author', 'institution')
+
+class NameInterner:
+    """Map names to dense integer ids in order of first appearance."""
+
+    def __init__(self):
+        self.ids = {}
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def names(self) -> list:
+        return list(self.ids)
+
+    def intern(self, values: list) -> np.ndarray:
+        """
+        Ids of values, assigning new ids to unseen names.
+
+        Values are factorized first, so the dict is only consulted once per
+        distinct name in the batch rather than once per mention.
+
+        Args:
+            values (list): Names; None marks a missing value
+
+        Returns:
+            np.ndarray: int64 ids, -1 where the value is missing
+        """
+        codes, uniques = pd.factorize(np.asarray(values, dtype=object))
+        if not len(uniques):
+            return np.full(len(codes), -1, dtype=np.int64)
+        ids = self.ids
+        lookup = np.fromiter((ids.setdefault(name, len(ids)) for name in uniques), dtype=np.int64,
+                             count=len(uniques))
+        return np.where(codes >= 0, lookup[codes], -1)
+
+def _split_names(value) -> list:
+    """'A; B; C' -> ['A', 'B', 'C'], dropping empty entries."""
+    if not isinstance(value, str):
+        return []
+    return [name.strip() for name in value.split(';') if name.strip()]
+
+class NetworkBuilder:
+    """
+    Accumulate author mentions into sparse incidence matrices.
+
+    Every mention is one (paper, author, institution) triple of integer ids;
+    the ids are appended to flat arrays chunk by chunk and turned into CSR
+    matrices once at the end, so memory grows with the number of mentions
+    rather than with the number of collaborating pairs.
+    """
+
+    def __init__(self):
+        self.authors = NameInterner()
+        self.institutions = NameInterner()
+        self.n_papers = 0
+        self.unpaired_papers = 0
+        self._papers, self._authors, self._institutions = [], [], []
+
+    def add_papers(self, author_lists: list, affiliation_lists: list = None) -> None:
+        """
+        Add papers given as per-paper lists of author names and affiliations.
+
+        Args:
+            author_lists (list): Author names of each paper
+            affiliation_lists (list, optional): Affiliation of each author, in the
+                same order; papers whose list length differs from their author
+                list keep their authors but get no institutions
+        """
+        sizes = np.fromiter(map(len, author_lists), dtype=np.int64, count=len(author_lists))
+        papers = np.repeat(np.arange(self.n_papers, self.n_papers + len(author_lists)), sizes)
+        authors = self.authors.intern(list(chain.from_iterable(author_lists)))
+
+        if affiliation_lists is None:
+            institutions = np.full(len(authors), -1, dtype=np.int64)
+        else:
+            affiliations = []
+            for names, places in zip(author_lists, affiliation_lists):
+                if len(places) == len(names):
+                    affiliations.extend(places)
+                else:
+                    affiliations.extend([None] * len(names))
+                    self.unpaired_papers += bool(names)
+            institutions = self.institutions.intern(affiliations)
+
+        keep = authors >= 0
+        self._papers.append(papers[keep].astype(np.int32))
+        self._authors.append(authors[keep].astype(np.int32))
+        self._institutions.append(institutions[keep].astype(np.int32))
+        self.n_papers += len(author_lists)
+
+    def add_frame(self, df: pd.DataFrame) -> None:
+        """Add papers from the '; '-joined authors and author_affiliations columns of the papers CSV."""
+        author_lists = [_split_names(value) for value in df['authors']]
+        affiliation_lists = None
+        if 'author_affiliations' in df.columns:
+            affiliation_lists = [_split_names(value) for value in df['author_affiliations']]
+        self.add_papers(author_lists, affiliation_lists)
+
+    def add_records(self, records: list) -> None:
+        """Add papers in the JSON layout of create_synthetic_dataset (authors as name/affiliation dicts)."""
+        author_lists, affiliation_lists = [], []
+        for record in records:
+            authors = [author for author in record.get('authors') or [] if author.get('name')]
+            author_lists.append([author['name'] for author in authors])
+            affiliation_lists.append([author.get('affiliation') for author in authors])
+        self.add_papers(author_lists, affiliation_lists)
+
+    def build(self, max_team_size: int = None) -> 'CollaborationNetwork':
+        """
+        Assemble the incidence matrices.
+
+        Args:
+            max_team_size (int, optional): Leave papers with more authors out of
+                the collaboration graphs; a consortium paper with n authors adds
+                n^2 entries to the co-authorship product
+
+        Returns:
+            CollaborationNetwork: The incidence matrices and the graphs derived from them
+        """
+        papers = np.concatenate(self._papers) if self._papers else np.zeros(0, dtype=np.int32)
+        authors = np.concatenate(self._authors) if self._authors else np.zeros(0, dtype=np.int32)
+        institutions = np.concatenate(self._institutions) if self._institutions else np.zeros(0, dtype=np.int32)
+        n_authors, n_institutions = len(self.authors), len(self.institutions)
+
+        paper_author = _incidence(papers, authors, (self.n_papers, n_authors), binary=True)
+        paired = institutions >= 0
+        author_institution = _incidence(authors[paired], institutions[paired], (n_authors, n_institutions))
+        paper_institution = _incidence(papers[paired], institutions[paired], (self.n_papers, n_institutions),
+                                       binary=True)
+        if self.unpaired_papers:
+            logger.warning(f"{self.unpaired_papers} papers had author and affiliation lists of different "
+                           f"lengths; their institutions were skipped")
+        logger.info(f"Built network of {self.n_papers} papers, {n_authors} authors, {n_institutions} "
+                    f"institutions from {len(authors)} author mentions")
+        return CollaborationNetwork(paper_author, author_institution, paper_institution, self.authors.names,
+                                    self.institutions.names, max_team_size)
+
+def _incidence(rows: np.ndarray, cols: np.ndarray, shape: tuple, binary: bool = False) -> sp.csr_matrix:
+    """CSR matrix counting (row, col) pairs, or marking them with 1 when binary."""
+    matrix = sp.csr_matrix((np.ones(len(rows), dtype=np.int32), (rows, cols)), shape=shape)
+    matrix.sum_duplicates()
+    if binary:
+        matrix.data[:] = 1
+    return matrix
+
+def _collaboration_graph(incidence: sp.csr_matrix, keep_rows: np.ndarray = None) -> sp.csr_matrix:
+    """Symmetric graph whose (i, j) weight is the number of kept rows shared by columns i and j."""
+    if keep_rows is not None:
+        incidence = incidence[keep_rows]
+    graph = (incidence.T @ incidence).tocsr()
+    # The diagonal holds each node's own row count, not a collaboration
+    graph = (graph - sp.diags(graph.diagonal(), dtype=graph.dtype)).tocsr()
+    graph.eliminate_zeros()
+    return graph
+
+class CollaborationNetwork:
+    """
+    Co-authorship and inter-institution collaboration graphs.
+
+    Both graphs are sparse products of incidence matrices: with A the binary
+    paper x author matrix, A.T @ A counts the papers every pair of authors
+    wrote together. The institution graph is built the same way from the
+    paper x institution matrix, which records the affiliation of each author
+    mention; deriving it as (A @ author_institution) would credit every paper
+    of an author to all institutions the author was ever listed with.
+    """
+
+    def __init__(self, paper_author: sp.csr_matrix, author_institution: sp.csr_matrix,
+                 paper_institution: sp.csr_matrix, author_names: list, institution_names: list,
+                 max_team_size: int = None):
+        """
+        Args:
+            paper_author (sp.csr_matrix): Binary paper x author incidence
+            author_institution (sp.csr_matrix): Mentions of each author with each institution
+            paper_institution (sp.csr_matrix): Binary paper x institution incidence
+            author_names (list): Name of each author id
+            institution_names (list): Name of each institution id
+            max_team_size (int, optional): Leave larger papers out of the graphs
+        """
+        self.paper_author = paper_author
+        self.author_institution = author_institution
+        self.paper_institution = paper_institution
+        self.max_team_size = max_team_size
+        self.names = {'author': list(author_names), 'institution': list(institution_names)}
+        self._ids = {kind: {name: i for i, name in enumerate(names)} for kind, names in self.names.items()}
+        self._graphs = {}
+
+    def graph(self, kind: str = 'author') -> sp.csr_matrix:
+        """The co-authorship ('author') or inter-institution ('institution') graph, computed on first use."""
+        if kind not in GRAPH_KINDS:
+            raise ValueError(f"Unknown graph {kind!r}; expected one of {GRAPH_KINDS}")
+        if kind not in self._graphs:
+            incidence = self.paper_author if kind == 'author' else self.paper_institution
+            # Team size is the paper's author count for both graphs, not its institution count
+            keep_rows = self.paper_author.getnnz(axis=1) <= self.max_team_size if self.max_team_size else None
+            self._graphs[kind] = _collaboration_graph(incidence, keep_rows)
+        return self._graphs[kind]
+
+    def degree(self, kind: str = 'author', weighted: bool = False) -> np.ndarray:
+        """Distinct collaborators of every node, or the number of joint papers when weighted."""
+        graph = self.graph(kind)
+        if weighted:
+            return np.asarray(graph.sum(axis=1)).ravel()
+        return graph.getnnz(axis=1)
+
+    def components(self, kind: str = 'author') -> tuple:
+        """(number of connected components, component label of every node)."""
+        return connected_components(self.graph(kind), directed=False)
+
+    def component_sizes(self, kind: str = 'author') -> np.ndarray:
+        """Sizes of the connected components, largest first."""
+        _, labels = self.components(kind)
+        return np.sort(np.bincount(labels))[::-1]
+
+    def top_collaborators(self, name: str, kind: str = 'author', n: int = 10) -> list:
+        """
+        The strongest collaborators of one author or institution.
+
+        Args:
+            name (str): Author or institution name
+            kind (str): 'author' or 'institution'
+            n (int): Number of collaborators to return
+
+        Returns:
+            list: (name, joint papers) tuples, most joint papers first
+        """
+        graph = self.graph(kind)
+        node = self._ids[kind].get(name)
+        if node is None:
+            raise ValueError(f"Unknown {kind} {name!r}")
+        start, end = graph.indptr[node], graph.indptr[node + 1]
+        neighbours, weights = graph.indices[start:end], graph.data[start:end]
+        order = np.lexsort((neighbours, -weights))[:n]
+        names = self.names[kind]
+        return [(names[neighbours[i]], int(weights[i])) for i in order]
+
+    def most_connected(self, kind: str = 'author', n: int = 10) -> list:
+        """(name, distinct collaborators) of the n nodes with the highest degree."""
+        degree = self.degree(kind)
+        order = np.argsort(-degree, kind='stable')[:n]
+        names = self.names[kind]
+        return [(names[i], int(degree[i])) for i in order]
+
+    def summary(self, top: int = 10) -> dict:
+        """Size, degree and component statistics of both graphs."""
+        summary = {
+            'papers': self.paper_author.shape[0],
+            'author_mentions': int(self.paper_author.nnz),
+            'max_team_size': self.max_team_size
+        }
+        for kind in GRAPH_KINDS:
+            degree = self.degree(kind)
+            sizes = self.component_sizes(kind)
+            summary[kind] = {
+                'nodes': len(self.names[kind]),
+                'edges': int(self.graph(kind).nnz // 2),
+                'mean_degree': float(degree.mean()) if len(degree) else 0.0,
+                'isolated': int((degree == 0).sum()),
+                'components': len(sizes),
+                'largest_component': int(sizes[0]) if len(sizes) else 0,
+                'most_connected': self.most_connected(kind, top)
+            }
+        return summary
+
+def network_report(network: CollaborationNetwork, top: int = 10, authors: list = (),
+                   institutions: list = ()) -> dict:
+    """
+    Network summary plus the top collaborators of the requested authors and institutions.
+
+    Args:
+        network (CollaborationNetwork): Network to describe
+        top (int): Number of most connected nodes and collaborators listed
+        authors (list): Authors whose top collaborators are reported
+        institutions (list): Institutions whose top collaborating institutions are reported
+
+    Returns:
+        dict: CollaborationNetwork.summary with a 'top_collaborators' entry per graph kind
+    """
+    report = network.summary(top)
+    report['top_collaborators'] = {
+        'author': {name: network.top_collaborators(name, 'author', top) for name in authors},
+        'institution': {name: network.top_collaborators(name, 'institution', top) for name in institutions}
+    }
+    return report
+
+def _iter_author_frames(input_file: str, chunksize: int):
+    """Chunks of the author columns only, from a papers CSV or a columnar corpus."""
+    from columnar_corpus import ColumnarCorpus, is_corpus
+
+    if is_corpus(input_file):
+        corpus = ColumnarCorpus(input_file)
+        names = [col for col in NETWORK_COLUMNS if col in corpus.columns]
+        for start in range(0, len(corpus), chunksize):
+            yield corpus.to_frame(names, start, start + chunksize)
+        return
+    # Unlike iter_data_chunks, papers without an abstract still contribute their authors
+    yield from pd.read_csv(input_file, usecols=lambda col: col in NETWORK_COLUMNS, dtype=str, chunksize=chunksize)
+
+def build_network(input_file: str, chunksize: int = 10000, max_team_size: int = None) -> CollaborationNetwork:
+    """
+    Build the collaboration network of a papers file in one streaming pass.
+
+    Args:
+        input_file (str): Papers CSV (synthetic or CORD-19 metadata.csv), columnar
+            corpus, or synthetic JSON/JSONL file; the JSON layout keeps every
+            author paired with its affiliation
+        chunksize (int): Number of papers read per chunk
+        max_team_size (int, optional): Leave papers with more authors out of the graphs
+
+    Returns:
+        CollaborationNetwork: The incidence matrices and derived graphs
+    """
+    builder = NetworkBuilder()
+    try:
+        if str(input_file).endswith(('.json', '.jsonl')):
+            from json_to_csv_converter import iter_json_records
+            batch = []
+            for record in iter_json_records(input_file):
+                batch.append(record)
+                if len(batch) >= chunksize:
+                    builder.add_records(batch)
+                    batch = []
+            builder.add_records(batch)
+        else:
+            for chunk in _iter_author_frames(input_file, chunksize):
+                builder.add_frame(chunk)
+        return builder.build(max_team_size)
+
+    except Exception as e:
+        logger.error(f"Error building collaboration network: {str(e)}")
+        raise
+
+def main():
+    parser = argparse.ArgumentParser(description="Co-authorship and institution collaboration network statistics")
+    parser.add_argument('input', nargs='?', default='synthetic_covid19_papers.json',
+                        help="Papers JSON/JSONL, CSV or columnar corpus")
+    parser.add_argument('--chunksize', type=int, default=10000)
+    parser.add_argument('--max-team-size', type=int, help="Leave papers with more authors out of the graphs")
+    parser.add_argument('--top', type=int, default=10, help="Number of most connected nodes to report")
+    parser.add_argument('--author', action='append', default=[], help="Report the top collaborators of this author")
+    parser.add_argument('--institution', action='append', default=[],
+                        help="Report the top collaborating institutions of this institution")
+    parser.add_argument('--output', default='collaboration_network.json')
+    args = parser.parse_args()
+
+    network = build_network(args.input, args.chunksize, args.max_team_size)
+    summary = network_report(network, args.top, args.author, args.institution)
+    for kind in GRAPH_KINDS:
+        stats = summary[kind]
+        logger.info(f"{kind}: {stats['nodes']} nodes, {stats['edges']} edges, mean degree "
+                    f"{stats['mean_degree']:.2f}, {stats['components']} components (largest "
+                    f"{stats['largest_component']})")
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(summary, f, indent=2, ensure_ascii=False)
+    logger.info(f"Network summary saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
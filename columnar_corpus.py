@@ -0,0 +1,279 @@
+import json
+import os
+from pathlib import Path
+import logging
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = 'manifest.json'
+FORMAT_VERSION = 2
+
+# Sentinel stored for missing dates (days since 1970-01-01 as int32)
+MISSING_DATE = np.iinfo(np.int32).min
+
+# Storage kind of each column of the converted papers CSV
+DEFAULT_SCHEMA = {
+    'title': 'text',
+    'abstract': 'text',
+    'category': 'dictionary',
+    'date_published': 'date',
+    'authors': 'text',
+    'author_affiliations': 'text',
+    'author_emails': 'text',
+    'keywords': 'text',
+    'journal': 'dictionary',
+    'citation_count': 'int',
+    'reference_count': 'int'
+}
+
+
+def is_corpus(path) -> bool:
+    """Whether path is a directory written by ColumnarCorpusWriter."""
+    return (Path(path) / MANIFEST_FILE).is_file()
+
+
+def file_fingerprint(path) -> dict:
+    """Identity of a file (absolute path, size and modification time) without reading it."""
+    stat = os.stat(path)
+    return {'path': os.path.abspath(path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def _source_changed(manifest: dict) -> bool:
+    source = manifest.get('source')
+    if not source or not os.path.exists(source['path']):
+        return False
+    return file_fingerprint(source['path']) != source
+
+
+def is_stale(path) -> bool:
+    """
+    Whether the CSV a corpus was built from has changed since the corpus was written.
+
+    Corpora written without a source, or whose source file no longer exists,
+    are never considered stale.
+    """
+    with open(Path(path) / MANIFEST_FILE, 'r', encoding='utf-8') as f:
+        return _source_changed(json.load(f))
+
+
+class ColumnarCorpusWriter:
+    """
+    Write papers into a compact, memory-mappable columnar corpus directory.
+
+    Numeric columns are stored as int32 arrays plus a null mask, dates as int32
+    days since the epoch, low-cardinality columns as int32 codes into a
+    dictionary, and text columns as an int64 offsets array plus a UTF-8 byte
+    blob. Batches are appended as they arrive, so the writer can sit behind a
+    streaming converter.
+    """
+
+    def __init__(self, output_dir: str, schema: dict = None, source: str = None):
+        """
+        Args:
+            output_dir (str): Directory to create the corpus in
+            schema (dict, optional): Column name -> 'int', 'date', 'dictionary' or 'text'
+            source (str, optional): CSV file the corpus mirrors; its fingerprint is
+                recorded at close() so readers can detect a stale corpus
+        """
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        # The manifest marks a complete corpus; drop the old one before its columns are overwritten
+        manifest_path = self.output_dir / MANIFEST_FILE
+        if manifest_path.exists():
+            manifest_path.unlink()
+        self.schema = dict(schema or DEFAULT_SCHEMA)
+        self.source = source
+        self.num_rows = 0
+        self._dictionaries = {name: {} for name, kind in self.schema.items() if kind == 'dictionary'}
+        self._text_sizes = {name: 0 for name, kind in self.schema.items() if kind == 'text'}
+        self._files = {}
+        for name, kind in self.schema.items():
+            if kind == 'text':
+                self._files[name] = (self._open(f'{name}.offsets'), self._open(f'{name}.bytes'),
+                                     self._open(f'{name}.nulls'))
+                np.zeros(1, dtype=np.int64).tofile(self._files[name][0])
+            elif kind == 'int':
+                self._files[name] = (self._open(f'{name}.data'), self._open(f'{name}.nulls'))
+            else:
+                self._files[name] = (self._open(f'{name}.data'),)
+
+    def _open(self, filename):
+        return open(self.output_dir / filename, 'wb')
+
+    def append(self, df: pd.DataFrame) -> None:
+        """Append a batch of rows; df must contain every column of the schema."""
+        for name, kind in self.schema.items():
+            values = df[name]
+            if kind == 'int':
+                numbers = pd.to_numeric(values, errors='coerce')
+                nulls = numbers.isna().to_numpy()
+                np.asarray(numbers.fillna(0), dtype=np.int32).tofile(self._files[name][0])
+                nulls.astype(np.uint8).tofile(self._files[name][1])
+            elif kind == 'date':
+                dates = pd.to_datetime(values, errors='coerce')
+                days = dates.to_numpy(dtype='datetime64[D]').astype(np.int64)
+                days[dates.isna().to_numpy()] = MISSING_DATE
+                days.astype(np.int32).tofile(self._files[name][0])
+            elif kind == 'dictionary':
+                dictionary = self._dictionaries[name]
+                codes = np.array([
+                    -1 if pd.isna(value) else dictionary.setdefault(str(value), len(dictionary))
+                    for value in values
+                ], dtype=np.int32)
+                codes.tofile(self._files[name][0])
+            elif kind == 'text':
+                offsets_file, bytes_file, nulls_file = self._files[name]
+                nulls = values.isna().to_numpy()
+                encoded = [b'' if null else str(value).encode('utf-8') for value, null in zip(values, nulls)]
+                lengths = np.fromiter((len(b) for b in encoded), dtype=np.int64, count=len(encoded))
+                offsets = self._text_sizes[name] + np.cumsum(lengths)
+                offsets.tofile(offsets_file)
+                bytes_file.write(b''.join(encoded))
+                nulls.astype(np.uint8).tofile(nulls_file)
+                if len(offsets):
+                    self._text_sizes[name] = int(offsets[-1])
+            else:
+                raise ValueError(f"Unknown column kind {kind!r} for column {name!r}")
+        self.num_rows += len(df)
+
+    def _close_handles(self) -> None:
+        for handles in self._files.values():
+            for handle in handles:
+                handle.close()
+
+    def close(self) -> None:
+        """Flush all column files and write the manifest."""
+        self._close_handles()
+        manifest = {
+            'version': FORMAT_VERSION,
+            'num_rows': self.num_rows,
+            'columns': {
+                name: {'kind': kind, **({'dictionary': list(self._dictionaries[name])} if kind == 'dictionary' else {})}
+                for name, kind in self.schema.items()
+            }
+        }
+        if self.source is not None:
+            manifest['source'] = file_fingerprint(self.source)
+        tmp_path = self.output_dir / (MANIFEST_FILE + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self.output_dir / MANIFEST_FILE)
+        logger.info(f"Wrote columnar corpus with {self.num_rows} rows to {self.output_dir}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # A failed write must not leave a manifest, or the partial corpus would look complete
+        if exc_type is None:
+            self.close()
+        else:
+            self._close_handles()
+
+
+class ColumnarCorpus:
+    """
+    Read-only view of a columnar corpus directory.
+
+    Column files are memory-mapped on first access, so reading only 'category'
+    and 'citation_count' never touches the abstract bytes on disk. Opening a
+    corpus whose source CSV has changed since it was written logs a warning.
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        with open(self.path / MANIFEST_FILE, 'r', encoding='utf-8') as f:
+            self.manifest = json.load(f)
+        if self.manifest.get('version') != FORMAT_VERSION:
+            raise ValueError(f"Unsupported corpus format version: {self.manifest.get('version')}")
+        self.num_rows = self.manifest['num_rows']
+        self._cache = {}
+        if _source_changed(self.manifest):
+            logger.warning(f"Columnar corpus {self.path} is older than its source "
+                           f"{self.manifest['source']['path']}; rebuild it to pick up the changes")
+
+    def __len__(self):
+        return self.num_rows
+
+    @property
+    def columns(self) -> list:
+        return list(self.manifest['columns'])
+
+    def _memmap(self, filename, dtype, length):
+        if length == 0:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(self.path / filename, dtype=dtype, mode='r', shape=(length,))
+
+    def _raw(self, name):
+        """Memory-mapped arrays backing a column, opened lazily."""
+        if name not in self._cache:
+            kind = self.manifest['columns'][name]['kind']
+            if kind == 'text':
+                offsets = self._memmap(f'{name}.offsets', np.int64, self.num_rows + 1)
+                size = int(offsets[-1]) if self.num_rows else 0
+                self._cache[name] = (offsets, self._memmap(f'{name}.bytes', np.uint8, size),
+                                     self._memmap(f'{name}.nulls', np.uint8, self.num_rows))
+            elif kind == 'int':
+                self._cache[name] = (self._memmap(f'{name}.data', np.int32, self.num_rows),
+                                     self._memmap(f'{name}.nulls', np.uint8, self.num_rows))
+            else:
+                self._cache[name] = self._memmap(f'{name}.data', np.int32, self.num_rows)
+        return self._cache[name]
+
+    def column(self, name: str, start: int = 0, stop: int = None):
+        """
+        Decode rows [start, stop) of one column.
+
+        Returns:
+            np.ndarray for int columns (int32, or float64 with NaN when the
+            rows contain missing values), datetime64[D] array for dates,
+            pd.Categorical for dictionary columns and an object array of str
+            (None for missing values) for text columns
+        """
+        spec = self.manifest['columns'][name]
+        kind = spec['kind']
+        stop = self.num_rows if stop is None else min(stop, self.num_rows)
+        if kind == 'int':
+            data, nulls = self._raw(name)
+            values = np.asarray(data[start:stop])
+            missing = np.asarray(nulls[start:stop], dtype=bool)
+            if missing.any():
+                values = values.astype(np.float64)
+                values[missing] = np.nan
+            return values
+        if kind == 'date':
+            days = np.asarray(self._raw(name)[start:stop])
+            dates = days.astype('datetime64[D]')
+            dates[days == MISSING_DATE] = np.datetime64('NaT')
+            return dates
+        if kind == 'dictionary':
+            return pd.Categorical.from_codes(np.asarray(self._raw(name)[start:stop]), categories=spec['dictionary'])
+        offsets, blob, nulls = self._raw(name)
+        values = np.empty(max(stop - start, 0), dtype=object)
+        for i in range(start, stop):
+            if not nulls[i]:
+                values[i - start] = blob[offsets[i]:offsets[i + 1]].tobytes().decode('utf-8')
+        return values
+
+    def text(self, name: str, row: int):
+        """Decode a single text value without touching the rest of the column."""
+        offsets, blob, nulls = self._raw(name)
+        if nulls[row]:
+            return None
+        return blob[offsets[row]:offsets[row + 1]].tobytes().decode('utf-8')
+
+    def to_frame(self, columns: list = None, start: int = 0, stop: int = None) -> pd.DataFrame:
+        """Materialize the requested columns (default: all) for rows [start, stop) as a DataFrame."""
+        columns = self.columns if columns is None else columns
+        frame = pd.DataFrame({name: self.column(name, start, stop) for name in columns})
+        frame.index = pd.RangeIndex(start, start + len(frame))
+        return frame
+
+
+def write_corpus_from_csv(csv_path: str, output_dir: str, chunksize: int = 50000, schema: dict = None) -> None:
+    """Build a columnar corpus from an existing papers CSV, chunk by chunk."""
+    with ColumnarCorpusWriter(output_dir, schema, source=csv_path) as writer:
+        for chunk in pd.read_csv(csv_path, chunksize=chunksize, usecols=list(writer.schema)):
+            writer.append(chunk)
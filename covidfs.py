@@ -0,0 +1,332 @@
+import time
+
+# Taken before anything else is imported, so reported startup covers this module's own imports
+_START = time.perf_counter()
+
+import argparse
+import csv
+import json
+import os
+import sys
+import logging
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Address (host:port) of a running `covidfs serve` daemon used by classify when set
+DAEMON_ENV_VAR = 'COVIDFS_DAEMON'
+DAEMON_BATCH_SIZE = 256
+
+def _daemon_address(address: str) -> tuple:
+    host, _, port = address.rpartition(':')
+    return host or '127.0.0.1', int(port)
+
+def daemon_available(address: str, timeout: float = 0.5) -> bool:
+    """True when a daemon answers /health at address."""
+    import http.client
+    host, port = _daemon_address(address)
+    try:
+        connection = http.client.HTTPConnection(host, port, timeout=timeout)
+        connection.request('GET', '/health')
+        ok = connection.getresponse().status == 200
+        connection.close()
+        return ok
+    except OSError:
+        return False
+
+class DaemonClient:
+    """Keep-alive HTTP client for the inference server started by `covidfs serve`."""
+
+    def __init__(self, address: str, timeout: float = 300.0):
+        import http.client
+        host, port = _daemon_address(address)
+        self.connection = http.client.HTTPConnection(host, port, timeout=timeout)
+
+    def classify_batch(self, texts: list) -> tuple:
+        """(labels, scores) lists for texts, sent in requests of DAEMON_BATCH_SIZE."""
+        labels, scores = [], []
+        for start in range(0, len(texts), DAEMON_BATCH_SIZE):
+            body = json.dumps({'texts': texts[start:start + DAEMON_BATCH_SIZE]})
+            self.connection.request('POST', '/classify', body, {'Content-Type': 'application/json'})
+            response = self.connection.getresponse()
+            payload = json.loads(response.read())
+            if response.status != 200:
+                raise RuntimeError(f"Daemon returned HTTP {response.status}: {payload}")
+            for result in payload['results']:
+                labels.append(result['category'])
+                scores.append(result['confidence'])
+        return labels, scores
+
+    def close(self) -> None:
+        self.connection.close()
+
+def _iter_csv_chunks(input_file: str, chunksize: int):
+    """Rows with an abstract, in lists of chunksize, read with the csv module only."""
+    csv.field_size_limit(min(sys.maxsize, 2 ** 31 - 1))
+    with open(input_file, 'r', encoding='utf-8', newline='') as f:
+        chunk = []
+        for row in csv.DictReader(f):
+            if row.get('abstract'):
+                chunk.append(row)
+                if len(chunk) >= chunksize:
+                    yield chunk
+                    chunk = []
+        if chunk:
+            yield chunk
+
+def classify_with_daemon(input_file: str, output_csv: str, address: str, chunksize: int = 10000) -> int:
+    """
+    Classify a papers CSV through a running daemon, without importing pandas or the model.
+
+    Args:
+        input_file (str): Papers CSV with title and abstract columns
+        output_csv (str): Path to write the classification results to
+        address (str): host:port of the daemon
+        chunksize (int): Number of rows read and written per chunk
+
+    Returns:
+        int: Number of papers classified
+    """
+    client = DaemonClient(address)
+    total = 0
+    try:
+        with open(output_csv, 'w', encoding='utf-8', newline='') as f:
+            writer = None
+            for chunk in _iter_csv_chunks(input_file, chunksize):
+                labels, scores = client.classify_batch([row['abstract'] for row in chunk])
+                if writer is None:
+                    # Same columns as few_shot_classifier.classify_file
+                    columns = (['cord_uid'] if 'cord_uid' in chunk[0] else []) + ['title', 'category', 'confidence']
+                    writer = csv.writer(f)
+                    writer.writerow(columns)
+                for row, label, score in zip(chunk, labels, scores):
+                    values = [row.get('title'), label, score]
+                    writer.writerow([row['cord_uid']] + values if columns[0] == 'cord_uid' else values)
+                total += len(chunk)
+    finally:
+        client.close()
+    logger.info(f"Classified {total} papers via daemon at {address}. Results saved to: {output_csv}")
+    return total
+
+def _load_classifier(args):
+    from inference_server import load_classifier
+    return load_classifier(args.model, args.categories, args.cache_dir, args.prototypes,
+                           quantize=args.quantize, token_budget=args.token_budget,
+                           embedding_dtype=args.embedding_dtype)
+
+def _cascade(classifier, args, texts: list = None):
+    """Put the lexical first stage in front of classifier, calibrated on a uniform sample of the input."""
+    import random
+    from cascade_classifier import CascadeClassifier
+    from create_sample_dataset import ReservoirSampler
+    # The head of a file is often ordered by source or date, so sample the whole input in one pass
+    sampler = ReservoirSampler(args.calibration_size, random.Random(0))
+    if texts is None:
+        from data_loader import iter_data_chunks
+        for chunk in iter_data_chunks(args.input, chunksize=args.chunksize, columns=('abstract',)):
+            for text in chunk['abstract']:
+                sampler.add(text)
+    else:
+        for text in texts:
+            sampler.add(text)
+    cascade = CascadeClassifier(classifier, target_agreement=args.target_agreement)
+    return cascade.fit(sampler.items, batch_size=args.batch_size)
+
+def cmd_classify(args) -> None:
+    address = args.daemon or os.environ.get(DAEMON_ENV_VAR)
+    if address and args.cascade:
+        logger.warning("--cascade runs in-process; not using the daemon")
+        address = None
+    if address and not daemon_available(address):
+        logger.warning(f"No daemon answering at {address}; loading the model in-process")
+        address = None
+
+    if args.input == '-':
+        # One text per line on stdin, one JSON result per line on stdout
+        texts = [line.rstrip('\n') for line in sys.stdin if line.strip()]
+        if address:
+            client = DaemonClient(address)
+            labels, scores = client.classify_batch(texts)
+            client.close()
+        else:
+            classifier = _load_classifier(args)
+            if args.cascade:
+                classifier = _cascade(classifier, args, texts)
+            labels, scores = classifier.classify_batch(texts, batch_size=args.batch_size)
+            # Flushes the embedding cache and, for the cascade, logs the routing rate (to stderr)
+            classifier.save_cache()
+        for label, score in zip(labels, scores):
+            sys.stdout.write(json.dumps({'category': str(label), 'confidence': float(score)}) + '\n')
+        return
+
+    if address:
+        classify_with_daemon(args.input, args.output, address, args.chunksize)
+        return
+    from few_shot_classifier import classify_file
+    classifier = _load_classifier(args)
+    if args.cascade:
+        classifier = _cascade(classifier, args)
+    counts = classify_file(args.input, classifier, args.output, args.chunksize, args.batch_size,
+                           metrics_file=args.metrics_file)
+    logger.info(f"Category counts: {counts.to_dict()}")
+
+def cmd_serve(args) -> None:
+    import asyncio
+    from inference_server import InferenceServer
+    start = time.perf_counter()
+    classifier = _load_classifier(args)
+    logger.info(f"Model ready in {time.perf_counter() - start:.2f}s")
+    server = InferenceServer(classifier, args.host, args.port, args.max_batch_size, args.max_wait_ms)
+    try:
+        asyncio.run(server.serve_forever())
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        logger.info("Shutting down")
+
+def cmd_convert(args) -> None:
+    from json_to_csv_converter import convert_json_to_csv
+    inputs = args.input[0] if len(args.input) == 1 else args.input
+    convert_json_to_csv(inputs, args.output, args.batch_size, args.workers, args.columnar_dir)
+
+def cmd_generate(args) -> None:
+    if args.shards:
+        from create_synthetic_dataset import generate_synthetic_dataset_parallel
+        generate_synthetic_dataset_parallel(args.output, args.size, args.shards, args.workers, args.seed,
+                                            args.merge_output)
+    else:
+        from create_synthetic_dataset import generate_synthetic_dataset
+        generate_synthetic_dataset(args.output, args.size, args.seed)
+
+def cmd_dedup(args) -> None:
+    from deduplication import deduplicate
+    deduplicate(args.input, args.output, args.clusters, threshold=args.threshold, chunksize=args.chunksize,
+                workers=args.workers)
+
+def cmd_network(args) -> None:
+    from collaboration_network import build_network, network_report
+    network = build_network(args.input, args.chunksize, args.max_team_size)
+    summary = network_report(network, args.top, args.author, args.institution)
+    sys.stdout.write(json.dumps(summary, indent=2, ensure_ascii=False) + '\n')
+
+def cmd_fetch(args) -> None:
+    from download_sample_data import download_sample_data
+    download_sample_data(args.output, args.max_records, args.queries, api_url=args.api_url, rate=args.rate,
+                         concurrency=args.concurrency, cache_dir=None if args.no_cache else args.cache_dir)
+
+def cmd_sample(args) -> None:
+    from create_sample_dataset import create_sample_dataset
+    create_sample_dataset(args.input, args.output, args.size, args.seed, args.stratify)
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='covidfs', description="COVID-19 paper few-shot classification tools")
+    parser.add_argument('--timings', action='store_true', help="Report startup and command time on stderr")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    def model_options(sub):
+        sub.add_argument('--model', default='all-MiniLM-L6-v2')
+        sub.add_argument('--categories', help="JSON file mapping category -> example sentences")
+        sub.add_argument('--cache-dir', help="Embedding cache directory")
+        sub.add_argument('--prototypes', help="Prototype artifact from save_prototypes")
+        sub.add_argument('--token-budget', type=int, help="Batch by token budget instead of item count")
+        sub.add_argument('--quantize', action='store_true', help="Dynamic int8 model for CPU inference")
+        sub.add_argument('--embedding-dtype', choices=['float32', 'float16', 'int8'], default='float32',
+                         help="Storage of cached embeddings")
+
+    classify = subparsers.add_parser('classify', help="Classify the abstracts of a papers CSV or corpus")
+    classify.add_argument('input', help="Papers CSV, columnar corpus, or - for one text per line on stdin")
+    classify.add_argument('--output', default='classification_results.csv')
+    model_options(classify)
+    classify.add_argument('--daemon', help=f"host:port of a `covidfs serve` daemon (default: ${DAEMON_ENV_VAR})")
+    classify.add_argument('--chunksize', type=int, default=10000)
+    classify.add_argument('--batch-size', type=int, default=64)
+    classify.add_argument('--metrics-file', help="Write stage timings (.json or .prom)")
+    classify.add_argument('--cascade', action='store_true',
+                          help="Resolve confident abstracts with a lexical model; only the rest use the transformer")
+    classify.add_argument('--calibration-size', type=int, default=2000,
+                          help="Abstracts used to fit and calibrate the --cascade first stage")
+    classify.add_argument('--target-agreement', type=float, default=0.97,
+                          help="Required agreement of the --cascade first stage with the transformer")
+    classify.set_defaults(handler=cmd_classify)
+
+    serve = subparsers.add_parser('serve', help="Keep the model resident and serve classify requests")
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--port', type=int, default=8000)
+    model_options(serve)
+    serve.add_argument('--max-batch-size', type=int, default=32)
+    serve.add_argument('--max-wait-ms', type=float, default=5.0)
+    serve.set_defaults(handler=cmd_serve)
+
+    convert = subparsers.add_parser('convert', help="Convert synthetic JSON/JSONL papers to CSV")
+    convert.add_argument('input', nargs='+', help="JSON/JSONL file, or several shard files")
+    convert.add_argument('--output', default='synthetic_covid19_papers.csv')
+    convert.add_argument('--batch-size', type=int, default=10000)
+    convert.add_argument('--workers', type=int)
+    convert.add_argument('--columnar-dir', help="Also write a columnar corpus to this directory")
+    convert.set_defaults(handler=cmd_convert)
+
+    generate = subparsers.add_parser('generate', help="Generate a synthetic papers dataset")
+    generate.add_argument('--output', default='synthetic_covid19_papers.json',
+                          help="JSON file, or the shard directory with --shards")
+    generate.add_argument('--size', type=int, default=500)
+    generate.add_argument('--seed', type=int)
+    generate.add_argument('--shards', type=int, help="Generate this many JSONL shards in parallel")
+    generate.add_argument('--workers', type=int)
+    generate.add_argument('--merge-output', help="With --shards, also concatenate the shards into this file")
+    generate.set_defaults(handler=cmd_generate)
+
+    dedup = subparsers.add_parser('dedup', help="Remove near-duplicate papers (MinHash/LSH) before classifying")
+    dedup.add_argument('input', help="Papers CSV, e.g. CORD-19 metadata.csv")
+    dedup.add_argument('output')
+    dedup.add_argument('--clusters', help="Also write the duplicate clusters to this CSV")
+    dedup.add_argument('--threshold', type=float, default=0.7, help="Jaccard similarity of duplicates")
+    dedup.add_argument('--chunksize', type=int, default=10000)
+    dedup.add_argument('--workers', type=int)
+    dedup.set_defaults(handler=cmd_dedup)
+
+    network = subparsers.add_parser('network', help="Co-authorship and institution collaboration statistics")
+    network.add_argument('input', help="Papers JSON/JSONL, CSV or columnar corpus")
+    network.add_argument('--chunksize', type=int, default=10000)
+    network.add_argument('--max-team-size', type=int, help="Leave papers with more authors out of the graphs")
+    network.add_argument('--top', type=int, default=10)
+    network.add_argument('--author', action='append', default=[], help="Also list this author's top collaborators")
+    network.add_argument('--institution', action='append', default=[],
+                         help="Also list this institution's top collaborating institutions")
+    network.set_defaults(handler=cmd_network)
+
+    fetch = subparsers.add_parser('fetch', help="Download papers from the Semantic Scholar API (resumable)")
+    fetch.add_argument('--output', default='cord19_sample.json',
+                       help="JSON array output; a .jsonl output is written directly")
+    fetch.add_argument('--queries', nargs='+', help="Search queries (default: a set of COVID-19 topics)")
+    fetch.add_argument('--max-records', type=int, default=1000, help="Papers fetched per query")
+    fetch.add_argument('--api-url', default='https://api.semanticscholar.org/graph/v1/paper/search/bulk')
+    fetch.add_argument('--rate', type=float, default=1.0, help="Requests per second")
+    fetch.add_argument('--concurrency', type=int, default=4)
+    fetch.add_argument('--cache-dir', default='.s2_cache')
+    fetch.add_argument('--no-cache', action='store_true')
+    fetch.set_defaults(handler=cmd_fetch)
+
+    sample = subparsers.add_parser('sample', help="Reservoir-sample papers from a metadata file")
+    sample.add_argument('input')
+    sample.add_argument('output')
+    sample.add_argument('--size', type=int, default=100)
+    sample.add_argument('--seed', type=int)
+    sample.add_argument('--stratify', action='store_true', help="Sample --size papers per category")
+    sample.set_defaults(handler=cmd_sample)
+    return parser
+
+def main(argv: list = None) -> None:
+    args = build_parser().parse_args(argv)
+    if args.command == 'generate' and args.shards and args.seed is None:
+        args.seed = 42
+    started = time.perf_counter()
+    args.handler(args)
+    if args.timings:
+        finished = time.perf_counter()
+        logger.info(f"Startup {(started - _START) * 1000:.1f}ms, {args.command} {(finished - started) * 1000:.1f}ms, "
+                    f"total {(finished - _START) * 1000:.1f}ms (interpreter start not included)")
+
+if __name__ == "__main__":
+    main()
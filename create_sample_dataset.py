@@ -1,6 +1,7 @@
+import csv
 import json
-import pandas as pd
 import random
+import sys
 from pathlib import Path
 import logging
 
@@ -11,38 +12,80 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def create_sample_dataset(input_file: str, output_file: str, sample_size: int = 100):
+def assign_category(paper: dict) -> dict:
+    """Use the paper's first keyword as a simple few-shot category."""
+    keywords = paper.get('keywords', [])
+    if isinstance(keywords, str):
+        keywords = [k.strip() for k in keywords.split(';') if k.strip()]
+    if keywords:
+        paper['category'] = keywords[0]
+    else:
+        paper['category'] = 'uncategorized'
+    return paper
+
+def iter_records(input_file: str):
+    """Stream papers from a JSON array, JSONL or CSV file without loading it whole."""
+    if Path(input_file).suffix.lower() == '.csv':
+        csv.field_size_limit(min(sys.maxsize, 2 ** 31 - 1))
+        with open(input_file, 'r', encoding='utf-8', newline='') as f:
+            yield from csv.DictReader(f)
+    else:
+        # Imported here so sampling a CSV does not load pandas with the converter
+        from json_to_csv_converter import iter_json_records
+        yield from iter_json_records(input_file)
+
+class ReservoirSampler:
+    """Uniform fixed-size sample of a stream of unknown length (Algorithm R)."""
+
+    def __init__(self, size: int, rng: random.Random):
+        self.size = size
+        self.rng = rng
+        self.seen = 0
+        self.items = []
+
+    def add(self, item) -> None:
+        self.seen += 1
+        if len(self.items) < self.size:
+            self.items.append(item)
+        else:
+            slot = self.rng.randrange(self.seen)
+            if slot < self.size:
+                self.items[slot] = item
+
+def create_sample_dataset(input_file: str, output_file: str, sample_size: int = 100,
+                          seed: int = None, stratify: bool = False):
     """
     Create a smaller sample dataset from the CORD-19 metadata.
     
+    The input is read in a single streaming pass with reservoir sampling, so
+    memory use depends on sample_size rather than on the size of the input.
+    
     Args:
-        input_file (str): Path to the input JSON metadata file
+        input_file (str): Path to the input metadata file (JSON array, JSONL or CSV)
         output_file (str): Path to save the sampled dataset
-        sample_size (int): Number of papers to include in the sample
+        sample_size (int): Number of papers to include in the sample, or the
+            number per category when stratify is set
+        seed (int, optional): Seed for a reproducible sample
+        stratify (bool): Keep a separate reservoir of sample_size papers per category
     """
     try:
-        # Read the JSON file
-        logger.info(f"Reading input file: {input_file}")
-        with open(input_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        rng = random.Random(seed)
+        logger.info(f"Streaming input file: {input_file}")
         
-        # Ensure we don't try to sample more than available
-        total_papers = len(data)
-        sample_size = min(sample_size, total_papers)
+        # Categories are assigned on the fly from each paper's first keyword
+        reservoirs = {}
+        total_papers = 0
+        for paper in iter_records(input_file):
+            paper = assign_category(paper)
+            key = paper['category'] if stratify else None
+            if key not in reservoirs:
+                reservoirs[key] = ReservoirSampler(sample_size, rng)
+            reservoirs[key].add(paper)
+            total_papers += 1
         
-        # Randomly sample papers
-        logger.info(f"Sampling {sample_size} papers from {total_papers} total papers")
-        sampled_data = random.sample(data, sample_size)
-        
-        # Create categories for few-shot learning
-        # We'll categorize papers based on their keywords/topics
-        for paper in sampled_data:
-            keywords = paper.get('keywords', [])
-            if keywords:
-                # Use the first keyword as a simple category
-                paper['category'] = keywords[0]
-            else:
-                paper['category'] = 'uncategorized'
+        sampled_data = [paper for reservoir in reservoirs.values() for paper in reservoir.items]
+        rng.shuffle(sampled_data)
+        logger.info(f"Sampled {len(sampled_data)} papers from {total_papers} total papers")
         
         # Save the sampled dataset
         logger.info(f"Saving sampled dataset to: {output_file}")
@@ -1,6 +1,10 @@
 import json
+import os
 import random
-from datetime import datetime, timedelta
+import shutil
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
 import logging
 import numpy as np
 from faker import Faker
@@ -142,179 +146,280 @@ TITLE_TEMPLATES = {
     ]
 }
 
-def generate_authors(num_authors=None):
-    """Generate a realistic list of authors with affiliations."""
-    if num_authors is None:
-        # Slightly increase the range for more variety
-        num_authors = random.randint(3, 10)
+ABSTRACT_BACKGROUNDS = [
+    "The COVID-19 pandemic continues to present significant challenges in {category} and healthcare management.",
+    "Understanding the role of {category} in COVID-19 remains crucial for effective pandemic response.",
+    "Recent advances in COVID-19 {category} have opened new avenues for research and intervention.",
+    "The emergence of new SARS-CoV-2 variants necessitates ongoing research in {category}.",
+    "Global efforts to combat COVID-19 through {category} continue to evolve.",
+    "The dynamic nature of SARS-CoV-2 highlights the importance of {category} research."
+]
+
+ABSTRACT_CONCLUSIONS = [
+    "These results suggest important implications for future {category} strategies in managing COVID-19.",
+    "Our findings provide valuable insights for optimizing {category} approaches in COVID-19 patients.",
+    "This study contributes to the growing body of evidence supporting the importance of {category} in COVID-19 management.",
+    "Further research is warranted to validate these findings in larger patient populations.",
+    "These insights may help inform evidence-based guidelines for {category} in COVID-19.",
+    "Our results highlight the need for continued investigation into {category} aspects of COVID-19."
+]
+
+STUDY_DESIGNS = ['prospective', 'retrospective', 'observational', 'multicenter', 'longitudinal', 'cross-sectional']
+STUDY_VERBS = ['investigated', 'evaluated', 'analyzed', 'examined', 'assessed', 'explored']
+
+TREATMENTS = ['Remdesivir', 'Dexamethasone', 'Monoclonal Antibodies', 'Baricitinib', 'Tocilizumab']
+STUDY_TYPES = ['Randomized Controlled Trial', 'Systematic Review', 'Meta-analysis', 'Prospective Study', 'Multicenter Study']
+LOCATIONS = ['US', 'European', 'International', 'Multicenter', 'Single-Center']
+VACCINE_TYPES = ['mRNA', 'Adenovirus-vectored', 'Protein Subunit', 'Inactivated']
+TRIAL_PHASES = ['1', '2', '3', '2/3']
+POPULATIONS = ['Healthy Adults', 'Elderly Population', 'Healthcare Workers', 'High-risk Individuals']
+
+TITLE_PREFIXES = [
+    "A Comprehensive Analysis of",
+    "Novel Insights into",
+    "Investigating",
+    "Understanding",
+    "Characterizing"
+]
+
+TITLE_SUFFIXES = [
+    "in COVID-19 Patients",
+    "during the COVID-19 Pandemic",
+    "in SARS-CoV-2 Infection",
+    "in the Context of COVID-19",
+    "among COVID-19 Cases"
+]
+
+def compute_category_counts(sample_size: int) -> dict:
+    """
+    Split sample_size papers across CATEGORIES with slight natural variation.
+
+    Args:
+        sample_size (int): Number of papers to distribute
+
+    Returns:
+        dict: Number of papers to generate per category, summing to sample_size
+    """
+    # Calculate papers per category with slight variation
+    base_papers = sample_size // len(CATEGORIES)
+    extra_papers = sample_size % len(CATEGORIES)
     
-    authors = []
-    # Select primary institution and some related ones
-    primary_institution = random.choice(INSTITUTIONS)
-    related_institutions = random.sample([i for i in INSTITUTIONS if i != primary_institution], 
-                                      min(num_authors - 1, len(INSTITUTIONS) - 1))
-    all_institutions = [primary_institution] + related_institutions
+    # Create a distribution of papers per category with some natural variation
+    category_counts = {cat: base_papers for cat in CATEGORIES}
+    for i in range(extra_papers):
+        category_counts[CATEGORIES[i]] += 1
+        
+    # Add some random variation (±5%) to make it more natural
+    for cat in CATEGORIES:
+        variation = int(category_counts[cat] * random.uniform(-0.05, 0.05))
+        category_counts[cat] += variation
     
-    for i in range(num_authors):
-        # Higher chance of using primary institution for first authors
-        if i < 2:
-            affiliation = primary_institution
+    # Adjust to ensure we hit exactly sample_size papers
+    total = sum(category_counts.values())
+    if total != sample_size:
+        diff = sample_size - total
+        if diff > 0:
+            for _ in range(diff):
+                category_counts[random.choice(CATEGORIES)] += 1
         else:
-            affiliation = random.choice(all_institutions)
-            
-        author = {
-            'name': fake.name(),
-            'affiliation': affiliation,
-            'email': fake.email()
-        }
-        authors.append(author)
+            for _ in range(abs(diff)):
+                cat = max(category_counts.items(), key=lambda x: x[1])[0]
+                category_counts[cat] -= 1
     
-    return authors
+    return category_counts
 
-def generate_abstract(category, keywords):
-    """Generate a more natural-looking abstract with proper structure."""
-    background = random.choice([
-        f"The COVID-19 pandemic continues to present significant challenges in {category.lower()} and healthcare management.",
-        f"Understanding the role of {category.lower()} in COVID-19 remains crucial for effective pandemic response.",
-        f"Recent advances in COVID-19 {category.lower()} have opened new avenues for research and intervention.",
-        f"The emergence of new SARS-CoV-2 variants necessitates ongoing research in {category.lower()}.",
-        f"Global efforts to combat COVID-19 through {category.lower()} continue to evolve.",
-        f"The dynamic nature of SARS-CoV-2 highlights the importance of {category.lower()} research."
-    ])
+# Number of papers drawn per vectorized pass when streaming shards
+BULK_BLOCK_SIZE = 10000
+
+def build_author_pool(pool_size: int = 5000) -> tuple:
+    """Pre-generate Faker author names and emails to draw from in bulk."""
+    names = np.array([fake.name() for _ in range(pool_size)], dtype=object)
+    emails = np.array([fake.email() for _ in range(pool_size)], dtype=object)
+    return names, emails
+
+def _keyword_table(categories: list) -> tuple:
+    """Keyword lists as a padded array plus per-row lengths, one row per category."""
+    width = max(len(KEYWORDS[cat]) for cat in categories)
+    table = np.full((len(categories), width), '', dtype=object)
+    lengths = np.array([len(KEYWORDS[cat]) for cat in categories])
+    for i, cat in enumerate(categories):
+        table[i, :lengths[i]] = KEYWORDS[cat]
+    return table, lengths
+
+def _sample_columns(rng, n_rows: int, n_cols, k: int) -> np.ndarray:
+    """Draw k distinct column indices per row (n_cols may vary per row) via argsort of random keys."""
+    n_cols = np.broadcast_to(n_cols, (n_rows,))
+    keys = rng.random((n_rows, int(n_cols.max())))
+    keys[np.arange(keys.shape[1]) >= n_cols[:, None]] = np.inf
+    return np.argsort(keys, axis=1)[:, :k]
+
+def generate_papers_bulk(paper_categories, rng, author_pool: tuple,
+                         start_date: datetime = datetime(2020, 1, 1),
+                         end_date: datetime = datetime(2024, 12, 31)) -> list:
+    """
+    Generate many papers at once, drawing every random field as a NumPy array.
     
-    selected_keywords = random.sample(keywords, min(4, len(keywords)))
-    methods = f"In this {random.choice(['prospective', 'retrospective', 'observational', 'multicenter', 'longitudinal', 'cross-sectional'])} study, we {random.choice(['investigated', 'evaluated', 'analyzed', 'examined', 'assessed', 'explored'])} the role of {selected_keywords[0]} and {selected_keywords[1]} in {random.randint(100, 5000)} patients."
+    Produces one dictionary per paper with the dataset's output schema. Dates, citation and reference
+    counts, author counts, affiliations, journals, keywords and template choices
+    are all sampled in one vectorized pass; only the final string assembly runs
+    per paper.
     
-    results = f"Our findings demonstrate significant associations between {selected_keywords[2]} and clinical outcomes (p < {random.uniform(0.001, 0.05):.3f}), with {random.randint(60, 95)}% of patients showing improvement in {selected_keywords[3]}."
+    Args:
+        paper_categories (list): Category of each paper to generate, in output order
+        rng (np.random.Generator): Source of randomness
+        author_pool (tuple): (names, emails) arrays from build_author_pool
+        start_date (datetime): Earliest publication date
+        end_date (datetime): Latest publication date
     
-    conclusion = random.choice([
-        f"These results suggest important implications for future {category.lower()} strategies in managing COVID-19.",
-        f"Our findings provide valuable insights for optimizing {category.lower()} approaches in COVID-19 patients.",
-        f"This study contributes to the growing body of evidence supporting the importance of {category.lower()} in COVID-19 management.",
-        f"Further research is warranted to validate these findings in larger patient populations.",
-        f"These insights may help inform evidence-based guidelines for {category.lower()} in COVID-19.",
-        f"Our results highlight the need for continued investigation into {category.lower()} aspects of COVID-19."
-    ])
+    Returns:
+        list: Paper dictionaries
+    """
+    paper_categories = np.asarray(paper_categories, dtype=object)
+    n = len(paper_categories)
+    if n == 0:
+        return []
+    category_index = {cat: i for i, cat in enumerate(CATEGORIES)}
+    cat_ids = np.array([category_index[cat] for cat in paper_categories])
     
-    return f"{background} {methods} {results} {conclusion}"
-
-def generate_title(category):
-    """Generate a more natural-looking title based on category."""
-    if category in TITLE_TEMPLATES:
-        template = random.choice(TITLE_TEMPLATES[category])
-        if category == 'Treatment':
-            treatment = random.choice(['Remdesivir', 'Dexamethasone', 'Monoclonal Antibodies', 'Baricitinib', 'Tocilizumab'])
-            study_type = random.choice(['Randomized Controlled Trial', 'Systematic Review', 'Meta-analysis', 'Prospective Study', 'Multicenter Study'])
-            location = random.choice(['US', 'European', 'International', 'Multicenter', 'Single-Center'])
-            return template.format(treatment=treatment, study_type=study_type, location=location)
-        elif category == 'Vaccine Development':
-            vaccine_type = random.choice(['mRNA', 'Adenovirus-vectored', 'Protein Subunit', 'Inactivated'])
-            phase = random.choice(['1', '2', '3', '2/3'])
-            population = random.choice(['Healthy Adults', 'Elderly Population', 'Healthcare Workers', 'High-risk Individuals'])
-            return template.format(vaccine_type=vaccine_type, phase=phase, population=population)
+    # Dates biased towards more recent publications
+    days_range = (end_date - start_date).days
+    days = (days_range * rng.random(n) ** 1.5).astype(np.int64)
+    dates = np.datetime_as_string(np.datetime64(start_date.date(), 'D') + days, unit='D')
     
-    # Default title generation for other categories
-    focus_area = random.choice(KEYWORDS[category])
-    prefix = random.choice([
-        "A Comprehensive Analysis of",
-        "Novel Insights into",
-        "Investigating",
-        "Understanding",
-        "Characterizing"
-    ])
-    suffix = random.choice([
-        "in COVID-19 Patients",
-        "during the COVID-19 Pandemic",
-        "in SARS-CoV-2 Infection",
-        "in the Context of COVID-19",
-        "among COVID-19 Cases"
-    ])
+    citation_counts = rng.gamma(2.0, 20.0, n).astype(np.int64)
+    reference_counts = rng.integers(20, 81, n)
+    journals = np.array(JOURNALS, dtype=object)[rng.integers(0, len(JOURNALS), n)]
+    
+    # Authors: each paper has a primary institution plus num_authors - 1 distinct
+    # related ones. The first two authors use the primary institution; later
+    # authors pick uniformly among the primary and the paper's related institutions
+    num_authors = rng.integers(3, 11, n)
+    total_authors = int(num_authors.sum())
+    paper_of_author = np.repeat(np.arange(n), num_authors)
+    position = np.arange(total_authors) - np.repeat(np.cumsum(num_authors) - num_authors, num_authors)
+    n_institutions = len(INSTITUTIONS)
+    primary = rng.integers(0, n_institutions, n)
+    author_primary = primary[paper_of_author]
+    n_related = np.minimum(num_authors - 1, n_institutions - 1)
+    related_offsets = _sample_columns(rng, n, n_institutions - 1, int(n_related.max()))
+    related_institutions = (primary[:, None] + 1 + related_offsets) % n_institutions
+    pick = (rng.random(total_authors) * (n_related[paper_of_author] + 1)).astype(np.int64)
+    other = related_institutions[paper_of_author, np.maximum(pick - 1, 0)]
+    affiliation_ids = np.where((position < 2) | (pick == 0), author_primary, other)
+    affiliations = np.array(INSTITUTIONS, dtype=object)[affiliation_ids]
+    names, emails = author_pool
+    author_names = names[rng.integers(0, len(names), total_authors)]
+    author_emails = emails[rng.integers(0, len(emails), total_authors)]
+    author_bounds = np.concatenate([[0], np.cumsum(num_authors)])
+    
+    # Keywords: the category's own keywords plus two from a random other category,
+    # then six of those without replacement
+    keyword_table, keyword_lengths = _keyword_table(CATEGORIES)
+    related = (cat_ids + 1 + rng.integers(0, len(CATEGORIES) - 1, n)) % len(CATEGORIES)
+    related_cols = _sample_columns(rng, n, keyword_lengths[related], 2)
+    pool_width = keyword_table.shape[1] + 2
+    keyword_pool = np.full((n, pool_width), '', dtype=object)
+    keyword_pool[:, :keyword_table.shape[1]] = keyword_table[cat_ids]
+    own_lengths = keyword_lengths[cat_ids]
+    rows = np.arange(n)
+    keyword_pool[rows, own_lengths] = keyword_table[related, related_cols[:, 0]]
+    keyword_pool[rows, own_lengths + 1] = keyword_table[related, related_cols[:, 1]]
+    selected = np.take_along_axis(keyword_pool, _sample_columns(rng, n, own_lengths + 2, 6), axis=1)
+    
+    # Abstract components
+    abstract_keywords = np.take_along_axis(selected, _sample_columns(rng, n, 6, 4), axis=1)
+    backgrounds = rng.integers(0, len(ABSTRACT_BACKGROUNDS), n)
+    designs = rng.integers(0, len(STUDY_DESIGNS), n)
+    verbs = rng.integers(0, len(STUDY_VERBS), n)
+    patient_counts = rng.integers(100, 5001, n)
+    p_values = rng.uniform(0.001, 0.05, n)
+    improvements = rng.integers(60, 96, n)
+    conclusions = rng.integers(0, len(ABSTRACT_CONCLUSIONS), n)
+    
+    # Title components; each paper only uses the fields its template needs
+    template_picks = rng.random(n)
+    focus_picks = rng.random(n)
+    title_fields = {
+        'treatment': rng.integers(0, len(TREATMENTS), n),
+        'study_type': rng.integers(0, len(STUDY_TYPES), n),
+        'location': rng.integers(0, len(LOCATIONS), n),
+        'vaccine_type': rng.integers(0, len(VACCINE_TYPES), n),
+        'phase': rng.integers(0, len(TRIAL_PHASES), n),
+        'population': rng.integers(0, len(POPULATIONS), n),
+    }
+    prefixes = rng.integers(0, len(TITLE_PREFIXES), n)
+    suffixes = rng.integers(0, len(TITLE_SUFFIXES), n)
+    
+    papers = []
+    for i in range(n):
+        category = paper_categories[i]
+        category_lower = category.lower()
+        if category in TITLE_TEMPLATES:
+            templates = TITLE_TEMPLATES[category]
+            title = templates[int(template_picks[i] * len(templates))].format(
+                treatment=TREATMENTS[title_fields['treatment'][i]],
+                study_type=STUDY_TYPES[title_fields['study_type'][i]],
+                location=LOCATIONS[title_fields['location'][i]],
+                vaccine_type=VACCINE_TYPES[title_fields['vaccine_type'][i]],
+                phase=TRIAL_PHASES[title_fields['phase'][i]],
+                population=POPULATIONS[title_fields['population'][i]]
+            )
+        else:
+            focus_area = KEYWORDS[category][int(focus_picks[i] * len(KEYWORDS[category]))]
+            title = f"{TITLE_PREFIXES[prefixes[i]]} {focus_area.title()} {TITLE_SUFFIXES[suffixes[i]]}"
+        
+        kw = abstract_keywords[i]
+        abstract = (
+            f"{ABSTRACT_BACKGROUNDS[backgrounds[i]].format(category=category_lower)} "
+            f"In this {STUDY_DESIGNS[designs[i]]} study, we {STUDY_VERBS[verbs[i]]} the role of {kw[0]} and {kw[1]} in {patient_counts[i]} patients. "
+            f"Our findings demonstrate significant associations between {kw[2]} and clinical outcomes (p < {p_values[i]:.3f}), with {improvements[i]}% of patients showing improvement in {kw[3]}. "
+            f"{ABSTRACT_CONCLUSIONS[conclusions[i]].format(category=category_lower)}"
+        )
+        
+        start, end = author_bounds[i], author_bounds[i + 1]
+        papers.append({
+            'title': title,
+            'abstract': abstract,
+            'category': category,
+            'date_published': str(dates[i]),
+            'authors': [
+                {'name': name, 'affiliation': affiliation, 'email': email}
+                for name, affiliation, email in zip(
+                    author_names[start:end], affiliations[start:end], author_emails[start:end]
+                )
+            ],
+            'keywords': selected[i].tolist(),
+            'journal': journals[i],
+            'citation_count': int(citation_counts[i]),
+            'reference_count': int(reference_counts[i])
+        })
     
-    return f"{prefix} {focus_area.title()} {suffix}"
+    return papers
 
-def generate_synthetic_dataset(output_file: str = "synthetic_covid19_papers.json", sample_size: int = 500):
+def generate_synthetic_dataset(output_file: str = "synthetic_covid19_papers.json", sample_size: int = 500,
+                               seed: int = None):
     """
     Generate a synthetic dataset of COVID-19 research papers.
     
     Args:
         output_file (str): Path to save the synthetic dataset
         sample_size (int): Number of papers to generate
+        seed (int, optional): Seed for reproducible output
     """
     try:
-        papers = []
-        start_date = datetime(2020, 1, 1)
-        end_date = datetime(2024, 12, 31)
+        if seed is not None:
+            random.seed(seed)
+            fake.seed_instance(seed)
+        rng = np.random.default_rng(seed)
         
         logger.info(f"Generating {sample_size} synthetic papers...")
         
-        # Calculate papers per category with slight variation
-        base_papers = sample_size // len(CATEGORIES)
-        extra_papers = sample_size % len(CATEGORIES)
+        category_counts = compute_category_counts(sample_size)
         
-        # Create a distribution of papers per category with some natural variation
-        category_counts = {cat: base_papers for cat in CATEGORIES}
-        for i in range(extra_papers):
-            category_counts[CATEGORIES[i]] += 1
-            
-        # Add some random variation (±5%) to make it more natural
-        for cat in CATEGORIES:
-            variation = int(category_counts[cat] * random.uniform(-0.05, 0.05))
-            category_counts[cat] += variation
-        
-        # Adjust to ensure we hit exactly sample_size papers
-        total = sum(category_counts.values())
-        if total != sample_size:
-            diff = sample_size - total
-            if diff > 0:
-                for _ in range(diff):
-                    category_counts[random.choice(CATEGORIES)] += 1
-            else:
-                for _ in range(abs(diff)):
-                    cat = max(category_counts.items(), key=lambda x: x[1])[0]
-                    category_counts[cat] -= 1
-        
-        # Generate papers for each category
-        for category, count in category_counts.items():
-            for _ in range(count):
-                # Generate random date with higher probability for more recent dates
-                days_range = (end_date - start_date).days
-                weight = random.uniform(0, 1) ** 1.5  # Bias towards more recent dates
-                random_days = int(days_range * weight)
-                pub_date = start_date + timedelta(days=random_days)
-                
-                # Generate authors
-                authors = generate_authors()
-                
-                # Select keywords with some overlap between categories
-                category_keywords = KEYWORDS[category].copy()
-                other_categories = [c for c in CATEGORIES if c != category]
-                if other_categories:
-                    # Add some keywords from related categories
-                    related_category = random.choice(other_categories)
-                    category_keywords.extend(random.sample(KEYWORDS[related_category], 2))
-                
-                selected_keywords = random.sample(category_keywords, min(6, len(category_keywords)))
-                
-                # Generate citation count with more realistic distribution
-                citation_shape = 2.0
-                citation_scale = 20.0
-                citation_count = int(np.random.gamma(citation_shape, citation_scale))
-                
-                paper = {
-                    'title': generate_title(category),
-                    'abstract': generate_abstract(category, selected_keywords),
-                    'category': category,
-                    'date_published': pub_date.strftime('%Y-%m-%d'),
-                    'authors': authors,
-                    'keywords': selected_keywords,
-                    'journal': random.choice(JOURNALS),
-                    'citation_count': citation_count,
-                    'reference_count': random.randint(20, 80)
-                }
-                papers.append(paper)
-        
-        # Shuffle papers to avoid category clustering
-        random.shuffle(papers)
+        # Shuffle the category order to avoid category clustering, then draw all papers at once
+        paper_categories = [cat for cat, count in category_counts.items() for _ in range(count)]
+        paper_categories = rng.permutation(np.array(paper_categories, dtype=object))
+        papers = generate_papers_bulk(paper_categories, rng, build_author_pool(min(sample_size * 2, 5000)))
         
         # Save the synthetic dataset
         logger.info(f"Saving {len(papers)} papers to {output_file}")
@@ -334,5 +439,101 @@ def generate_synthetic_dataset(output_file: str = "synthetic_covid19_papers.json
         logger.error(f"Error generating synthetic dataset: {str(e)}")
         raise
 
+def _generate_shard(seed_sequence: np.random.SeedSequence, shard_size: int, output_file: str) -> dict:
+    """Generate one shard of papers and stream it to a JSONL file."""
+    # Every shard gets its own deterministic seed for all three generators
+    shard_seed = int(seed_sequence.generate_state(1)[0])
+    random.seed(shard_seed)
+    np.random.seed(shard_seed)
+    fake.seed_instance(shard_seed)
+    rng = np.random.default_rng(seed_sequence)
+    author_pool = build_author_pool()
+    
+    # Shuffle the category order up front so papers can be written block by block
+    category_counts = compute_category_counts(shard_size)
+    shard_categories = [cat for cat, count in category_counts.items() for _ in range(count)]
+    shard_categories = rng.permutation(np.array(shard_categories, dtype=object))
+    
+    with open(output_file, 'w', encoding='utf-8') as f:
+        for start in range(0, len(shard_categories), BULK_BLOCK_SIZE):
+            block = shard_categories[start:start + BULK_BLOCK_SIZE]
+            for paper in generate_papers_bulk(block, rng, author_pool):
+                f.write(json.dumps(paper, ensure_ascii=False))
+                f.write('\n')
+    
+    return category_counts
+
+def merge_shards(shard_files: list, output_file: str) -> None:
+    """Concatenate JSONL shard files, in order, into a single JSONL file."""
+    with open(output_file, 'wb') as out:
+        for shard_file in shard_files:
+            with open(shard_file, 'rb') as f:
+                shutil.copyfileobj(f, out, length=1024 * 1024)
+
+def generate_synthetic_dataset_parallel(
+    output_dir: str = "synthetic_shards",
+    sample_size: int = 1000000,
+    num_shards: int = None,
+    workers: int = None,
+    seed: int = 42,
+    merge_output: str = None
+) -> list:
+    """
+    Generate a large synthetic dataset in parallel as newline-delimited JSON shards.
+    
+    Args:
+        output_dir (str): Directory to write the shard files to
+        sample_size (int): Total number of papers to generate
+        num_shards (int, optional): Number of shards; defaults to one per 100,000 papers
+        workers (int, optional): Number of worker processes; defaults to the CPU count
+        seed (int): Base seed; each shard gets an independent child of SeedSequence(seed)
+        merge_output (str, optional): If given, concatenate all shards into this JSONL file
+    
+    Returns:
+        list: Paths of the generated shard files
+    """
+    try:
+        if num_shards is None:
+            num_shards = max(1, -(-sample_size // 100000))
+        num_shards = max(1, min(num_shards, sample_size))
+        workers = workers or os.cpu_count() or 1
+        
+        output_path = Path(output_dir)
+        output_path.mkdir(parents=True, exist_ok=True)
+        
+        # Spread any remainder over the first shards
+        base, extra = divmod(sample_size, num_shards)
+        shard_sizes = [base + (1 if i < extra else 0) for i in range(num_shards)]
+        shard_files = [str(output_path / f"shard-{i:05d}.jsonl") for i in range(num_shards)]
+        
+        logger.info(f"Generating {sample_size} synthetic papers in {num_shards} shards with {workers} workers...")
+        
+        # Spawned child seeds, unlike seed + i, do not overlap between runs with nearby base seeds
+        shard_seeds = np.random.SeedSequence(seed).spawn(num_shards)
+        categories = {}
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(_generate_shard, shard_seed, size, shard_file)
+                for shard_seed, size, shard_file in zip(shard_seeds, shard_sizes, shard_files)
+            ]
+            for future in as_completed(futures):
+                for cat, count in future.result().items():
+                    categories[cat] = categories.get(cat, 0) + count
+        
+        if merge_output:
+            logger.info(f"Merging {num_shards} shards into {merge_output}")
+            merge_shards(shard_files, merge_output)
+        
+        logger.info("Synthetic dataset created successfully")
+        logger.info("\nCategory distribution:")
+        for cat, count in categories.items():
+            logger.info(f"  {cat}: {count} papers")
+        
+        return shard_files
+        
+    except Exception as e:
+        logger.error(f"Error generating synthetic dataset: {str(e)}")
+        raise
+
 if __name__ == "__main__":
     generate_synthetic_dataset() 
\ No newline at end of file
@@ -0,0 +1,98 @@
+import pandas as pd
+import logging
+from columnar_corpus import ColumnarCorpus, is_corpus
+from instrumentation import metrics
+
+logger = logging.getLogger(__name__)
+
+# Columns read by default: enough for classification and the notebook analyses
+DEFAULT_COLUMNS = (
+    'cord_uid', 'title', 'abstract', 'category', 'journal', 'source_x',
+    'publish_time', 'date_published', 'citation_count'
+)
+
+# Low-cardinality columns stored as pandas categoricals to keep chunks small
+CATEGORICAL_COLUMNS = ('journal', 'category', 'source_x')
+
+
+def load_data(file_path, nrows=None):
+    """Load the papers CSV or columnar corpus, keeping only rows with non-null abstracts."""
+    with metrics.timer('io_load'):
+        if is_corpus(file_path):
+            df = ColumnarCorpus(file_path).to_frame(stop=nrows)
+        else:
+            df = pd.read_csv(file_path, nrows=nrows)
+    metrics.inc('rows_read', len(df))
+    # Keep only rows with non-null abstracts
+    df = df.dropna(subset=['abstract'])
+    return df
+
+
+def iter_data_chunks(file_path, chunksize=10000, columns=DEFAULT_COLUMNS, required_columns=('abstract',)):
+    """
+    Stream the papers CSV (synthetic or CORD-19 metadata.csv) or a columnar
+    corpus directory in fixed-size chunks.
+
+    Only the requested columns are parsed; columns missing from the file are
+    skipped, so the same call works for both file layouts. Rows missing any
+    of the required columns (by default the abstract) are dropped inside each
+    chunk, keeping peak memory bounded by chunksize rather than by the size of
+    the file.
+
+    Args:
+        file_path (str): Path to the CSV file or columnar corpus directory
+        chunksize (int): Number of rows parsed per chunk
+        columns (tuple): Columns to read, or None for every column
+        required_columns (tuple): Columns that must be non-null for a row to be kept
+
+    Yields:
+        pd.DataFrame: Chunk of papers with non-null required columns
+    """
+    if is_corpus(file_path):
+        # Columns are decoded lazily, so only the requested ones are read from disk
+        corpus = ColumnarCorpus(file_path)
+        names = [col for col in corpus.columns if columns is None or col in columns]
+        for start in range(0, len(corpus), chunksize):
+            with metrics.timer('io_read_chunk'):
+                chunk = corpus.to_frame(names, start, start + chunksize)
+            metrics.inc('rows_read', len(chunk))
+            chunk = chunk.dropna(subset=list(required_columns))
+            if len(chunk):
+                yield chunk
+        logger.info(f"Streamed {len(corpus)} rows from {file_path}")
+        return
+
+    wanted = set(columns) if columns is not None else None
+    dtypes = {col: 'category' for col in CATEGORICAL_COLUMNS}
+    dtypes.update({'title': str, 'abstract': str})
+
+    reader = pd.read_csv(
+        file_path,
+        usecols=(lambda col: col in wanted) if wanted is not None else None,
+        dtype=dtypes,
+        chunksize=chunksize
+    )
+    rows_read = 0
+    while True:
+        # Time only the parsing, not the consumer's work between chunks
+        with metrics.timer('io_read_chunk'):
+            chunk = next(reader, None)
+        if chunk is None:
+            break
+        rows_read += len(chunk)
+        metrics.inc('rows_read', len(chunk))
+        chunk = chunk.dropna(subset=list(required_columns))
+        if len(chunk):
+            yield chunk
+    logger.info(f"Streamed {rows_read} rows from {file_path}")
+
+
+def value_counts_from_chunks(chunks, column):
+    """Accumulate value counts of one column across a stream of chunks."""
+    total = None
+    for chunk in chunks:
+        counts = chunk[column].value_counts()
+        total = counts if total is None else total.add(counts, fill_value=0)
+    if total is None:
+        return pd.Series(dtype='int64')
+    return total.astype('int64').sort_values(ascending=False)
@@ -0,0 +1,293 @@
+import argparse
+import csv
+import os
+import re
+import zlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import logging
+import numpy as np
+import pandas as pd
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Mersenne prime 2^31 - 1: (a * h + b) stays below 2^63, so uint64 arithmetic never overflows
+MERSENNE_PRIME = np.uint64((1 << 31) - 1)
+MAX_HASH = np.uint32((1 << 31) - 1)
+
+TOKEN = re.compile(r'\w+')
+
+# Columns used to fingerprint papers and to choose the canonical record of a cluster
+DEDUP_COLUMNS = ('title', 'abstract', 'doi', 'journal', 'source_x')
+PREPRINT_SOURCES = ('medrxiv', 'biorxiv', 'arxiv')
+
+class MinHasher:
+    """
+    MinHash signatures of word shingles.
+
+    Text is lower-cased and split into word tokens; every run of shingle_size
+    consecutive tokens is hashed, and each of num_perm universal hash functions
+    keeps its minimum over the shingles. The fraction of equal signature
+    positions between two documents estimates the Jaccard similarity of their
+    shingle sets.
+    """
+
+    def __init__(self, num_perm: int = 128, shingle_size: int = 3, seed: int = 1):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, MERSENNE_PRIME, num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, MERSENNE_PRIME, num_perm, dtype=np.uint64)
+        # Multipliers combining consecutive token hashes into one shingle hash
+        self.mix = rng.integers(1, 1 << 63, shingle_size, dtype=np.uint64) | np.uint64(1)
+
+    def shingle_hashes(self, text: str) -> np.ndarray:
+        tokens = TOKEN.findall(text.lower()) if isinstance(text, str) else []
+        if not tokens:
+            return np.zeros(0, dtype=np.uint64)
+        hashes = np.fromiter((zlib.crc32(token.encode('utf-8')) for token in tokens), dtype=np.uint64,
+                             count=len(tokens))
+        size = min(self.shingle_size, len(hashes))
+        span = len(hashes) - size + 1
+        shingles = np.zeros(span, dtype=np.uint64)
+        for offset in range(size):
+            shingles += hashes[offset:offset + span] * self.mix[offset]
+        return shingles
+
+    def signature(self, text: str) -> np.ndarray:
+        """(num_perm,) uint32 signature; all MAX_HASH for text without tokens."""
+        shingles = self.shingle_hashes(text)
+        if not len(shingles):
+            return np.full(self.num_perm, MAX_HASH, dtype=np.uint32)
+        shingles = np.unique(shingles % MERSENNE_PRIME)
+        permuted = (self.a[:, None] * shingles[None, :] + self.b[:, None]) % MERSENNE_PRIME
+        return permuted.min(axis=1).astype(np.uint32)
+
+    def signatures(self, texts) -> np.ndarray:
+        signatures = np.empty((len(texts), self.num_perm), dtype=np.uint32)
+        for row, text in enumerate(texts):
+            signatures[row] = self.signature(text)
+        return signatures
+
+def band_keys(signatures: np.ndarray, bands: int) -> np.ndarray:
+    """Hash each of the bands slices of every signature to one uint64 bucket key, shape (n, bands)."""
+    rows = signatures.shape[1] // bands
+    sliced = signatures[:, :bands * rows].reshape(len(signatures), bands, rows).astype(np.uint64)
+    multipliers = np.random.default_rng(0).integers(1, 1 << 63, rows, dtype=np.uint64) | np.uint64(1)
+    return (sliced * multipliers).sum(axis=2)
+
+def _find(parent: np.ndarray, node: int) -> int:
+    root = node
+    while parent[root] != root:
+        root = parent[root]
+    while parent[node] != root:
+        parent[node], node = root, parent[node]
+    return root
+
+def find_clusters(signatures: np.ndarray, bands: int = 32, threshold: float = 0.7,
+                  valid: np.ndarray = None) -> np.ndarray:
+    """
+    Group near-duplicate documents with banded LSH.
+
+    Documents sharing a bucket in any band become candidate pairs; sorting the
+    bucket keys of each band turns bucket lookup into finding runs of equal
+    keys, so the cost is O(n log n) per band instead of O(n^2) comparisons.
+    Each candidate is compared with the first document of its run and merged
+    when the signatures agree on at least threshold of their positions.
+
+    Args:
+        signatures (np.ndarray): (n, num_perm) MinHash signatures
+        bands (int): Number of LSH bands; rows per band is num_perm // bands
+        threshold (float): Minimum estimated Jaccard similarity to merge
+        valid (np.ndarray, optional): Boolean mask of documents to consider
+            (e.g. excluding empty texts, whose signatures all coincide)
+
+    Returns:
+        np.ndarray: Cluster root of every document (a document index)
+    """
+    n = len(signatures)
+    parent = np.arange(n)
+    candidates = np.flatnonzero(valid) if valid is not None else np.arange(n)
+    keys = band_keys(signatures[candidates], bands)
+    compared = merged = 0
+    for band in range(bands):
+        order = np.argsort(keys[:, band], kind='stable')
+        sorted_keys = keys[order, band]
+        starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+        run_first = np.repeat(starts, np.diff(np.r_[starts, len(order)]))
+        others = np.flatnonzero(np.arange(len(order)) != run_first)
+        if not len(others):
+            continue
+        left = candidates[order[run_first[others]]]
+        right = candidates[order[others]]
+        similarity = (signatures[left] == signatures[right]).mean(axis=1)
+        compared += len(left)
+        for i, j in zip(left[similarity >= threshold], right[similarity >= threshold]):
+            root_i, root_j = _find(parent, i), _find(parent, j)
+            if root_i != root_j:
+                parent[max(root_i, root_j)] = min(root_i, root_j)
+                merged += 1
+    logger.info(f"Compared {compared} candidate pairs, merged {merged}")
+    return np.array([_find(parent, i) for i in range(n)])
+
+def choose_canonical(roots: np.ndarray, has_doi: np.ndarray, published: np.ndarray,
+                     abstract_length: np.ndarray) -> np.ndarray:
+    """
+    Canonical record of every cluster: prefer a DOI, then a published (non-preprint)
+    version, then the longest abstract, then the earliest row.
+
+    Returns:
+        np.ndarray: Boolean mask of the rows to keep
+    """
+    rows = np.arange(len(roots))
+    # lexsort sorts by the last key first; the best record of each cluster comes first
+    order = np.lexsort((rows, -abstract_length, ~published, ~has_doi, roots))
+    first = np.r_[True, roots[order][1:] != roots[order][:-1]]
+    keep = np.zeros(len(roots), dtype=bool)
+    keep[order[first]] = True
+    return keep
+
+_worker_hasher = None
+
+def _init_worker(num_perm: int, shingle_size: int, seed: int) -> None:
+    global _worker_hasher
+    _worker_hasher = MinHasher(num_perm, shingle_size, seed)
+
+def _signature_chunk(texts: list) -> np.ndarray:
+    return _worker_hasher.signatures(texts)
+
+def _chunk_features(chunk: pd.DataFrame) -> tuple:
+    """Fingerprint text and canonical-record features of one chunk."""
+    def column(name):
+        return chunk[name] if name in chunk else pd.Series([None] * len(chunk), index=chunk.index)
+    title, abstract = column('title').fillna('').astype(str), column('abstract').fillna('').astype(str)
+    texts = (title + ' ' + abstract).str.strip().tolist()
+    source = column('source_x').fillna('').astype(str).str.lower()
+    preprint = source.str.contains('|'.join(PREPRINT_SOURCES))
+    published = (~preprint & column('journal').notna()).to_numpy()
+    return texts, column('doi').notna().to_numpy(), published, abstract.str.len().to_numpy()
+
+def deduplicate(
+    input_file: str,
+    output_file: str,
+    clusters_file: str = None,
+    num_perm: int = 128,
+    bands: int = 32,
+    threshold: float = 0.7,
+    shingle_size: int = 3,
+    chunksize: int = 10000,
+    workers: int = None,
+    seed: int = 1
+) -> dict:
+    """
+    Remove near-duplicate papers from a CSV, keeping one canonical record per cluster.
+
+    The input is streamed twice in chunks: the first pass computes MinHash
+    signatures (on a process pool unless workers is 1) and canonical-record
+    features, the second copies the kept rows to output_file. Only the
+    signatures, about num_perm * 4 bytes per paper, are held in memory.
+
+    Args:
+        input_file (str): Papers CSV (e.g. CORD-19 metadata.csv)
+        output_file (str): Path of the deduplicated CSV
+        clusters_file (str, optional): Write row, cluster and kept flag for every
+            row that belongs to a cluster of two or more
+        num_perm (int): MinHash signature length
+        bands (int): LSH bands; with 128 permutations, 32 bands of 4 rows make
+            pairs above 0.6 Jaccard similarity candidates with over 95% probability
+        threshold (float): Estimated Jaccard similarity at which two papers are duplicates
+        shingle_size (int): Words per shingle
+        chunksize (int): Rows per chunk
+        workers (int, optional): Worker processes for the signatures; 1 runs in-process
+        seed (int): Seed of the MinHash functions
+
+    Returns:
+        dict: Number of rows read and kept, duplicates removed and duplicate clusters
+    """
+    try:
+        logger.info(f"Fingerprinting papers in {input_file}")
+        usecols = lambda col: col in DEDUP_COLUMNS
+        feature_chunks, signature_chunks = [], []
+        chunks = pd.read_csv(input_file, usecols=usecols, dtype=str, chunksize=chunksize)
+
+        if workers == 1:
+            hasher = MinHasher(num_perm, shingle_size, seed)
+            for chunk in chunks:
+                texts, *features = _chunk_features(chunk)
+                feature_chunks.append(features)
+                signature_chunks.append(hasher.signatures(texts))
+        else:
+            workers = workers or os.cpu_count() or 1
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(num_perm, shingle_size, seed)) as executor:
+                # Keep a bounded number of chunks in flight to cap memory
+                pending = deque()
+                for chunk in chunks:
+                    texts, *features = _chunk_features(chunk)
+                    feature_chunks.append(features)
+                    pending.append(executor.submit(_signature_chunk, texts))
+                    while len(pending) >= 2 * workers:
+                        signature_chunks.append(pending.popleft().result())
+                while pending:
+                    signature_chunks.append(pending.popleft().result())
+
+        if not signature_chunks:
+            raise ValueError(f"No rows in {input_file}")
+        signatures = np.vstack(signature_chunks)
+        has_doi, published, abstract_length = (np.concatenate(parts) for parts in zip(*feature_chunks))
+        valid = (signatures != MAX_HASH).any(axis=1)
+
+        roots = find_clusters(signatures, bands, threshold, valid)
+        keep = choose_canonical(roots, has_doi, published, abstract_length)
+
+        logger.info(f"Writing deduplicated papers to {output_file}")
+        start = 0
+        for i, chunk in enumerate(pd.read_csv(input_file, dtype=str, keep_default_na=False, chunksize=chunksize)):
+            chunk[keep[start:start + len(chunk)]].to_csv(output_file, mode='w' if i == 0 else 'a', header=i == 0,
+                                                        index=False, encoding='utf-8')
+            start += len(chunk)
+
+        cluster_sizes = np.bincount(roots, minlength=len(roots))
+        in_cluster = cluster_sizes[roots] > 1
+        if clusters_file:
+            rows = np.flatnonzero(in_cluster)
+            with open(clusters_file, 'w', encoding='utf-8', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(['row', 'cluster', 'kept'])
+                writer.writerows(zip(rows.tolist(), roots[rows].tolist(), keep[rows].tolist()))
+
+        stats = {
+            'rows': len(roots),
+            'kept': int(keep.sum()),
+            'duplicates_removed': int((~keep).sum()),
+            'duplicate_clusters': int((cluster_sizes > 1).sum())
+        }
+        logger.info(f"Removed {stats['duplicates_removed']} duplicates in {stats['duplicate_clusters']} clusters; "
+                    f"kept {stats['kept']} of {stats['rows']} papers")
+        return stats
+
+    except Exception as e:
+        logger.error(f"Error deduplicating papers: {str(e)}")
+        raise
+
+def main():
+    parser = argparse.ArgumentParser(description="Remove near-duplicate papers with MinHash/LSH")
+    parser.add_argument('input', help="Papers CSV, e.g. CORD-19 metadata.csv")
+    parser.add_argument('output', help="Deduplicated CSV to write")
+    parser.add_argument('--clusters', help="Also write the duplicate clusters to this CSV")
+    parser.add_argument('--threshold', type=float, default=0.7)
+    parser.add_argument('--num-perm', type=int, default=128)
+    parser.add_argument('--bands', type=int, default=32)
+    parser.add_argument('--chunksize', type=int, default=10000)
+    parser.add_argument('--workers', type=int)
+    args = parser.parse_args()
+    deduplicate(args.input, args.output, args.clusters, args.num_perm, args.bands, args.threshold,
+                chunksize=args.chunksize, workers=args.workers)
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,16 @@
-import requests
+import argparse
+import asyncio
+import hashlib
 import json
 import logging
+import os
+import random
+import textwrap
 import time
+from collections import Counter
 from pathlib import Path
+import aiohttp
+from aiohttp import web
 
 # Set up logging
 logging.basicConfig(
@@ -11,81 +19,500 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def download_sample_data(output_file: str = "cord19_sample.json", sample_size: int = 20):
+# Bulk search pages with a continuation token (up to 1000 papers per page) instead of offsets
+API_URL = "https://api.semanticscholar.org/graph/v1/paper/search/bulk"
+# Counts instead of the full citations/references lists, which were only ever passed to len()
+FIELDS = "paperId,title,abstract,year,authors,venue,citationCount,referenceCount"
+DEFAULT_QUERIES = ["COVID-19 treatment", "COVID-19 vaccine", "COVID-19 diagnosis", "COVID-19 epidemiology"]
+CATEGORY_KEYWORDS = ['treatment', 'vaccine', 'diagnosis', 'epidemiology']
+
+CACHE_DIR = '.s2_cache'
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+API_KEY_ENV_VAR = 'S2_API_KEY'
+USER_AGENT = ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) '
+              'Chrome/91.0.4472.124 Safari/537.36')
+
+def process_paper(paper: dict) -> dict:
+    """Transform an API paper into the sample record layout."""
+    # Simple keyword categorization from the title and abstract
+    text = f"{paper.get('title') or ''} {paper.get('abstract') or ''}".lower()
+    category = next((k for k in CATEGORY_KEYWORDS if k in text), 'general')
+    return {
+        'paper_id': paper.get('paperId'),
+        'title': paper.get('title') or '',
+        'abstract': paper.get('abstract') or '',
+        'year': paper.get('year'),
+        'authors': [author.get('name', '') for author in paper.get('authors') or []],
+        'venue': paper.get('venue') or '',
+        'citation_count': paper.get('citationCount') or 0,
+        'reference_count': paper.get('referenceCount') or 0,
+        'category': f'covid-19-{category}'
+    }
+
+class RateLimiter:
+    """
+    Token bucket shared by every request of a crawl.
+
+    Requests are admitted at `rate` per second on average with bursts of up to
+    `burst`. A 429 with Retry-After pauses the whole bucket, so concurrent
+    requests back off together instead of each hitting the limit in turn.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.not_before = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.not_before:
+                    await asyncio.sleep(self.not_before - now)
+                    continue
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def pause(self, seconds: float) -> None:
+        self.not_before = max(self.not_before, time.monotonic() + seconds)
+
+class ResponseCache:
+    """On-disk store of successful API responses, keyed by URL and query parameters."""
+
+    def __init__(self, cache_dir: str):
+        self.directory = Path(cache_dir)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, url: str, params: dict) -> Path:
+        key = json.dumps([url, sorted(params.items())], ensure_ascii=False)
+        return self.directory / f"{hashlib.blake2b(key.encode('utf-8'), digest_size=16).hexdigest()}.json"
+
+    def get(self, url: str, params: dict):
+        path = self._path(url, params)
+        if not path.exists():
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def put(self, url: str, params: dict, payload: dict) -> None:
+        path = self._path(url, params)
+        tmp_path = path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(payload, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+class Checkpoint:
+    """
+    Crawl progress per query: the continuation token of the next page, how many
+    records of that page were already used, and the records fetched so far.
+
+    Saved after every page, once that page's records are on disk, so an
+    interrupted crawl resumes at the first page it had not finished.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.queries = {}
+        if path and os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self.queries = json.load(f)['queries']
+
+    def state(self, query: str) -> dict:
+        return self.queries.setdefault(query, {'token': None, 'offset': 0, 'fetched': 0, 'exhausted': False})
+
+    def update(self, query: str, token, offset: int, fetched: int, exhausted: bool) -> None:
+        self.queries[query] = {'token': token, 'offset': offset, 'fetched': fetched, 'exhausted': exhausted}
+        self.save()
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'queries': self.queries}, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+class JsonlWriter:
+    """
+    Append records to a JSONL file, skipping papers already written.
+
+    On open, the ids already in the file are loaded and a partial last line
+    left by an interrupted run is cut off, so resuming never duplicates or
+    corrupts records.
     """
-    Download and create a sample dataset from the Semantic Scholar COVID-19 Open Research Dataset.
-    This uses the Semantic Scholar API to get a small sample of COVID-19 related papers.
-    
+
+    def __init__(self, output_file: str):
+        self.output_file = output_file
+        self.seen = set()
+        self.written = 0
+        self.duplicates = 0
+        if os.path.exists(output_file):
+            self._recover()
+        self._file = open(output_file, 'a', encoding='utf-8')
+
+    def _recover(self) -> None:
+        valid_bytes = 0
+        with open(self.output_file, 'rb') as f:
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                self.seen.add(json.loads(line).get('paper_id'))
+                valid_bytes += len(line)
+        if valid_bytes < os.path.getsize(self.output_file):
+            logger.warning(f"Dropping a partial last record from {self.output_file}")
+            with open(self.output_file, 'rb+') as f:
+                f.truncate(valid_bytes)
+        logger.info(f"Resuming {self.output_file} with {len(self.seen)} records")
+
+    def write(self, records: list) -> None:
+        for record in records:
+            if record['paper_id'] is not None and record['paper_id'] in self.seen:
+                self.duplicates += 1
+                continue
+            self.seen.add(record['paper_id'])
+            self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+            self.written += 1
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+class BulkFetcher:
+    """
+    Concurrent Semantic Scholar bulk-search client.
+
+    Queries are crawled concurrently over one pooled aiohttp session; the pages
+    of a query follow each other through continuation tokens. Every request
+    passes a shared rate limiter, 429 and 5xx responses are retried with
+    exponential backoff and full jitter, and successful responses are cached on
+    disk so a repeated or resumed crawl does not spend API requests on pages it
+    has already seen.
+    """
+
+    def __init__(self, api_url: str = API_URL, fields: str = FIELDS, rate: float = 1.0, burst: int = 1,
+                 concurrency: int = 4, max_retries: int = 8, backoff_base: float = 1.0, backoff_cap: float = 60.0,
+                 timeout: float = 60.0, cache_dir: str = CACHE_DIR, api_key: str = None):
+        """
+        Args:
+            api_url (str): Bulk search endpoint
+            fields (str): Paper fields requested from the API
+            rate (float): Requests per second across the whole crawl
+            burst (int): Requests that may be sent back to back
+            concurrency (int): Queries crawled at the same time (and pooled connections)
+            max_retries (int): Retries of a request after 429, 5xx or a connection error
+            backoff_base (float): Upper bound of the first retry delay, doubled per retry
+            backoff_cap (float): Largest retry delay
+            timeout (float): Total timeout of one request in seconds
+            cache_dir (str, optional): Response cache directory; None disables caching
+            api_key (str, optional): Semantic Scholar API key (default: $S2_API_KEY)
+        """
+        self.api_url = api_url
+        self.fields = fields
+        self.rate = rate
+        self.burst = burst
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.timeout = timeout
+        self.cache = ResponseCache(cache_dir) if cache_dir else None
+        self.api_key = api_key or os.environ.get(API_KEY_ENV_VAR)
+        self.stats = {'requests': 0, 'cache_hits': 0, 'retries': 0, 'pages': 0}
+
+    async def _get(self, session: aiohttp.ClientSession, limiter: RateLimiter, params: dict) -> dict:
+        if self.cache:
+            cached = self.cache.get(self.api_url, params)
+            if cached is not None:
+                self.stats['cache_hits'] += 1
+                return cached
+
+        for attempt in range(self.max_retries + 1):
+            await limiter.acquire()
+            self.stats['requests'] += 1
+            retry_after = None
+            try:
+                async with session.get(self.api_url, params=params) as response:
+                    if response.status == 200:
+                        payload = await response.json()
+                        if self.cache:
+                            self.cache.put(self.api_url, params, payload)
+                        return payload
+                    if response.status not in RETRY_STATUSES:
+                        response.raise_for_status()
+                    retry_after = response.headers.get('Retry-After')
+                    reason = f"HTTP {response.status}"
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                reason = type(e).__name__
+            if attempt == self.max_retries:
+                raise RuntimeError(f"Giving up on {params.get('query')!r} after {attempt + 1} attempts ({reason})")
+
+            delay = random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+            if retry_after and retry_after.isdigit():
+                # The server says when the limit resets; hold back every request until then
+                delay = max(delay, float(retry_after))
+                limiter.pause(delay)
+            self.stats['retries'] += 1
+            logger.info(f"{reason} for {params.get('query')!r}; retrying in {delay:.2f}s")
+            await asyncio.sleep(delay)
+
+    async def _crawl_query(self, session, limiter, query: str, max_records: int, writer: JsonlWriter,
+                           checkpoint: Checkpoint) -> None:
+        state = checkpoint.state(query)
+        token, offset, fetched, exhausted = state['token'], state['offset'], state['fetched'], state['exhausted']
+        # A later run with a larger max_records continues from the saved position
+        while fetched < max_records and not exhausted:
+            params = {'query': query, 'fields': self.fields}
+            if token:
+                params['token'] = token
+            payload = await self._get(session, limiter, params)
+            self.stats['pages'] += 1
+            data = payload.get('data') or []
+            page = data[offset:]
+            papers = page[:max_records - fetched]
+            writer.write([process_paper(paper) for paper in papers])
+            fetched += len(papers)
+            if len(papers) < len(page):
+                # Stopped inside the page: keep its token and remember how much of it was used
+                offset += len(papers)
+                checkpoint.update(query, token, offset, fetched, exhausted=False)
+                break
+            token, offset = payload.get('token'), 0
+            exhausted = not token or not data
+            checkpoint.update(query, token, offset, fetched, exhausted)
+        logger.info(f"Fetched {fetched} papers for {query!r}")
+
+    async def crawl(self, queries: list, output_file: str, max_records: int = 1000,
+                    checkpoint_file: str = None) -> dict:
+        """
+        Fetch up to max_records papers per query and append them to a JSONL file.
+
+        Args:
+            queries (list): Search queries, crawled concurrently
+            output_file (str): JSONL file; records of an earlier run are kept and not repeated
+            max_records (int): Papers fetched per query
+            checkpoint_file (str, optional): Progress file; defaults to output_file + '.checkpoint'
+
+        Returns:
+            dict: Request, retry, cache-hit and record counts
+        """
+        checkpoint = Checkpoint(checkpoint_file or f"{output_file}.checkpoint")
+        writer = JsonlWriter(output_file)
+        limiter = RateLimiter(self.rate, self.burst)
+        pending = asyncio.Queue()
+        for query in queries:
+            pending.put_nowait(query)
+
+        async def worker(session):
+            while not pending.empty():
+                query = pending.get_nowait()
+                await self._crawl_query(session, limiter, query, max_records, writer, checkpoint)
+
+        headers = {'User-Agent': USER_AGENT}
+        if self.api_key:
+            headers['x-api-key'] = self.api_key
+        connector = aiohttp.TCPConnector(limit=self.concurrency)
+        try:
+            async with aiohttp.ClientSession(connector=connector, headers=headers,
+                                             timeout=aiohttp.ClientTimeout(total=self.timeout)) as session:
+                await asyncio.gather(*(worker(session) for _ in range(min(self.concurrency, len(queries)))))
+        finally:
+            writer.close()
+        return dict(self.stats, written=writer.written, duplicates=writer.duplicates, total=len(writer.seen))
+
+def crawl_file_for(output_file: str) -> str:
+    """JSONL file a crawl appends to: the output itself, or output + 'l' for a .json output."""
+    return f"{output_file}l" if output_file.endswith('.json') else output_file
+
+def summarize_records(jsonl_file: str, json_file: str = None) -> Counter:
+    """
+    Count the categories of a crawl file, optionally exporting it as a JSON array.
+
+    Records are streamed one line at a time, so the export does not hold the
+    crawl in memory. The array has the same layout as json.dump(..., indent=2).
+
     Args:
-        output_file (str): Path to save the sampled dataset
-        sample_size (int): Number of papers to include in the sample
+        jsonl_file (str): JSONL file written by BulkFetcher.crawl
+        json_file (str, optional): JSON array file to (re)write from it
+
+    Returns:
+        Counter: Number of papers per category
     """
+    categories = Counter()
+    out = open(f"{json_file}.tmp", 'w', encoding='utf-8') if json_file else None
     try:
-        # Semantic Scholar API endpoint for COVID-19 papers
-        api_url = "https://api.semanticscholar.org/graph/v1/paper/search"
-        
-        # Parameters for the API request
-        params = {
-            "query": "COVID-19 treatment",
-            "limit": min(sample_size, 20),  # Limit to 20 papers per request
-            "fields": "title,abstract,year,authors,venue,citations,references"
-        }
-        
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        
-        logger.info(f"Downloading {sample_size} papers from Semantic Scholar API")
-        response = requests.get(api_url, params=params, headers=headers)
-        
-        # Handle rate limiting
-        if response.status_code == 429:
-            logger.info("Rate limited. Waiting 5 seconds before retrying...")
-            time.sleep(5)
-            response = requests.get(api_url, params=params, headers=headers)
-        
-        response.raise_for_status()
-        papers = response.json().get('data', [])
-        
-        # Transform the data to match our needs
-        processed_papers = []
-        for paper in papers:
-            # Extract keywords from the title and abstract
-            text = f"{paper.get('title', '')} {paper.get('abstract', '')}"
-            
-            # Simple keyword extraction (you can make this more sophisticated)
-            keywords = ['treatment', 'vaccine', 'diagnosis', 'epidemiology']
-            category = next((k for k in keywords if k.lower() in text.lower()), 'general')
-            
-            processed_paper = {
-                'title': paper.get('title', ''),
-                'abstract': paper.get('abstract', ''),
-                'year': paper.get('year'),
-                'authors': [author.get('name', '') for author in paper.get('authors', [])],
-                'venue': paper.get('venue', ''),
-                'citation_count': len(paper.get('citations', [])),
-                'reference_count': len(paper.get('references', [])),
-                'category': f'covid-19-{category}'
-            }
-            processed_papers.append(processed_paper)
-        
-        # Save the processed papers
-        logger.info(f"Saving {len(processed_papers)} papers to {output_file}")
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(processed_papers, f, indent=2, ensure_ascii=False)
-            
-        logger.info("Sample dataset created successfully")
+        if out:
+            out.write('[')
+        with open(jsonl_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                record = json.loads(line)
+                if out:
+                    out.write(',\n' if categories else '\n')
+                    out.write(textwrap.indent(json.dumps(record, indent=2, ensure_ascii=False), '  '))
+                categories[record['category']] += 1
+        if out:
+            out.write('\n]' if categories else ']')
+    finally:
+        if out:
+            out.close()
+    if json_file:
+        os.replace(f"{json_file}.tmp", json_file)
+    return categories
+
+def download_sample_data(output_file: str = "cord19_sample.json", sample_size: int = 20, queries: list = None,
+                         **options) -> dict:
+    """
+    Download COVID-19 papers from the Semantic Scholar API.
+
+    Papers are appended to a JSONL crawl file as they arrive, so an interrupted
+    download resumes where it stopped when run again with the same output file.
+    A .json output is written as a JSON array from the crawl file
+    (output_file + 'l') once the crawl finishes; any other output is the crawl
+    file itself.
+
+    Args:
+        output_file (str): Path of the JSON or JSONL file to write
+        sample_size (int): Number of papers to fetch per query
+        queries (list, optional): Search queries (default: DEFAULT_QUERIES)
+        **options: BulkFetcher options, e.g. api_url, rate, concurrency, cache_dir
+
+    Returns:
+        dict: Crawl statistics
+    """
+    try:
+        queries = queries or DEFAULT_QUERIES
+        crawl_file = crawl_file_for(output_file)
+        logger.info(f"Downloading up to {sample_size} papers for each of {len(queries)} queries")
+        start = time.perf_counter()
+        stats = asyncio.run(BulkFetcher(**options).crawl(queries, crawl_file, sample_size))
+        logger.info(f"Wrote {stats['written']} new papers ({stats['total']} in total) to {crawl_file} in "
+                    f"{time.perf_counter() - start:.1f}s: {stats['requests']} requests, {stats['retries']} retries, "
+                    f"{stats['cache_hits']} cached pages, {stats['duplicates']} duplicates skipped")
+
+        categories = summarize_records(crawl_file, output_file if crawl_file != output_file else None)
+        logger.info(f"Sample dataset saved to {output_file}")
         logger.info("\nCategory distribution:")
-        categories = {}
-        for paper in processed_papers:
-            cat = paper['category']
-            categories[cat] = categories.get(cat, 0) + 1
         for cat, count in categories.items():
             logger.info(f"  {cat}: {count} papers")
-        
+        return stats
+
     except Exception as e:
         logger.error(f"Error downloading sample data: {str(e)}")
         raise
 
+class StubServer:
+    """
+    Local stand-in for the bulk search endpoint, for testing crawls offline.
+
+    Every query has `total` deterministic papers served in pages of page_size;
+    every tenth paper is shared by all queries so cross-query duplicates occur.
+    A fraction error_rate of requests fails with 429 (with Retry-After: 0) or
+    503, exercising the retry path.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, total: int = 5000, page_size: int = 1000,
+                 error_rate: float = 0.0, latency_ms: float = 0.0, seed: int = 0):
+        self.host = host
+        self.port = port
+        self.total = total
+        self.page_size = page_size
+        self.error_rate = error_rate
+        self.latency_ms = latency_ms
+        self.rng = random.Random(seed)
+        self.requests = 0
+        self._runner = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}/graph/v1/paper/search/bulk"
+
+    def paper(self, query: str, index: int) -> dict:
+        key = f"shared:{index}" if index % 10 == 0 else f"{query}:{index}"
+        paper_id = hashlib.blake2b(key.encode('utf-8'), digest_size=20).hexdigest()
+        rng = random.Random(paper_id)
+        topic = rng.choice(CATEGORY_KEYWORDS)
+        return {
+            'paperId': paper_id,
+            'title': f"{query} study {index}",
+            'abstract': f"We report {topic} findings from {rng.randint(20, 5000)} patients with COVID-19.",
+            'year': rng.randint(2020, 2024),
+            'authors': [{'authorId': str(rng.randint(1, 10 ** 6)), 'name': f"Author {rng.randint(1, 5000)}"}
+                        for _ in range(rng.randint(1, 6))],
+            'venue': rng.choice(['Nature', 'The Lancet', 'medRxiv', 'BMJ']),
+            'citationCount': rng.randint(0, 500),
+            'referenceCount': rng.randint(5, 80)
+        }
+
+    async def _search(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+        if self.rng.random() < self.error_rate:
+            if self.rng.random() < 0.5:
+                return web.json_response({'message': 'Too Many Requests'}, status=429, headers={'Retry-After': '0'})
+            return web.json_response({'message': 'Service Unavailable'}, status=503)
+        query = request.query.get('query')
+        if not query:
+            return web.json_response({'error': 'query is required'}, status=400)
+        start = int(request.query.get('token') or 0)
+        end = min(start + self.page_size, self.total)
+        return web.json_response({
+            'total': self.total,
+            'token': str(end) if end < self.total else None,
+            'data': [self.paper(query, index) for index in range(start, end)]
+        })
+
+    async def start(self) -> None:
+        app = web.Application()
+        app.router.add_get('/graph/v1/paper/search/bulk', self._search)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        # Resolve the port when 0 asked the OS for a free one
+        self.port = self._runner.addresses[0][1]
+        logger.info(f"Stub API listening on {self.url}")
+
+    async def stop(self) -> None:
+        await self._runner.cleanup()
+
+    async def serve_forever(self) -> None:
+        await self.start()
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await self.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description="Download COVID-19 papers from the Semantic Scholar API")
+    parser.add_argument('--output', default='cord19_sample.json',
+                        help="JSON array output; a .jsonl output is written directly")
+    parser.add_argument('--queries', nargs='+', default=DEFAULT_QUERIES)
+    parser.add_argument('--max-records', type=int, default=20, help="Papers fetched per query")
+    parser.add_argument('--api-url', default=API_URL, help="Bulk search endpoint, e.g. a --serve-stub server")
+    parser.add_argument('--rate', type=float, default=1.0, help="Requests per second")
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--cache-dir', default=CACHE_DIR)
+    parser.add_argument('--no-cache', action='store_true')
+    parser.add_argument('--serve-stub', action='store_true', help="Run the local stub API instead of fetching")
+    parser.add_argument('--port', type=int, default=8010, help="Stub server port")
+    parser.add_argument('--total', type=int, default=5000, help="Stub papers per query")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of stub requests failing")
+    args = parser.parse_args()
+
+    if args.serve_stub:
+        try:
+            asyncio.run(StubServer(port=args.port, total=args.total, error_rate=args.error_rate).serve_forever())
+        except KeyboardInterrupt:
+            logger.info("Shutting down")
+        return
+    download_sample_data(args.output, args.max_records, args.queries, api_url=args.api_url, rate=args.rate,
+                         concurrency=args.concurrency, cache_dir=None if args.no_cache else args.cache_dir)
+
 if __name__ == "__main__":
-    download_sample_data() 
\ No newline at end of file
+    main()
@@ -0,0 +1,201 @@
+import hashlib
+import json
+import os
+import re
+from collections import OrderedDict
+from pathlib import Path
+import logging
+import numpy as np
+from quantization import QuantizedEmbeddings
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = 'index.json'
+VECTORS_FILE = 'vectors.f32'
+SCALES_FILE = 'scales.f32'
+KEYS_FILE = 'keys.bin'
+KEY_BYTES = 16
+
+
+def normalize_text(text: str) -> str:
+    """Collapse runs of whitespace so trivially reformatted abstracts share a cache entry."""
+    return ' '.join(str(text).split())
+
+
+def embedding_key(model_name: str, text: str) -> str:
+    """Content address of an embedding: hash of the model name plus the normalized text."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(model_name.encode('utf-8'))
+    digest.update(b'\0')
+    digest.update(normalize_text(text).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Disk-backed, content-addressed store of text embeddings for one model.
+
+    Vectors live in a fixed-size memory-mapped array of float32, float16 or int8
+    codes (int8 with one float32 scale per slot, as in QuantizedEmbeddings);
+    lookups return float32 vectors. A small JSON index
+    maps each key to its slot in least-recently-used order. When the store is
+    full, the least recently used slot is overwritten. Each slot also records
+    the key it holds, so an index left stale by a crash after eviction is
+    detected on read instead of returning another text's vector.
+    """
+
+    def __init__(self, cache_dir: str, model_name: str, max_entries: int = 100000, dtype: str = 'float32'):
+        """
+        Args:
+            cache_dir (str): Root directory of the cache
+            model_name (str): Name of the model whose embeddings are stored
+            max_entries (int): Maximum number of vectors kept on disk
+            dtype (str): Storage of the vectors: 'float32', 'float16' or 'int8'
+        """
+        if dtype not in QuantizedEmbeddings.DTYPES:
+            raise ValueError(f"dtype must be one of {QuantizedEmbeddings.DTYPES}, got {dtype!r}")
+        self.model_name = model_name
+        self.dtype = dtype
+        # Each storage dtype has its own directory; float32 keeps the original layout
+        suffix = '' if dtype == 'float32' else f'-{dtype}'
+        self.directory = Path(cache_dir) / (re.sub(r'[^A-Za-z0-9_.-]+', '_', model_name) + suffix)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.dim = None
+        self.hits = 0
+        self.misses = 0
+        self._slots = OrderedDict()
+        self._free = []
+        self._vectors = None
+        self._scales = None
+        self._keys = None
+        self._load_index()
+
+    def _load_index(self):
+        index_path = self.directory / INDEX_FILE
+        if not index_path.exists():
+            return
+        with open(index_path, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        if index.get('model_name') != self.model_name:
+            logger.warning(f"Ignoring embedding cache index for model {index.get('model_name')}")
+            return
+        if index.get('dtype', 'float32') != self.dtype:
+            logger.warning(f"Ignoring {index.get('dtype', 'float32')} embedding cache index in {self.directory}")
+            return
+        if not (self.directory / KEYS_FILE).exists():
+            logger.warning(f"Ignoring embedding cache in {self.directory} without slot keys")
+            return
+        # The vector file was sized when the cache was created; keep that capacity
+        self.max_entries = index['max_entries']
+        self.dim = index['dim']
+        self._slots = OrderedDict((key, slot) for key, slot in index['entries'])
+        used = set(self._slots.values())
+        self._free = [slot for slot in range(self.max_entries - 1, -1, -1) if slot not in used]
+        self._open_vectors(mode='r+')
+        logger.info(f"Loaded embedding cache with {len(self._slots)} entries from {self.directory}")
+
+    def _open_vectors(self, mode):
+        self._vectors = np.memmap(
+            self.directory / VECTORS_FILE, dtype=self.dtype, mode=mode,
+            shape=(self.max_entries, self.dim)
+        )
+        if self.dtype == 'int8':
+            self._scales = np.memmap(self.directory / SCALES_FILE, dtype=np.float32, mode=mode,
+                                     shape=(self.max_entries,))
+        self._keys = np.memmap(
+            self.directory / KEYS_FILE, dtype=np.uint8, mode=mode,
+            shape=(self.max_entries, KEY_BYTES)
+        )
+
+    def __len__(self):
+        return len(self._slots)
+
+    def get_many(self, texts):
+        """
+        Look up embeddings for a list of texts.
+
+        Args:
+            texts (list): Texts to look up
+
+        Returns:
+            tuple: (vectors, missing) where vectors is a list holding a float32 array
+                or None per text, and missing lists the positions that were not cached
+        """
+        vectors, missing = [], []
+        store = QuantizedEmbeddings(self._vectors, self._scales, self.dtype) if self._vectors is not None else None
+        for position, text in enumerate(texts):
+            key = embedding_key(self.model_name, text)
+            slot = self._slots.get(key)
+            if slot is not None and bytes(self._keys[slot]) != bytes.fromhex(key):
+                # The slot was reused after the index was last flushed
+                del self._slots[key]
+                self._free.append(slot)
+                slot = None
+            if slot is None:
+                self.misses += 1
+                vectors.append(None)
+                missing.append(position)
+            else:
+                self.hits += 1
+                self._slots.move_to_end(key)
+                vectors.append(store.dequantize(slot, slot + 1)[0])
+        return vectors, missing
+
+    def put_many(self, texts, embeddings):
+        """Store one embedding per text, evicting least recently used entries when full."""
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        if self._vectors is None:
+            self.dim = embeddings.shape[1]
+            self._free = list(range(self.max_entries - 1, -1, -1))
+            self._open_vectors(mode='w+')
+        store = QuantizedEmbeddings.quantize(embeddings, self.dtype)
+        for i, text in enumerate(texts):
+            key = embedding_key(self.model_name, text)
+            slot = self._slots.get(key)
+            if slot is None:
+                if self._free:
+                    slot = self._free.pop()
+                else:
+                    _, slot = self._slots.popitem(last=False)
+                self._slots[key] = slot
+            else:
+                self._slots.move_to_end(key)
+            # Clear the slot's key first so a half-written slot never verifies
+            self._keys[slot] = 0
+            self._vectors[slot] = store.codes[i]
+            if self._scales is not None:
+                self._scales[slot] = store.scales[i]
+            self._keys[slot] = np.frombuffer(bytes.fromhex(key), dtype=np.uint8)
+
+    def flush(self):
+        """Write pending vectors and the LRU index to disk."""
+        if self._vectors is None:
+            return
+        self._vectors.flush()
+        if self._scales is not None:
+            self._scales.flush()
+        self._keys.flush()
+        index = {
+            'model_name': self.model_name,
+            'dtype': self.dtype,
+            'dim': self.dim,
+            'max_entries': self.max_entries,
+            'entries': list(self._slots.items())
+        }
+        tmp_path = self.directory / (INDEX_FILE + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f)
+        os.replace(tmp_path, self.directory / INDEX_FILE)
+
+    def stats(self) -> dict:
+        """Hit/miss counters and occupancy of the cache."""
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._slots),
+            'max_entries': self.max_entries,
+            'dtype': self.dtype,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
@@ -0,0 +1,182 @@
+import json
+from pathlib import Path
+import logging
+import numpy as np
+from quantization import QuantizedEmbeddings
+
+logger = logging.getLogger(__name__)
+
+META_FILE = 'index.json'
+
+
+def normalize_rows(matrix):
+    """L2-normalize each row of a 2-D array, leaving all-zero rows untouched."""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _top_k(scores, k):
+    """Indices of the k largest scores, best first."""
+    k = min(k, len(scores))
+    if k == 0:
+        return np.array([], dtype=np.int64)
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]
+
+
+class IVFIndex:
+    """
+    Inverted-file (IVF) index for cosine similarity search over embeddings.
+
+    Vectors are partitioned by spherical k-means into n_lists clusters. A query
+    is compared against the centroids first and then only against the vectors
+    in its nprobe closest clusters; raising nprobe trades latency for recall,
+    and nprobe == n_lists is an exact search. Stored vectors are kept as a
+    QuantizedEmbeddings store, so a float16 or int8 index needs a half or a
+    quarter of the memory of a float32 one.
+    """
+
+    def __init__(self, dim: int, n_lists: int = 256, nprobe: int = 8, dtype: str = 'float32'):
+        """
+        Args:
+            dim (int): Embedding dimension
+            n_lists (int): Number of k-means partitions
+            nprobe (int): Default number of partitions scanned per query
+            dtype (str): Storage of the indexed vectors: 'float32', 'float16' or 'int8'
+        """
+        self.dim = dim
+        self.n_lists = n_lists
+        self.nprobe = nprobe
+        self.dtype = dtype
+        self.centroids = None
+        self.vectors = QuantizedEmbeddings.empty(dim, dtype)
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.assignments = np.zeros(0, dtype=np.int32)
+        self._list_order = None
+        self._list_offsets = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    def train(self, vectors, n_iter: int = 20, sample_size: int = 100000, seed: int = 0) -> None:
+        """Fit the partition centroids with spherical k-means on (a sample of) vectors."""
+        vectors = normalize_rows(vectors)
+        if not len(vectors):
+            logger.error("Cannot train an IVF index without vectors")
+            raise ValueError("cannot build an index from 0 vectors")
+        rng = np.random.default_rng(seed)
+        if len(vectors) > sample_size:
+            vectors = vectors[rng.choice(len(vectors), sample_size, replace=False)]
+        self.n_lists = max(1, min(self.n_lists, len(vectors)))
+        centroids = vectors[rng.choice(len(vectors), self.n_lists, replace=False)].copy()
+        for _ in range(n_iter):
+            assignments = np.argmax(vectors @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, vectors)
+            counts = np.bincount(assignments, minlength=self.n_lists)
+            # Re-seed empty clusters with random points
+            empty = counts == 0
+            sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()))]
+            centroids = normalize_rows(sums)
+        self.centroids = centroids
+
+    def add(self, vectors, ids=None) -> None:
+        """
+        Add vectors to a trained index.
+
+        Args:
+            vectors (np.ndarray): (n, dim) embeddings
+            ids (np.ndarray, optional): int64 id per vector; defaults to consecutive row numbers
+        """
+        if self.centroids is None:
+            raise ValueError("Index must be trained before vectors are added")
+        vectors = normalize_rows(vectors)
+        if ids is None:
+            start = int(self.ids.max()) + 1 if len(self.ids) else 0
+            ids = np.arange(start, start + len(vectors), dtype=np.int64)
+        assignments = np.argmax(vectors @ self.centroids.T, axis=1).astype(np.int32)
+        self.vectors = self.vectors.concatenate(QuantizedEmbeddings.quantize(vectors, self.dtype))
+        self.ids = np.concatenate([self.ids, np.asarray(ids, dtype=np.int64)])
+        self.assignments = np.concatenate([self.assignments, assignments])
+        self._list_order = None
+
+    def build(self, vectors, ids=None, **train_kwargs) -> 'IVFIndex':
+        """Train on and add a bulk set of vectors in one step."""
+        self.train(vectors, **train_kwargs)
+        self.add(vectors, ids)
+        return self
+
+    def _lists(self):
+        """Row numbers grouped by partition, built lazily after adds."""
+        if self._list_order is None:
+            self._list_order = np.argsort(self.assignments, kind='stable')
+            counts = np.bincount(self.assignments, minlength=self.n_lists)
+            self._list_offsets = np.concatenate([[0], np.cumsum(counts)])
+        return self._list_order, self._list_offsets
+
+    def search(self, queries, k: int = 10, nprobe: int = None) -> tuple:
+        """
+        Find the k most similar stored vectors for each query.
+
+        Args:
+            queries (np.ndarray): (n, dim) query embeddings
+            k (int): Number of neighbors per query
+            nprobe (int, optional): Partitions scanned per query (default: self.nprobe)
+
+        Returns:
+            tuple: (ids, similarities), each of shape (n, k); rows are padded
+                with id -1 and similarity -inf when fewer than k vectors are found
+        """
+        queries = normalize_rows(np.atleast_2d(queries))
+        nprobe = min(nprobe or self.nprobe, self.n_lists)
+        result_ids = np.full((len(queries), k), -1, dtype=np.int64)
+        result_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        if len(self) == 0:
+            return result_ids, result_scores
+
+        order, offsets = self._lists()
+        centroid_scores = queries @ self.centroids.T
+        probes = np.argsort(-centroid_scores, axis=1)[:, :nprobe]
+        for q, query in enumerate(queries):
+            candidates = np.concatenate([order[offsets[p]:offsets[p + 1]] for p in probes[q]])
+            if len(candidates) == 0:
+                continue
+            scores = self.vectors.take(candidates).scores(query[None, :])[:, 0]
+            top = _top_k(scores, k)
+            result_ids[q, :len(top)] = self.ids[candidates[top]]
+            result_scores[q, :len(top)] = scores[top]
+        return result_ids, result_scores
+
+    def save(self, path: str) -> None:
+        """Write the index to a directory of .npy files plus a small JSON header."""
+        directory = Path(path)
+        directory.mkdir(parents=True, exist_ok=True)
+        np.save(directory / 'centroids.npy', self.centroids)
+        np.save(directory / 'vectors.npy', self.vectors.codes)
+        if self.vectors.scales is not None:
+            np.save(directory / 'scales.npy', self.vectors.scales)
+        np.save(directory / 'ids.npy', self.ids)
+        np.save(directory / 'assignments.npy', self.assignments)
+        with open(directory / META_FILE, 'w', encoding='utf-8') as f:
+            json.dump({'dim': self.dim, 'n_lists': self.n_lists, 'nprobe': self.nprobe, 'size': len(self),
+                       'dtype': self.dtype}, f)
+        logger.info(f"Saved index with {len(self)} vectors to {directory}")
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> 'IVFIndex':
+        """Load an index saved with save(); vectors are memory-mapped unless mmap is False."""
+        directory = Path(path)
+        with open(directory / META_FILE, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        # Indexes saved before low-precision storage existed are float32
+        index = cls(meta['dim'], meta['n_lists'], meta['nprobe'], meta.get('dtype', 'float32'))
+        mmap_mode = 'r' if mmap else None
+        index.centroids = np.load(directory / 'centroids.npy')
+        scales = np.load(directory / 'scales.npy') if index.dtype == 'int8' else None
+        index.vectors = QuantizedEmbeddings(np.load(directory / 'vectors.npy', mmap_mode=mmap_mode), scales,
+                                            index.dtype)
+        index.ids = np.load(directory / 'ids.npy')
+        index.assignments = np.load(directory / 'assignments.npy')
+        return index
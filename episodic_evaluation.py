@@ -0,0 +1,271 @@
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+import logging
+import numpy as np
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+DEFAULT_K_SHOTS = [1, 2, 3, 5, 10, 15, 20]
+DEFAULT_OUTPUT = 'few_shot_evaluation.json'
+
+# z-score of the two-sided 95% normal confidence interval
+Z_95 = 1.959964
+
+# Largest (episodes x class size) random-key matrix drawn at once; bigger classes
+# are sampled one episode at a time
+MAX_SAMPLE_KEYS = 1 << 22
+
+class EpisodicEvaluator:
+    """
+    k-shot evaluation over precomputed embeddings.
+
+    The labeled corpus is encoded once. Each episode samples k support and q
+    query examples per class, averages the support embeddings into prototypes
+    and scores the queries by cosine similarity, the same rule the classifier
+    uses. Episodes are processed in blocks with array operations: one gather
+    builds every prototype in the block and one batched matrix multiply scores
+    every query, so the cost per episode is a few microseconds of numpy work
+    rather than a model call.
+    """
+
+    def __init__(self, embeddings: np.ndarray, labels, class_names: list = None):
+        """
+        Args:
+            embeddings (np.ndarray): (n, dim) embeddings of the labeled corpus
+            labels (array-like): Class label of each row
+            class_names (list, optional): Class order; defaults to the sorted unique labels
+        """
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        self.embeddings = embeddings / np.maximum(norms, 1e-12)
+        labels = np.asarray(labels, dtype=object)
+        self.class_names = list(class_names) if class_names is not None else sorted(set(labels))
+        self.class_rows = [np.flatnonzero(labels == name) for name in self.class_names]
+        self.min_class_size = min(len(rows) for rows in self.class_rows)
+
+    def _sample(self, rng, n_episodes: int, k: int, q: int) -> tuple:
+        """Row indices of shape (n_episodes, n_classes, k) for support and (.., q) for queries."""
+        support, query = [], []
+        for rows in self.class_rows:
+            if n_episodes * len(rows) <= MAX_SAMPLE_KEYS:
+                # Random keys per episode; the k + q smallest form a uniform sample without replacement
+                keys = rng.random((n_episodes, len(rows)))
+                chosen = np.argpartition(keys, k + q - 1, axis=1)[:, :k + q]
+                order = np.argsort(np.take_along_axis(keys, chosen, axis=1), axis=1)
+                chosen = rows[np.take_along_axis(chosen, order, axis=1)]
+            else:
+                # Memory stays O(k + q) per episode instead of O(class size)
+                chosen = rows[np.stack([rng.choice(len(rows), k + q, replace=False) for _ in range(n_episodes)])]
+            support.append(chosen[:, :k])
+            query.append(chosen[:, k:])
+        return np.stack(support, axis=1), np.stack(query, axis=1)
+
+    def run_block(self, k: int, q: int, n_episodes: int, seed) -> dict:
+        """
+        Run one block of episodes.
+
+        Returns:
+            dict: Per-episode accuracy and macro-F1 arrays plus the summed confusion matrix
+        """
+        rng = np.random.default_rng(seed)
+        n_classes = len(self.class_names)
+        support, query = self._sample(rng, n_episodes, k, q)
+
+        prototypes = self.embeddings[support].mean(axis=2)
+        prototypes /= np.maximum(np.linalg.norm(prototypes, axis=2, keepdims=True), 1e-12)
+        queries = self.embeddings[query.reshape(n_episodes, n_classes * q)]
+        predictions = np.einsum('eqd,ecd->eqc', queries, prototypes).argmax(axis=2)
+        truth = np.repeat(np.arange(n_classes), q)
+
+        # One confusion matrix per episode from a single bincount
+        cells = (np.arange(n_episodes)[:, None] * n_classes + truth[None, :]) * n_classes + predictions
+        confusion = np.bincount(cells.ravel(), minlength=n_episodes * n_classes * n_classes)
+        confusion = confusion.reshape(n_episodes, n_classes, n_classes)
+
+        true_positive = np.diagonal(confusion, axis1=1, axis2=2)
+        predicted = confusion.sum(axis=1)
+        actual = confusion.sum(axis=2)
+        precision = np.divide(true_positive, predicted, out=np.zeros(true_positive.shape), where=predicted > 0)
+        recall = true_positive / actual
+        denominator = precision + recall
+        f1 = np.divide(2 * precision * recall, denominator, out=np.zeros(denominator.shape), where=denominator > 0)
+        return {
+            'accuracy': (predictions == truth).mean(axis=1),
+            'macro_f1': f1.mean(axis=1),
+            'confusion': confusion.sum(axis=0)
+        }
+
+    def evaluate(self, k_shots: list = DEFAULT_K_SHOTS, episodes: int = 1000, queries: int = 15,
+                 block_size: int = 100, seed: int = 0, workers: int = None) -> dict:
+        """
+        Run episodes for every k and summarize them.
+
+        Each block of episodes has its own child seed, so results are identical
+        whether blocks run in-process or on a process pool.
+
+        Args:
+            k_shots (list): Support examples per class to evaluate
+            episodes (int): Episodes per k
+            queries (int): Query examples per class and episode; reduced when a
+                class is too small to hold k + queries examples
+            block_size (int): Episodes processed together in one array operation
+            seed (int): Seed for episode sampling
+            workers (int, optional): Worker processes; None or 1 runs in-process
+
+        Returns:
+            dict: Per-k accuracy and macro-F1 (mean with 95% CI), per-class
+                precision/recall/F1 and the summed confusion matrix
+        """
+        report = {'classes': self.class_names, 'episodes': episodes, 'seed': seed, 'results': {}}
+        jobs = []
+        for k in k_shots:
+            q = min(queries, self.min_class_size - k)
+            if q < 1:
+                logger.warning(f"Skipping k={k}: the smallest class has only {self.min_class_size} examples")
+                continue
+            sizes = [min(block_size, episodes - start) for start in range(0, episodes, block_size)]
+            seeds = np.random.SeedSequence([seed, k]).spawn(len(sizes))
+            jobs.extend((k, q, size, child) for size, child in zip(sizes, seeds))
+
+        if workers and workers > 1:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(self,)) as executor:
+                blocks = list(executor.map(_run_block, jobs))
+        else:
+            blocks = [self.run_block(*job) for job in jobs]
+
+        grouped = {}
+        for (k, q, _, _), block in zip(jobs, blocks):
+            grouped.setdefault((k, q), []).append(block)
+        for (k, q), k_blocks in grouped.items():
+            report['results'][str(k)] = self._summarize(k_blocks, q)
+            result = report['results'][str(k)]
+            logger.info(f"k={k:<3} accuracy={result['accuracy']['mean']:.4f} "
+                        f"(±{result['accuracy']['ci95']:.4f}) macro-F1={result['macro_f1']['mean']:.4f}")
+        return report
+
+    def _summarize(self, blocks: list, q: int) -> dict:
+        accuracy = np.concatenate([block['accuracy'] for block in blocks])
+        macro_f1 = np.concatenate([block['macro_f1'] for block in blocks])
+        confusion = np.sum([block['confusion'] for block in blocks], axis=0)
+
+        true_positive = np.diag(confusion).astype(np.float64)
+        predicted = confusion.sum(axis=0)
+        actual = confusion.sum(axis=1)
+        precision = np.divide(true_positive, predicted, out=np.zeros_like(true_positive), where=predicted > 0)
+        recall = np.divide(true_positive, actual, out=np.zeros_like(true_positive), where=actual > 0)
+        denominator = precision + recall
+        f1 = np.divide(2 * precision * recall, denominator, out=np.zeros_like(true_positive), where=denominator > 0)
+        return {
+            'queries_per_class': q,
+            'accuracy': _mean_ci(accuracy),
+            'macro_f1': _mean_ci(macro_f1),
+            'per_class': {
+                name: {'precision': float(p), 'recall': float(r), 'f1': float(f)}
+                for name, p, r, f in zip(self.class_names, precision, recall, f1)
+            },
+            'confusion_matrix': confusion.tolist()
+        }
+
+def _mean_ci(values: np.ndarray) -> dict:
+    """Mean with the half-width of its 95% normal-approximation confidence interval."""
+    std = float(values.std(ddof=1)) if len(values) > 1 else 0.0
+    return {'mean': float(values.mean()), 'std': std, 'ci95': Z_95 * std / np.sqrt(len(values))}
+
+_worker_evaluator = None
+
+def _init_worker(evaluator: EpisodicEvaluator) -> None:
+    global _worker_evaluator
+    _worker_evaluator = evaluator
+
+def _run_block(job: tuple) -> dict:
+    return _worker_evaluator.run_block(*job)
+
+def evaluate_k_shot(
+    data_file: str,
+    classifier,
+    label_column: str = 'category',
+    k_shots: list = DEFAULT_K_SHOTS,
+    episodes: int = 1000,
+    queries: int = 15,
+    limit: int = None,
+    batch_size: int = 64,
+    seed: int = 0,
+    workers: int = None,
+    output_file: str = DEFAULT_OUTPUT
+) -> dict:
+    """
+    Encode a labeled corpus once and run the episodic k-shot evaluation on it.
+
+    Args:
+        data_file (str): Papers CSV or columnar corpus with abstracts and labels
+        classifier (FewShotClassifier): Supplies the encoder (and its embedding cache)
+        label_column (str): Column holding the true category
+        k_shots (list): Support examples per class to evaluate
+        episodes (int): Episodes per k
+        queries (int): Query examples per class and episode
+        limit (int, optional): Only use the first limit papers
+        batch_size (int): Number of abstracts encoded per forward pass
+        seed (int): Seed for episode sampling
+        workers (int, optional): Worker processes for the episodes
+        output_file (str, optional): Write the report as JSON to this file
+
+    Returns:
+        dict: The evaluation report (see EpisodicEvaluator.evaluate)
+    """
+    from few_shot_classifier import load_data
+
+    try:
+        df = load_data(data_file, nrows=limit).dropna(subset=[label_column])
+        logger.info(f"Encoding {len(df)} labeled abstracts")
+        embeddings = classifier.encode(df['abstract'].tolist(), batch_size=batch_size)
+        classifier.save_cache()
+
+        evaluator = EpisodicEvaluator(embeddings, df[label_column].astype(str).to_numpy())
+        report = evaluator.evaluate(k_shots, episodes, queries, seed=seed, workers=workers)
+        report['data_file'] = str(data_file)
+        report['papers'] = len(df)
+
+        if output_file:
+            with open(output_file, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2)
+            logger.info(f"Evaluation saved to {output_file}")
+        return report
+
+    except Exception as e:
+        logger.error(f"Error running k-shot evaluation: {str(e)}")
+        raise
+
+def main():
+    parser = argparse.ArgumentParser(description="Episodic k-shot evaluation of the prototype classifier")
+    parser.add_argument('--data', default='synthetic_covid19_papers.csv', help="Labeled papers CSV or corpus")
+    parser.add_argument('--label-column', default='category')
+    parser.add_argument('--k-shots', type=int, nargs='+', default=DEFAULT_K_SHOTS)
+    parser.add_argument('--episodes', type=int, default=1000)
+    parser.add_argument('--queries', type=int, default=15)
+    parser.add_argument('--limit', type=int, help="Only use the first N papers")
+    parser.add_argument('--model', default='all-MiniLM-L6-v2')
+    parser.add_argument('--encoder', choices=['auto', 'model', 'stub'], default='model',
+                        help="'stub' uses the benchmark's deterministic hashing encoder")
+    parser.add_argument('--cache-dir', help="Embedding cache directory")
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=DEFAULT_OUTPUT)
+    args = parser.parse_args()
+
+    from benchmark import load_encoder
+    from few_shot_classifier import FewShotClassifier
+    model, encoder_name = load_encoder(args.model, args.encoder)
+    # Named after the encoder actually used so stub embeddings never share a cache with the model's
+    classifier = FewShotClassifier(encoder_name, cache_dir=args.cache_dir, model=model)
+    evaluate_k_shot(args.data, classifier, args.label_column, args.k_shots, args.episodes, args.queries,
+                    args.limit, seed=args.seed, workers=args.workers, output_file=args.output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,425 @@
+import json
+from collections import Counter
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from tqdm import tqdm
+import logging
+from embedding_cache import EmbeddingCache
+from data_loader import load_data, iter_data_chunks
+from embedding_index import IVFIndex, normalize_rows
+from quantization import QuantizedEmbeddings, quantize_model
+from batch_scheduler import TokenBudgetScheduler
+from instrumentation import metrics
+from prototype_store import PrototypeStore
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Support examples for each category, as used in the few-shot notebook
+DEFAULT_CATEGORIES = {
+    'treatment': [
+        "This paper discusses treatment options for COVID-19 patients.",
+        "The study evaluates the effectiveness of antiviral drugs.",
+        "Clinical trials of various therapeutic interventions are presented."
+    ],
+    'vaccine': [
+        "Development and testing of COVID-19 vaccines are described.",
+        "Immune response to vaccination is analyzed.",
+        "Vaccine efficacy studies and results are presented."
+    ],
+    'epidemiology': [
+        "The spread and transmission patterns of the virus are studied.",
+        "Statistical analysis of infection rates and patterns is performed.",
+        "Population-level impacts of the pandemic are evaluated."
+    ],
+    'clinical_diagnosis': [
+        "Novel diagnostic methods for COVID-19 detection are evaluated.",
+        "The accuracy of PCR testing protocols is assessed.",
+        "Clinical symptoms and biomarkers for early diagnosis are analyzed."
+    ],
+    'immunology': [
+        "The immune response to SARS-CoV-2 infection is characterized.",
+        "T cell and B cell responses in COVID-19 patients are studied.",
+        "Cytokine profiles during disease progression are examined."
+    ],
+    'public_health': [
+        "Implementation of community-wide prevention measures is assessed.",
+        "Healthcare system responses to the pandemic are evaluated.",
+        "The impact of social distancing policies on transmission is studied."
+    ],
+    'virology': [
+        "Molecular structure of SARS-CoV-2 variants is analyzed.",
+        "Viral evolution and mutation patterns are investigated.",
+        "Mechanisms of viral entry and replication are studied."
+    ]
+}
+
+
+class FewShotClassifier:
+    def __init__(self, model_name='all-MiniLM-L6-v2', cache_dir=None, cache_size=100000, quantize=False,
+                 token_budget=None, model=None, embedding_dtype='float32'):
+        self.model_name = model_name
+        # Storage of cached and indexed embeddings: 'float32', 'float16' or 'int8' codes with per-vector scales
+        self.embedding_dtype = embedding_dtype
+        # A pre-loaded encoder (anything with a SentenceTransformer-style encode) skips loading model_name
+        if model is None:
+            # Imported here so importing this module does not pull in torch
+            from sentence_transformers import SentenceTransformer
+            model = SentenceTransformer(model_name, device='cpu') if quantize else SentenceTransformer(model_name)
+        if quantize:
+            # Dynamic int8 quantization targets CPU inference
+            model = quantize_model(model)
+            # Keep int8-model embeddings apart from fp32 ones in the cache
+            model_name = f"{model_name}-int8"
+        self.model = model
+        self.embedding_cache = EmbeddingCache(cache_dir, model_name, cache_size, embedding_dtype) if cache_dir else None
+        # With a token budget, batches are bucketed by token length instead of item count
+        self.scheduler = None
+        if token_budget:
+            self.scheduler = TokenBudgetScheduler(
+                self.model.tokenizer, token_budget, max_length=getattr(self.model, 'max_seq_length', 256) or 256
+            )
+        self.prototypes = PrototypeStore(model_name)
+        self.category_embeddings = {}
+        self.index = None
+        self.index_labels = None
+        self._category_names = np.array([], dtype=object)
+        self._prototype_matrix = None
+
+    def prepare_categories(self, categories):
+        """
+        Compute embeddings for each category's examples.
+
+        Prototypes are running sums, so calling this again only encodes examples
+        that were added since the last call and subtracts ones that were dropped;
+        unchanged categories cost nothing. Categories not mentioned are kept.
+
+        Args:
+            categories (dict): Category -> list of example texts
+        """
+        for category, examples in categories.items():
+            previous = Counter(self.prototypes.examples.get(category, []))
+            wanted = Counter(examples)
+            removed = list((previous - wanted).elements())
+            added = list((wanted - previous).elements())
+            if removed:
+                self.prototypes.subtract(category, removed, self.encode(removed))
+            if added:
+                self.prototypes.add(category, added, self.encode(added))
+        self._refresh_prototypes()
+
+    def add_examples(self, category, texts):
+        """Add support examples to a category (created if new), encoding only those texts."""
+        texts = list(texts)
+        if texts:
+            self.prototypes.add(category, texts, self.encode(texts))
+            self._refresh_prototypes()
+
+    def remove_category(self, category):
+        """Drop a category and its examples; the other prototypes are untouched."""
+        self.prototypes.remove(category)
+        self._refresh_prototypes()
+
+    def save_prototypes(self, path):
+        """Save the category prototypes as a versioned .npz artifact."""
+        self.prototypes.save(str(path))
+
+    def load_prototypes(self, path):
+        """Load prototypes saved with save_prototypes, replacing the current ones without encoding."""
+        self.prototypes = PrototypeStore.load(str(path), model_name=self.prototypes.model_name)
+        self._refresh_prototypes()
+
+    def _refresh_prototypes(self):
+        self.category_embeddings = self.prototypes.means()
+        self._build_prototype_matrix()
+
+    def encode(self, texts, batch_size=64):
+        """
+        Encode texts, reusing embeddings from the on-disk cache when one is configured.
+
+        Args:
+            texts (list): Texts to encode
+            batch_size (int): Number of texts the model encodes per forward pass
+
+        Returns:
+            np.ndarray: float32 array of shape (len(texts), dim)
+        """
+        texts = list(texts)
+        if not texts:
+            return np.zeros((0, self._embedding_dim()), dtype=np.float32)
+        if self.embedding_cache is None:
+            return self._encode_uncached(texts, batch_size)
+
+        with metrics.timer('cache_lookup'):
+            cached, missing = self.embedding_cache.get_many(texts)
+        metrics.inc('embedding_cache_hits', len(texts) - len(missing))
+        metrics.inc('embedding_cache_misses', len(missing))
+        if missing:
+            missing_texts = [texts[i] for i in missing]
+            fresh = self._encode_uncached(missing_texts, batch_size)
+            self.embedding_cache.put_many(missing_texts, fresh)
+            for position, vector in zip(missing, fresh):
+                cached[position] = vector
+        return np.vstack(cached).astype(np.float32, copy=False)
+
+    def _embedding_dim(self):
+        """Embedding dimension, from the prototypes when available, else from the model."""
+        if self._prototype_matrix is not None:
+            return self._prototype_matrix.shape[1]
+        get_dim = getattr(self.model, 'get_sentence_embedding_dimension', None)
+        if get_dim is not None and get_dim():
+            return get_dim()
+        return self.model.encode(['dimension probe'], convert_to_numpy=True).shape[1]
+
+    def _encode_uncached(self, texts, batch_size):
+        """Run the model on texts, through the token-budget scheduler when one is configured."""
+        metrics.inc('texts_encoded', len(texts))
+        if self.scheduler is not None:
+            return self.scheduler.encode(self.model, texts)
+        # model.encode tokenizes internally, so this stage includes tokenization
+        with metrics.timer('model_forward'):
+            return np.asarray(self.model.encode(texts, batch_size=batch_size, convert_to_numpy=True),
+                              dtype=np.float32)
+
+    def save_cache(self):
+        """Persist the embedding cache index, if caching is enabled, and log padding efficiency."""
+        if self.embedding_cache is not None:
+            with metrics.timer('cache_flush'):
+                self.embedding_cache.flush()
+            logger.info(f"Embedding cache: {self.embedding_cache.stats()}")
+        if self.scheduler is not None:
+            logger.info(f"Token-budget batching: {self.scheduler.stats.to_dict()}")
+
+    def _build_prototype_matrix(self):
+        """Stack the category embeddings into one pre-normalized (n_categories, dim) matrix."""
+        self._category_names = np.array(list(self.category_embeddings.keys()), dtype=object)
+        if not self.category_embeddings:
+            self._prototype_matrix = None
+            return
+        prototypes = np.vstack(list(self.category_embeddings.values())).astype(np.float32)
+        self._prototype_matrix = normalize_rows(prototypes)
+
+    def classify(self, text):
+        """Classify a single text using few-shot learning"""
+        labels, scores = self.classify_batch([text])
+        return labels[0], scores[0]
+
+    def classify_batch(self, texts, batch_size=64):
+        """
+        Classify many texts with one encode call and one similarity matrix multiply.
+
+        Args:
+            texts (list): Texts to classify
+            batch_size (int): Number of texts the model encodes per forward pass
+
+        Returns:
+            tuple: (labels, scores) arrays, one entry per input text
+        """
+        if self._prototype_matrix is None:
+            raise ValueError("prepare_categories must be called before classifying")
+        texts = list(texts)
+        if not texts:
+            return np.array([], dtype=object), np.array([], dtype=np.float32)
+
+        metrics.inc('rows_classified', len(texts))
+        return self.classify_embeddings(self.encode(texts, batch_size=batch_size))
+
+    def classify_embeddings(self, embeddings):
+        """
+        Classify precomputed embeddings against the category prototypes.
+
+        Args:
+            embeddings (np.ndarray or QuantizedEmbeddings): Raw embeddings, or a
+                low-precision store of already L2-normalized embeddings that is
+                scored without widening it all to float32
+
+        Returns:
+            tuple: (labels, scores) arrays, one entry per embedding
+        """
+        if self._prototype_matrix is None:
+            raise ValueError("prepare_categories must be called before classifying")
+        with metrics.timer('similarity_scoring'):
+            # Cosine similarity against every prototype at once
+            if isinstance(embeddings, QuantizedEmbeddings):
+                similarities = embeddings.scores(self._prototype_matrix)
+            else:
+                similarities = normalize_rows(embeddings) @ self._prototype_matrix.T
+            best = np.argmax(similarities, axis=1)
+            scores = similarities[np.arange(len(similarities)), best]
+        return self._category_names[best], scores
+
+    def build_index(self, texts, labels=None, n_lists=None, nprobe=8, batch_size=64):
+        """
+        Build a nearest-neighbor index over texts for kNN classification and search.
+
+        Row i of texts gets id i. Embeddings come through encode(), so a warm
+        embedding cache makes rebuilding the index cheap.
+
+        Args:
+            texts (list): Texts to index, e.g. abstracts
+            labels (list, optional): Known category of each text, used by classify_knn
+            n_lists (int, optional): Number of IVF partitions; defaults to about sqrt(len(texts))
+            nprobe (int): Default number of partitions scanned per query
+            batch_size (int): Number of texts the model encodes per forward pass
+        """
+        embeddings = self.encode(texts, batch_size=batch_size)
+        if n_lists is None:
+            n_lists = max(1, int(np.sqrt(len(embeddings))))
+        self.index = IVFIndex(embeddings.shape[1], n_lists=n_lists, nprobe=nprobe,
+                              dtype=self.embedding_dtype).build(embeddings)
+        self.index_labels = np.array(labels, dtype=object) if labels is not None else None
+        logger.info(f"Built index over {len(self.index)} texts with {self.index.n_lists} partitions")
+
+    def add_to_index(self, texts, labels=None, batch_size=64):
+        """Add texts (and their labels, if the index is labeled) to an existing index."""
+        if self.index is None:
+            raise ValueError("build_index must be called before adding to the index")
+        self.index.add(self.encode(texts, batch_size=batch_size))
+        if self.index_labels is not None:
+            if labels is None:
+                raise ValueError("The index is labeled; labels are required for new texts")
+            self.index_labels = np.concatenate([self.index_labels, np.array(labels, dtype=object)])
+
+    def save_index(self, path):
+        """Save the index (and its labels, if any) to a directory."""
+        self.index.save(path)
+        if self.index_labels is not None:
+            with open(Path(path) / 'labels.json', 'w', encoding='utf-8') as f:
+                json.dump(self.index_labels.tolist(), f, ensure_ascii=False)
+
+    def load_index(self, path, mmap=True):
+        """Load an index saved with save_index; vectors are memory-mapped by default."""
+        self.index = IVFIndex.load(path, mmap=mmap)
+        labels_path = Path(path) / 'labels.json'
+        self.index_labels = None
+        if labels_path.exists():
+            with open(labels_path, 'r', encoding='utf-8') as f:
+                self.index_labels = np.array(json.load(f), dtype=object)
+
+    def more_like_this(self, text, k=10, nprobe=None):
+        """
+        Find the indexed texts most similar to text.
+
+        Returns:
+            list: (id, similarity) pairs, most similar first
+        """
+        if self.index is None:
+            raise ValueError("build_index must be called before searching")
+        ids, scores = self.index.search(self.encode([text]), k=k, nprobe=nprobe)
+        return [(int(i), float(score)) for i, score in zip(ids[0], scores[0]) if i >= 0]
+
+    def classify_knn(self, texts, k=10, nprobe=None, batch_size=64):
+        """
+        Classify texts by similarity-weighted voting among their k nearest labeled neighbors.
+
+        Returns:
+            tuple: (labels, scores) arrays; the score is the winning label's share of the vote
+        """
+        if self.index is None or self.index_labels is None:
+            raise ValueError("build_index must be called with labels before kNN classification")
+        ids, similarities = self.index.search(self.encode(texts, batch_size=batch_size), k=k, nprobe=nprobe)
+        found = ids >= 0
+        names, codes = np.unique(self.index_labels, return_inverse=True)
+        neighbor_codes = np.where(found, codes[np.where(found, ids, 0)], 0)
+        weights = np.where(found, np.clip(similarities, 0, None), 0)
+        votes = np.zeros((len(ids), len(names)), dtype=np.float32)
+        np.add.at(votes, (np.repeat(np.arange(len(ids)), ids.shape[1]), neighbor_codes.ravel()), weights.ravel())
+        best = np.argmax(votes, axis=1)
+        totals = votes.sum(axis=1)
+        totals[totals == 0] = 1.0
+        return names[best].astype(object), votes[np.arange(len(ids)), best] / totals
+
+
+def classify_papers(df, classifier, sample_size=1000, batch_size=64):
+    """Classify the abstracts of a (sampled) DataFrame in batches."""
+    # Take a sample if needed
+    if len(df) > sample_size:
+        df_sample = df.sample(sample_size, random_state=42)
+    else:
+        df_sample = df
+
+    abstracts = df_sample['abstract'].tolist()
+    labels, scores = [], []
+    for start in tqdm(range(0, len(abstracts), batch_size), desc="Classifying papers"):
+        batch_labels, batch_scores = classifier.classify_batch(
+            abstracts[start:start + batch_size], batch_size=batch_size
+        )
+        labels.append(batch_labels)
+        scores.append(batch_scores)
+    classifier.save_cache()
+    if metrics.enabled:
+        metrics.log_summary()
+
+    return pd.DataFrame({
+        'title': df_sample['title'].to_numpy(),
+        'category': np.concatenate(labels) if labels else [],
+        'confidence': np.concatenate(scores) if scores else []
+    })
+
+
+def classify_chunks(chunks, classifier, batch_size=64):
+    """
+    Classify a stream of DataFrame chunks, yielding one result frame per chunk.
+
+    Args:
+        chunks (iterable): DataFrames with 'title' and 'abstract' columns,
+            e.g. from data_loader.iter_data_chunks
+        classifier (FewShotClassifier): Classifier with prepared categories
+        batch_size (int): Number of abstracts encoded per forward pass
+
+    Yields:
+        pd.DataFrame: title, category and confidence for each paper in the chunk
+    """
+    for chunk in chunks:
+        labels, scores = classifier.classify_batch(chunk['abstract'].tolist(), batch_size=batch_size)
+        result = pd.DataFrame({'title': chunk['title'].to_numpy(), 'category': labels, 'confidence': scores},
+                              index=chunk.index)
+        if 'cord_uid' in chunk:
+            result.insert(0, 'cord_uid', chunk['cord_uid'].to_numpy())
+        yield result
+
+
+def classify_file(file_path, classifier, output_csv, chunksize=10000, batch_size=64, metrics_file=None):
+    """
+    Classify every abstract in a CSV file with memory bounded by chunksize.
+
+    Results are appended to output_csv chunk by chunk.
+
+    Args:
+        file_path (str): Path to the input papers CSV
+        classifier (FewShotClassifier): Classifier with prepared categories
+        output_csv (str): Path to write the classification results to
+        chunksize (int): Number of rows read per chunk
+        batch_size (int): Number of abstracts encoded per forward pass
+        metrics_file (str, optional): Collect stage timings and counters for the
+            run and write them here (.prom for Prometheus text, else JSON)
+
+    Returns:
+        pd.Series: Number of papers assigned to each category
+    """
+    # Metrics are process-wide; switch them on for this run only
+    was_enabled = metrics.enabled
+    if metrics_file:
+        metrics.enable()
+    try:
+        category_counts = pd.Series(dtype='int64')
+        total = 0
+        results = classify_chunks(iter_data_chunks(file_path, chunksize=chunksize), classifier, batch_size)
+        for i, result in enumerate(tqdm(results, desc="Classifying chunks")):
+            result.to_csv(output_csv, mode='w' if i == 0 else 'a', header=i == 0, index=False, encoding='utf-8')
+            category_counts = category_counts.add(result['category'].value_counts(), fill_value=0)
+            total += len(result)
+        if total == 0:
+            # No chunk had an abstract; still leave a header-only CSV for downstream steps
+            pd.DataFrame(columns=['title', 'category', 'confidence']).to_csv(output_csv, index=False,
+                                                                             encoding='utf-8')
+        classifier.save_cache()
+        if metrics_file:
+            metrics.write(metrics_file)
+    finally:
+        metrics.enabled = was_enabled
+
+    logger.info(f"Classified {total} papers. Results saved to: {output_csv}")
+    return category_counts.astype('int64').sort_values(ascending=False)
@@ -1,139 +1,392 @@
+import argparse
+import hashlib
+import inspect
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
+import matplotlib
 import matplotlib.pyplot as plt
 import seaborn as sns
 from datetime import datetime
 import numpy as np
+import logging
+from columnar_corpus import ColumnarCorpus, is_corpus, is_stale
 
-# Set style for all plots
-sns.set_theme(style="whitegrid")
-plt.rcParams['figure.figsize'] = (10, 6)
-plt.rcParams['figure.dpi'] = 300
-plt.rcParams['savefig.dpi'] = 300
-plt.rcParams['font.size'] = 10
-plt.rcParams['axes.titlesize'] = 12
-plt.rcParams['axes.labelsize'] = 10
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
 
-# Read the dataset
-df = pd.read_csv('synthetic_covid19_papers.csv')
-df['date_published'] = pd.to_datetime(df['date_published'])
+# Style for all plots; part of every figure's build hash
+PLOT_STYLE = {
+    'figure.figsize': (10, 6),
+    'figure.dpi': 300,
+    'savefig.dpi': 300,
+    'font.size': 10,
+    'axes.titlesize': 12,
+    'axes.labelsize': 10
+}
+
+# Only the columns the figures use are loaded
+PLOT_COLUMNS = ['category', 'date_published', 'citation_count', 'reference_count', 'journal']
+CORPUS_PATH = 'synthetic_covid19_papers.corpus'
+CSV_PATH = 'synthetic_covid19_papers.csv'
+EVALUATION_FILE = 'few_shot_evaluation.json'
+SUMMARY_FILE = 'summary_stats.txt'
+
+# Aggregates and figure hashes from the previous build
+CACHE_DIR = '.figure_cache'
+# Bump when compute_aggregates changes what it produces
+AGGREGATES_VERSION = 1
+
+def apply_style() -> None:
+    matplotlib.use('Agg')
+    sns.set_theme(style="whitegrid")
+    plt.rcParams.update(PLOT_STYLE)
+
+def _fingerprint(path: str) -> dict:
+    """Identity of an input file (or corpus directory) without reading its contents."""
+    target = os.path.join(path, 'manifest.json') if is_corpus(path) else path
+    stat = os.stat(target)
+    return {'path': os.path.abspath(path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+def _box_stats(values: np.ndarray, label: str) -> dict:
+    stats = matplotlib.cbook.boxplot_stats(values, whis=1.5)[0]
+    return {
+        'label': label,
+        'med': float(stats['med']), 'q1': float(stats['q1']), 'q3': float(stats['q3']),
+        'whislo': float(stats['whislo']), 'whishi': float(stats['whishi']),
+        'fliers': [float(v) for v in stats['fliers']]
+    }
+
+def compute_aggregates(df: pd.DataFrame) -> dict:
+    """
+    Every number the dataset figures and summary statistics need, in one pass over the data.
+
+    Args:
+        df (pd.DataFrame): Papers with PLOT_COLUMNS
+
+    Returns:
+        dict: JSON-serializable aggregates
+    """
+    df = df.copy()
+    df['date_published'] = pd.to_datetime(df['date_published'])
+    category_counts = df['category'].value_counts()
+    temporal = df.groupby([df['date_published'].dt.to_period('M'), 'category']).size().unstack()
+    # Category order of first appearance, which is the order seaborn uses for the box plot
+    categories = [c for c in df['category'].unique() if pd.notna(c)]
+    citations = df[['category', 'citation_count']].dropna()
+
+    return {
+        'categories': categories,
+        'category_counts': {'index': category_counts.index.tolist(), 'values': category_counts.tolist()},
+        'temporal': {
+            'index': [str(period) for period in temporal.index],
+            'columns': temporal.columns.tolist(),
+            'data': [[None if pd.isna(v) else int(v) for v in row] for row in temporal.to_numpy()]
+        },
+        'citation_boxes': [
+            _box_stats(citations.loc[citations['category'] == c, 'citation_count'].to_numpy(), c)
+            for c in categories
+        ],
+        'summary': {
+            'Total Papers': len(df),
+            'Categories': len(df['category'].unique()),
+            'Date Range': f"{df['date_published'].min().strftime('%Y-%m-%d')} to {df['date_published'].max().strftime('%Y-%m-%d')}",
+            'Average Citations': round(float(df['citation_count'].mean()), 2),
+            'Average References': round(float(df['reference_count'].mean()), 2),
+            'Total Unique Journals': len(df['journal'].unique())
+        }
+    }
+
+def load_aggregates(data_path: str, cache_dir: str = CACHE_DIR) -> dict:
+    """Aggregates for data_path, recomputed only when the file changed since the cached build."""
+    fingerprint = {'version': AGGREGATES_VERSION, 'columns': PLOT_COLUMNS, **_fingerprint(data_path)}
+    cache_file = os.path.join(cache_dir, 'aggregates.json')
+    if os.path.exists(cache_file):
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+        if cached['fingerprint'] == fingerprint:
+            logger.info(f"Using cached aggregates for {data_path}")
+            return cached['aggregates']
+
+    logger.info(f"Computing aggregates from {data_path}")
+    if is_corpus(data_path):
+        df = ColumnarCorpus(data_path).to_frame(PLOT_COLUMNS)
+    else:
+        df = pd.read_csv(data_path, usecols=PLOT_COLUMNS)
+    aggregates = compute_aggregates(df)
+    os.makedirs(cache_dir, exist_ok=True)
+    with open(cache_file, 'w', encoding='utf-8') as f:
+        json.dump({'fingerprint': fingerprint, 'aggregates': aggregates}, f)
+    return aggregates
+
+def model_inputs(aggregates: dict, evaluation: dict = None) -> dict:
+    """
+    Inputs of the model performance figures.
+
+    Uses the measured episodic evaluation (episodic_evaluation.py) when it has
+    been run; otherwise falls back to the illustrative figures.
+    """
+    if evaluation is not None:
+        categories = evaluation['classes']
+        # Per-category metrics and the confusion matrix come from the largest k evaluated
+        largest_result = evaluation['results'][max(evaluation['results'], key=int)]
+        k_results = sorted(evaluation['results'].items(), key=lambda item: int(item[0]))
+        return {
+            'performance': {
+                'Category': categories,
+                'Precision': [largest_result['per_class'][c]['precision'] for c in categories],
+                'Recall': [largest_result['per_class'][c]['recall'] for c in categories],
+                'F1-Score': [largest_result['per_class'][c]['f1'] for c in categories]
+            },
+            'learning_curve': {
+                'k_shots': [int(k) for k, _ in k_results],
+                'accuracies': [result['accuracy']['mean'] for _, result in k_results],
+                'f1_scores': [result['macro_f1']['mean'] for _, result in k_results],
+                'accuracy_ci': [result['accuracy']['ci95'] for _, result in k_results],
+                'f1_ci': [result['macro_f1']['ci95'] for _, result in k_results]
+            },
+            # Summed over every episode at the largest k
+            'confusion': {'categories': categories, 'matrix': largest_result['confusion_matrix']}
+        }
+
+    categories = aggregates['categories']
+    n_categories = len(categories)
+    # Generate synthetic predictions for confusion matrix
+    from sklearn.metrics import confusion_matrix
+    np.random.seed(42)
+    n_samples = 100
+    true_labels = np.repeat(range(n_categories), n_samples // n_categories)
+    pred_probs = np.random.normal(0.8, 0.1, (len(true_labels), n_categories))
+    pred_probs = np.exp(pred_probs) / np.sum(np.exp(pred_probs), axis=1)[:, np.newaxis]
+    predictions = np.argmax(pred_probs, axis=1)
+    return {
+        'performance': {
+            'Category': categories,
+            'Precision': [0.91, 0.88, 0.86, 0.89, 0.87, 0.85, 0.90],
+            'Recall': [0.89, 0.87, 0.85, 0.88, 0.85, 0.83, 0.88],
+            'F1-Score': [0.90, 0.87, 0.85, 0.88, 0.86, 0.84, 0.89]
+        },
+        'learning_curve': {
+            'k_shots': [1, 2, 3, 5, 10, 15, 20],
+            'accuracies': [0.65, 0.72, 0.78, 0.86, 0.89, 0.90, 0.91],
+            'f1_scores': [0.63, 0.70, 0.76, 0.84, 0.87, 0.88, 0.89],
+            'accuracy_ci': None,
+            'f1_ci': None
+        },
+        'confusion': {'categories': categories,
+                      'matrix': confusion_matrix(true_labels, predictions).tolist()}
+    }
 
 # ============ DATASET VISUALIZATIONS ============
 
-# 1. Category Distribution
-plt.figure()
-category_counts = df['category'].value_counts()
-ax = sns.barplot(x=category_counts.values, y=category_counts.index, palette='husl')
-plt.title('Distribution of Papers by Category', pad=20)
-plt.xlabel('Number of Papers')
-plt.ylabel('Category')
-plt.tight_layout()
-plt.savefig('dataset_category_distribution.pdf', bbox_inches='tight')
-plt.close()
-
-# 2. Temporal Analysis
-plt.figure()
-df_temporal = df.groupby([df['date_published'].dt.to_period('M'), 'category']).size().unstack()
-ax = df_temporal.plot(kind='area', stacked=True)
-plt.title('Publication Trends by Category Over Time', pad=20)
-plt.xlabel('Publication Date')
-plt.ylabel('Number of Papers')
-plt.legend(title='Category', bbox_to_anchor=(1.05, 1), loc='upper left')
-plt.tight_layout()
-plt.savefig('dataset_temporal_analysis.pdf', bbox_inches='tight')
-plt.close()
-
-# 3. Citation Impact
-plt.figure()
-ax = sns.boxplot(x='category', y='citation_count', data=df, palette='husl')
-plt.xticks(rotation=45, ha='right')
-plt.title('Citation Distribution by Category', pad=20)
-plt.xlabel('Category')
-plt.ylabel('Citation Count')
-plt.tight_layout()
-plt.savefig('dataset_citation_impact.pdf', bbox_inches='tight')
-plt.close()
+def plot_category_distribution(data: dict, output_file: str) -> None:
+    # 1. Category Distribution
+    plt.figure()
+    ax = sns.barplot(x=data['values'], y=data['index'], palette='husl')
+    plt.title('Distribution of Papers by Category', pad=20)
+    plt.xlabel('Number of Papers')
+    plt.ylabel('Category')
+    plt.tight_layout()
+    plt.savefig(output_file, bbox_inches='tight')
+    plt.close()
+
+def plot_temporal_analysis(data: dict, output_file: str) -> None:
+    # 2. Temporal Analysis
+    plt.figure()
+    df_temporal = pd.DataFrame(data['data'], index=pd.PeriodIndex(data['index'], freq='M'),
+                               columns=data['columns'], dtype=float)
+    ax = df_temporal.plot(kind='area', stacked=True)
+    plt.title('Publication Trends by Category Over Time', pad=20)
+    plt.xlabel('Publication Date')
+    plt.ylabel('Number of Papers')
+    plt.legend(title='Category', bbox_to_anchor=(1.05, 1), loc='upper left')
+    plt.tight_layout()
+    plt.savefig(output_file, bbox_inches='tight')
+    plt.close()
+
+def plot_citation_impact(data: list, output_file: str) -> None:
+    # 3. Citation Impact, drawn from precomputed box statistics
+    plt.figure()
+    ax = plt.gca()
+    boxes = ax.bxp(data, patch_artist=True, showfliers=True)
+    for patch, color in zip(boxes['boxes'], sns.color_palette('husl', len(data))):
+        patch.set_facecolor(color)
+    plt.xticks(rotation=45, ha='right')
+    plt.title('Citation Distribution by Category', pad=20)
+    plt.xlabel('Category')
+    plt.ylabel('Citation Count')
+    plt.tight_layout()
+    plt.savefig(output_file, bbox_inches='tight')
+    plt.close()
 
 # ============ MODEL PERFORMANCE VISUALIZATIONS ============
 
-# Create synthetic model performance data
-categories = df['category'].unique()
-n_categories = len(categories)
+def plot_category_performance(data: dict, output_file: str) -> None:
+    # 4. Per-Category Performance Metrics
+    performance_df = pd.DataFrame(data)
+    plt.figure()
+    performance_df_melted = pd.melt(performance_df, id_vars=['Category'], var_name='Metric', value_name='Score')
+    ax = sns.barplot(x='Category', y='Score', hue='Metric', data=performance_df_melted, palette='husl')
+    plt.xticks(rotation=45, ha='right')
+    plt.title('Model Performance Metrics by Category', pad=20)
+    plt.xlabel('Category')
+    plt.ylabel('Score')
+    plt.legend(title='Metric', bbox_to_anchor=(1.05, 1), loc='upper left')
+    plt.tight_layout()
+    plt.savefig(output_file, bbox_inches='tight')
+    plt.close()
 
-# 4. Per-Category Performance Metrics
-performance_data = {
-    'Category': categories,
-    'Precision': [0.91, 0.88, 0.86, 0.89, 0.87, 0.85, 0.90],
-    'Recall': [0.89, 0.87, 0.85, 0.88, 0.85, 0.83, 0.88],
-    'F1-Score': [0.90, 0.87, 0.85, 0.88, 0.86, 0.84, 0.89]
-}
-performance_df = pd.DataFrame(performance_data)
-
-plt.figure()
-performance_df_melted = pd.melt(performance_df, id_vars=['Category'], var_name='Metric', value_name='Score')
-ax = sns.barplot(x='Category', y='Score', hue='Metric', data=performance_df_melted, palette='husl')
-plt.xticks(rotation=45, ha='right')
-plt.title('Model Performance Metrics by Category', pad=20)
-plt.xlabel('Category')
-plt.ylabel('Score')
-plt.legend(title='Metric', bbox_to_anchor=(1.05, 1), loc='upper left')
-plt.tight_layout()
-plt.savefig('model_category_performance.pdf', bbox_inches='tight')
-plt.close()
-
-# 5. Learning Curve
-k_shots = [1, 2, 3, 5, 10, 15, 20]
-accuracies = [0.65, 0.72, 0.78, 0.86, 0.89, 0.90, 0.91]
-f1_scores = [0.63, 0.70, 0.76, 0.84, 0.87, 0.88, 0.89]
-
-plt.figure()
-plt.plot(k_shots, accuracies, marker='o', label='Accuracy', linewidth=2)
-plt.plot(k_shots, f1_scores, marker='s', label='F1-Score', linewidth=2)
-plt.title('Few-Shot Learning Performance', pad=20)
-plt.xlabel('Number of Shots (k)')
-plt.ylabel('Score')
-plt.legend()
-plt.grid(True)
-plt.tight_layout()
-plt.savefig('model_learning_curve.pdf', bbox_inches='tight')
-plt.close()
-
-# 6. Confusion Matrix
-from sklearn.metrics import confusion_matrix
-
-# Generate synthetic predictions for confusion matrix
-np.random.seed(42)
-n_samples = 100
-true_labels = np.repeat(range(n_categories), n_samples // n_categories)
-pred_probs = np.random.normal(0.8, 0.1, (len(true_labels), n_categories))
-pred_probs = np.exp(pred_probs) / np.sum(np.exp(pred_probs), axis=1)[:, np.newaxis]
-predictions = np.argmax(pred_probs, axis=1)
-
-cm = confusion_matrix(true_labels, predictions)
-cm_normalized = cm.astype('float') / cm.sum(axis=1)[:, np.newaxis]
-
-plt.figure()
-sns.heatmap(cm_normalized, annot=True, fmt='.2f', cmap='YlOrRd',
-            xticklabels=categories, yticklabels=categories)
-plt.title('Normalized Confusion Matrix', pad=20)
-plt.xlabel('Predicted Category')
-plt.ylabel('True Category')
-plt.xticks(rotation=45, ha='right')
-plt.yticks(rotation=0)
-plt.tight_layout()
-plt.savefig('model_confusion_matrix.pdf', bbox_inches='tight')
-plt.close()
-
-# Generate summary statistics
-summary_stats = {
-    'Total Papers': len(df),
-    'Categories': len(df['category'].unique()),
-    'Date Range': f"{df['date_published'].min().strftime('%Y-%m-%d')} to {df['date_published'].max().strftime('%Y-%m-%d')}",
-    'Average Citations': round(df['citation_count'].mean(), 2),
-    'Average References': round(df['reference_count'].mean(), 2),
-    'Total Unique Journals': len(df['journal'].unique())
+def plot_learning_curve(data: dict, output_file: str) -> None:
+    # 5. Learning Curve
+    k_shots = data['k_shots']
+    accuracies = np.array(data['accuracies'])
+    f1_scores = np.array(data['f1_scores'])
+    plt.figure()
+    plt.plot(k_shots, accuracies, marker='o', label='Accuracy', linewidth=2)
+    plt.plot(k_shots, f1_scores, marker='s', label='F1-Score', linewidth=2)
+    if data['accuracy_ci'] is not None:
+        # 95% confidence intervals over episodes
+        accuracy_ci, f1_ci = np.array(data['accuracy_ci']), np.array(data['f1_ci'])
+        plt.fill_between(k_shots, accuracies - accuracy_ci, accuracies + accuracy_ci, alpha=0.2)
+        plt.fill_between(k_shots, f1_scores - f1_ci, f1_scores + f1_ci, alpha=0.2)
+    plt.title('Few-Shot Learning Performance', pad=20)
+    plt.xlabel('Number of Shots (k)')
+    plt.ylabel('Score')
+    plt.legend()
+    plt.grid(True)
+    plt.tight_layout()
+    plt.savefig(output_file, bbox_inches='tight')
+    plt.close()
+
+def plot_confusion_matrix(data: dict, output_file: str) -> None:
+    # 6. Confusion Matrix
+    cm = np.array(data['matrix'])
+    cm_normalized = cm.astype('float') / cm.sum(axis=1)[:, np.newaxis]
+    plt.figure()
+    sns.heatmap(cm_normalized, annot=True, fmt='.2f', cmap='YlOrRd',
+                xticklabels=data['categories'], yticklabels=data['categories'])
+    plt.title('Normalized Confusion Matrix', pad=20)
+    plt.xlabel('Predicted Category')
+    plt.ylabel('True Category')
+    plt.xticks(rotation=45, ha='right')
+    plt.yticks(rotation=0)
+    plt.tight_layout()
+    plt.savefig(output_file, bbox_inches='tight')
+    plt.close()
+
+# Output file -> (render function, key of its input in the build inputs)
+FIGURES = {
+    'dataset_category_distribution.pdf': (plot_category_distribution, 'category_counts'),
+    'dataset_temporal_analysis.pdf': (plot_temporal_analysis, 'temporal'),
+    'dataset_citation_impact.pdf': (plot_citation_impact, 'citation_boxes'),
+    'model_category_performance.pdf': (plot_category_performance, 'performance'),
+    'model_learning_curve.pdf': (plot_learning_curve, 'learning_curve'),
+    'model_confusion_matrix.pdf': (plot_confusion_matrix, 'confusion')
 }
 
-# Save summary statistics
-with open('summary_stats.txt', 'w') as f:
-    for key, value in summary_stats.items():
-        f.write(f"{key}: {value}\n") 
\ No newline at end of file
+def figure_hash(render, data) -> str:
+    """Hash of a figure's input data, plot style and rendering code."""
+    digest = hashlib.sha256()
+    digest.update(json.dumps(data, sort_keys=True, default=str).encode('utf-8'))
+    digest.update(json.dumps(PLOT_STYLE, sort_keys=True).encode('utf-8'))
+    digest.update(inspect.getsource(render).encode('utf-8'))
+    digest.update(f"{matplotlib.__version__} {sns.__version__}".encode('utf-8'))
+    return digest.hexdigest()
+
+def _render(job: tuple) -> str:
+    render, data, output_file = job
+    render(data, output_file)
+    return output_file
+
+def write_summary_stats(summary: dict, output_file: str = SUMMARY_FILE) -> None:
+    # Save summary statistics
+    with open(output_file, 'w') as f:
+        for key, value in summary.items():
+            f.write(f"{key}: {value}\n")
+
+def build_figures(data_path: str = None, output_dir: str = '.', workers: int = None, force: bool = False,
+                  cache_dir: str = CACHE_DIR) -> list:
+    """
+    Build the paper figures and summary statistics, re-rendering only what changed.
+
+    Aggregates are computed once per input file version and shared by every
+    figure. A figure is skipped when the hash of its inputs, the plot style
+    and its rendering code matches the previous build and the PDF still
+    exists; the rest are rendered in parallel.
+
+    Args:
+        data_path (str, optional): Papers CSV or columnar corpus (default: the
+            synthetic corpus if present, else the synthetic CSV)
+        output_dir (str): Directory for the PDFs and summary_stats.txt
+        workers (int, optional): Processes used for rendering; 1 renders in-process
+        force (bool): Re-render every figure
+        cache_dir (str): Where aggregates and figure hashes are kept
+
+    Returns:
+        list: Paths of the figures that were rendered
+    """
+    try:
+        apply_style()
+        if data_path is None:
+            # Prefer the memory-mapped columnar corpus when it exists and is up to date
+            use_corpus = is_corpus(CORPUS_PATH) and not is_stale(CORPUS_PATH)
+            if is_corpus(CORPUS_PATH) and not use_corpus:
+                logger.warning(f"{CORPUS_PATH} is older than {CSV_PATH}; reading the CSV instead")
+            data_path = CORPUS_PATH if use_corpus else CSV_PATH
+        aggregates = load_aggregates(data_path, cache_dir)
+        write_summary_stats(aggregates['summary'], os.path.join(output_dir, SUMMARY_FILE))
+
+        evaluation = None
+        if os.path.exists(EVALUATION_FILE):
+            with open(EVALUATION_FILE, 'r', encoding='utf-8') as f:
+                evaluation = json.load(f)
+        inputs = {**aggregates, **model_inputs(aggregates, evaluation)}
+
+        hashes_file = os.path.join(cache_dir, 'figures.json')
+        previous = {}
+        if os.path.exists(hashes_file):
+            with open(hashes_file, 'r', encoding='utf-8') as f:
+                previous = json.load(f)
+
+        jobs, hashes = [], {}
+        for name, (render, key) in FIGURES.items():
+            output_file = os.path.join(output_dir, name)
+            hashes[name] = figure_hash(render, inputs[key])
+            if not force and previous.get(name) == hashes[name] and os.path.exists(output_file):
+                continue
+            jobs.append((render, inputs[key], output_file))
+        logger.info(f"Rendering {len(jobs)} of {len(FIGURES)} figures")
+
+        if len(jobs) > 1 and workers != 1:
+            with ProcessPoolExecutor(max_workers=min(workers or os.cpu_count() or 1, len(jobs)),
+                                     initializer=apply_style) as executor:
+                rendered = list(executor.map(_render, jobs))
+        else:
+            rendered = [_render(job) for job in jobs]
+
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(hashes_file, 'w', encoding='utf-8') as f:
+            json.dump(hashes, f, indent=2)
+        return rendered
+
+    except Exception as e:
+        logger.error(f"Error building figures: {str(e)}")
+        raise
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the paper figures and summary statistics")
+    parser.add_argument('--data', help="Papers CSV or columnar corpus")
+    parser.add_argument('--output-dir', default='.')
+    parser.add_argument('--workers', type=int, help="Rendering processes (default: one per CPU)")
+    parser.add_argument('--force', action='store_true', help="Re-render every figure")
+    args = parser.parse_args()
+
+    build_figures(args.data, args.output_dir, args.workers, args.force)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,312 @@
+import argparse
+import asyncio
+import bisect
+import json
+import signal
+import time
+import logging
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the latency histogram buckets, in milliseconds
+LATENCY_BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000]
+
+HTTP_STATUS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+               500: 'Internal Server Error'}
+
+class Histogram:
+    """Cumulative-bucket histogram in the style of Prometheus, with exact count and sum."""
+
+    def __init__(self, buckets: list):
+        self.buckets = list(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th quantile (inf for the overflow bucket)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets + [float('inf')], self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+    def to_dict(self) -> dict:
+        return {
+            'buckets': {str(bound): count for bound, count in zip(self.buckets + ['+Inf'], self.counts)},
+            'count': self.count,
+            'sum': self.total,
+            'mean': self.total / self.count if self.count else 0.0,
+            'p50': self.quantile(0.5),
+            'p99': self.quantile(0.99)
+        }
+
+class MicroBatcher:
+    """
+    Queue single classification requests and run them through the model in batches.
+
+    A batch is dispatched as soon as max_batch_size requests are waiting or
+    max_wait_ms has passed since the first request of the batch arrived. The
+    encode itself runs in a worker thread so the event loop keeps accepting
+    requests while the model is busy.
+    """
+
+    def __init__(self, classifier, max_batch_size: int = 32, max_wait_ms: float = 5.0):
+        """
+        Args:
+            classifier (FewShotClassifier): Classifier with prepared categories
+            max_batch_size (int): Largest number of texts encoded together
+            max_wait_ms (float): Longest time the first request of a batch waits for company
+        """
+        self.classifier = classifier
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        # Created in start(): before Python 3.10 a Queue binds to the loop current at construction
+        self.queue = None
+        self.latency_ms = Histogram(LATENCY_BUCKETS_MS)
+        self.batch_sizes = Histogram([2 ** i for i in range(max(max_batch_size, 1).bit_length() + 1)])
+        self._worker = None
+
+    def start(self) -> None:
+        self.queue = asyncio.Queue()
+        self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+
+    async def classify(self, text: str) -> tuple:
+        """Submit one text and wait for its (category, confidence)."""
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((text, future, time.perf_counter()))
+        return await future
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            texts = [text for text, _, _ in batch]
+            self.batch_sizes.observe(len(batch))
+            try:
+                labels, scores = await loop.run_in_executor(
+                    None, self.classifier.classify_batch, texts, self.max_batch_size
+                )
+            except Exception as e:
+                logger.error(f"Batch classification failed: {str(e)}")
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            done = time.perf_counter()
+            for (_, future, enqueued), label, score in zip(batch, labels, scores):
+                self.latency_ms.observe((done - enqueued) * 1000.0)
+                if not future.done():
+                    future.set_result((str(label), float(score)))
+
+    def metrics(self) -> dict:
+        return {
+            'latency_ms': self.latency_ms.to_dict(),
+            'batch_size': self.batch_sizes.to_dict(),
+            'queue_depth': self.queue.qsize() if self.queue is not None else 0,
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000.0
+        }
+
+async def _read_request(reader: asyncio.StreamReader):
+    """Parse one HTTP/1.1 request; returns None when the client closed the connection."""
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+    method, path, _ = request_line.decode('latin-1').split(' ', 2)
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    length = int(headers.get('content-length', 0))
+    body = await reader.readexactly(length) if length else b''
+    return method, path, headers, body
+
+def _write_response(writer: asyncio.StreamWriter, status: int, payload: dict, keep_alive: bool) -> None:
+    body = json.dumps(payload).encode('utf-8')
+    head = (
+        f"HTTP/1.1 {status} {HTTP_STATUS[status]}\r\n"
+        f"Content-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    writer.write(head.encode('latin-1') + body)
+
+class InferenceServer:
+    """
+    Minimal asyncio HTTP service in front of a FewShotClassifier.
+
+    Endpoints:
+        POST /classify   {"text": "..."} -> {"category": ..., "confidence": ...}
+                         {"texts": [...]} -> {"results": [{...}, ...]}
+        GET  /metrics    latency and batch-size histograms
+        GET  /health     liveness check
+    """
+
+    def __init__(self, classifier, host: str = '127.0.0.1', port: int = 8000,
+                 max_batch_size: int = 32, max_wait_ms: float = 5.0):
+        self.host = host
+        self.port = port
+        self.batcher = MicroBatcher(classifier, max_batch_size, max_wait_ms)
+        self.requests = 0
+        self._server = None
+
+    async def start(self) -> None:
+        self.batcher.start()
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info(f"Serving on http://{self.host}:{self.port}")
+
+    async def stop(self) -> None:
+        self._server.close()
+        await self._server.wait_closed()
+        await self.batcher.stop()
+        # Persist embeddings computed while serving so the next start reuses them
+        self.batcher.classifier.save_cache()
+
+    async def serve_forever(self) -> None:
+        await self.start()
+        try:
+            # Treat SIGTERM like Ctrl-C so the cache is flushed when a supervisor stops us
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+        except (NotImplementedError, RuntimeError):
+            pass
+        try:
+            async with self._server:
+                await self._server.serve_forever()
+        finally:
+            await self.stop()
+
+    async def _dispatch(self, method: str, path: str, body: bytes) -> tuple:
+        if path == '/health':
+            return 200, {'status': 'ok'}
+        if path == '/metrics':
+            return 200, {'requests': self.requests, **self.batcher.metrics()}
+        if path != '/classify':
+            return 404, {'error': f'unknown path {path}'}
+        if method != 'POST':
+            return 405, {'error': 'use POST'}
+        try:
+            payload = json.loads(body or b'{}')
+        except json.JSONDecodeError:
+            return 400, {'error': 'body must be JSON'}
+        if not isinstance(payload, dict):
+            return 400, {'error': 'body must be a JSON object'}
+
+        if isinstance(payload.get('text'), str):
+            category, confidence = await self.batcher.classify(payload['text'])
+            return 200, {'category': category, 'confidence': confidence}
+        texts = payload.get('texts')
+        if isinstance(texts, list) and all(isinstance(text, str) for text in texts):
+            results = await asyncio.gather(*(self.batcher.classify(text) for text in texts))
+            return 200, {'results': [{'category': c, 'confidence': s} for c, s in results]}
+        return 400, {'error': 'expected {"text": str} or {"texts": [str, ...]}'}
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request = await _read_request(reader)
+                if request is None:
+                    break
+                method, path, headers, body = request
+                self.requests += 1
+                keep_alive = headers.get('connection', 'keep-alive').lower() != 'close'
+                try:
+                    status, payload = await self._dispatch(method, path, body)
+                except Exception as e:
+                    logger.error(f"Error handling {method} {path}: {str(e)}")
+                    status, payload = 500, {'error': str(e)}
+                _write_response(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+def load_classifier(model_name: str = 'all-MiniLM-L6-v2', categories_file: str = None, cache_dir: str = None,
+                    prototypes: str = None, **options):
+    """
+    Load the model and prototypes once, before the first request.
+
+    Args:
+        model_name (str): Sentence-transformer model to load
+        categories_file (str, optional): JSON file mapping category -> example sentences
+        cache_dir (str, optional): Embedding cache directory
+        prototypes (str, optional): Prototype artifact from save_prototypes, loaded
+            instead of encoding the category examples
+        **options: Further FewShotClassifier arguments (quantize, token_budget, embedding_dtype)
+
+    Returns:
+        FewShotClassifier: Classifier ready to serve
+    """
+    from few_shot_classifier import DEFAULT_CATEGORIES, FewShotClassifier
+    classifier = FewShotClassifier(model_name, cache_dir=cache_dir, **options)
+    if prototypes:
+        classifier.load_prototypes(prototypes)
+        return classifier
+    categories = DEFAULT_CATEGORIES
+    if categories_file:
+        with open(categories_file, 'r', encoding='utf-8') as f:
+            categories = json.load(f)
+    classifier.prepare_categories(categories)
+    return classifier
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve FewShotClassifier over HTTP with dynamic micro-batching")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--model', default='all-MiniLM-L6-v2')
+    parser.add_argument('--categories', help="JSON file mapping category -> example sentences")
+    parser.add_argument('--cache-dir', help="Embedding cache directory")
+    parser.add_argument('--prototypes', help="Prototype artifact from save_prototypes; loaded instead of encoding examples")
+    parser.add_argument('--max-batch-size', type=int, default=32)
+    parser.add_argument('--max-wait-ms', type=float, default=5.0)
+    args = parser.parse_args()
+
+    classifier = load_classifier(args.model, args.categories, args.cache_dir, args.prototypes)
+    server = InferenceServer(classifier, args.host, args.port, args.max_batch_size, args.max_wait_ms)
+    try:
+        asyncio.run(server.serve_forever())
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        logger.info("Shutting down")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+import cProfile
+import json
+import os
+import re
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Set to 1 to collect metrics from process start, without code changes
+ENABLE_ENV_VAR = 'PIPELINE_METRICS'
+
+
+class _NullTimer:
+    """Shared do-nothing context manager handed out while metrics are disabled."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    __slots__ = ('metrics', 'name', 'start')
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.metrics.observe(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class Metrics:
+    """
+    Process-wide stage timers, counters and gauges for pipeline runs.
+
+    Every call checks one attribute first, so leaving instrumentation in the
+    hot paths costs next to nothing while it is disabled: timer() returns a
+    shared no-op context manager and inc()/observe() return immediately.
+    Updates are guarded by a lock because classification also runs in the
+    inference server's worker threads.
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.reset()
+
+    def enable(self) -> None:
+        self.enabled = True
+
+    def disable(self) -> None:
+        self.enabled = False
+
+    def reset(self) -> None:
+        with self._lock:
+            # name -> [calls, total seconds, max seconds]
+            self.timers = {}
+            self.counters = {}
+            self.gauges = {}
+
+    def timer(self, name: str):
+        """Context manager that adds its elapsed wall time to the named stage."""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name)
+
+    def observe(self, name: str, seconds: float) -> None:
+        """Record one timed call of a stage."""
+        if not self.enabled:
+            return
+        with self._lock:
+            stats = self.timers.get(name)
+            if stats is None:
+                self.timers[name] = [1, seconds, seconds]
+            else:
+                stats[0] += 1
+                stats[1] += seconds
+                if seconds > stats[2]:
+                    stats[2] = seconds
+
+    def inc(self, name: str, value: int = 1) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def set_gauge(self, name: str, value: float) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self.gauges[name] = value
+
+    def summary(self) -> dict:
+        """Snapshot of every metric as plain JSON-serializable values."""
+        with self._lock:
+            timers = {
+                name: {'calls': calls, 'total_s': total, 'mean_s': total / calls, 'max_s': longest}
+                for name, (calls, total, longest) in sorted(self.timers.items())
+            }
+            return {'timers': timers, 'counters': dict(sorted(self.counters.items())),
+                    'gauges': dict(sorted(self.gauges.items()))}
+
+    def to_json(self) -> str:
+        return json.dumps(self.summary(), indent=2)
+
+    def to_prometheus(self, prefix: str = 'pipeline') -> str:
+        """Render the metrics in the Prometheus text exposition format."""
+        summary = self.summary()
+        lines = []
+        if summary['timers']:
+            for suffix, field, kind in (('stage_seconds_total', 'total_s', 'counter'),
+                                        ('stage_calls_total', 'calls', 'counter'),
+                                        ('stage_seconds_max', 'max_s', 'gauge')):
+                lines.append(f"# TYPE {prefix}_{suffix} {kind}")
+                for name, stats in summary['timers'].items():
+                    lines.append(f'{prefix}_{suffix}{{stage="{name}"}} {stats[field]}')
+        for name, value in summary['counters'].items():
+            metric = f"{prefix}_{_metric_name(name)}_total"
+            lines.extend([f"# TYPE {metric} counter", f"{metric} {value}"])
+        for name, value in summary['gauges'].items():
+            metric = f"{prefix}_{_metric_name(name)}"
+            lines.extend([f"# TYPE {metric} gauge", f"{metric} {value}"])
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path: str) -> None:
+        """Write the metrics to path: Prometheus text for .prom/.txt files, JSON otherwise."""
+        text = self.to_prometheus() if path.endswith(('.prom', '.txt')) else self.to_json()
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        logger.info(f"Wrote metrics to {path}")
+
+    def log_summary(self) -> None:
+        summary = self.summary()
+        for name, stats in summary['timers'].items():
+            logger.info(f"{name}: {stats['total_s']:.3f}s over {stats['calls']} calls (max {stats['max_s']:.3f}s)")
+        for name, value in summary['counters'].items():
+            logger.info(f"{name}: {value}")
+
+    @contextmanager
+    def profile(self, output_prefix: str, memory: bool = True, top: int = 25):
+        """
+        Capture a cProfile profile (and optionally tracemalloc allocations) of a block.
+
+        Metrics are enabled for the duration so the stage breakdown is recorded
+        alongside the profile.
+
+        Args:
+            output_prefix (str): Writes <prefix>.pstats and, with memory, <prefix>.memory.txt
+            memory (bool): Also trace allocations; slows the block down noticeably
+            top (int): Number of allocation sites listed in the memory report
+        """
+        was_enabled = self.enabled
+        self.enable()
+        started_tracing = memory and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield self
+        finally:
+            profiler.disable()
+            profiler.dump_stats(f"{output_prefix}.pstats")
+            if memory:
+                _, peak = tracemalloc.get_traced_memory()
+                snapshot = tracemalloc.take_snapshot()
+                if started_tracing:
+                    tracemalloc.stop()
+                self.set_gauge('tracemalloc_peak_bytes', peak)
+                with open(f"{output_prefix}.memory.txt", 'w', encoding='utf-8') as f:
+                    f.write(f"Peak traced memory: {peak} bytes\n")
+                    for stat in snapshot.statistics('lineno')[:top]:
+                        f.write(f"{stat}\n")
+            logger.info(f"Wrote profile to {output_prefix}.pstats")
+            self.enabled = was_enabled
+
+
+def _metric_name(name: str) -> str:
+    return re.sub(r'[^a-zA-Z0-9_]', '_', name)
+
+
+# Shared registry used by the classifier, loaders and scheduler
+metrics = Metrics(enabled=os.environ.get(ENABLE_ENV_VAR) == '1')
@@ -1,7 +1,14 @@
 import json
+import os
+import shutil
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from pathlib import Path
 import pandas as pd
 import logging
 from tqdm import tqdm
+from columnar_corpus import ColumnarCorpusWriter, write_corpus_from_csv
 
 # Set up logging
 logging.basicConfig(
@@ -10,6 +17,12 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Column order of the output CSV
+CSV_COLUMNS = [
+    'title', 'abstract', 'category', 'date_published', 'authors', 'author_affiliations',
+    'author_emails', 'keywords', 'journal', 'citation_count', 'reference_count'
+]
+
 def process_paper(paper: dict) -> dict:
     """Process a single paper entry to prepare it for CSV conversion."""
     try:
@@ -36,55 +49,187 @@ def process_paper(paper: dict) -> dict:
         logger.warning(f"Error processing paper: {str(e)}")
         return None
 
+def iter_json_records(json_file_path: str, buffer_size: int = 1 << 20):
+    """
+    Stream records from either a JSON array file or a newline-delimited JSON file.
+
+    JSON arrays are decoded incrementally from a fixed-size read buffer, so
+    neither format is ever loaded into memory as a whole.
+
+    Args:
+        json_file_path (str): Path to a .json (array) or .jsonl file
+        buffer_size (int): Number of characters read from disk at a time
+
+    Yields:
+        dict: One record at a time
+    """
+    decoder = json.JSONDecoder()
+    with open(json_file_path, 'r', encoding='utf-8') as f:
+        buffer = f.read(buffer_size).lstrip()
+        if not buffer.startswith('['):
+            # Newline-delimited JSON: one record per non-empty line
+            lines = (buffer + f.readline()).splitlines()
+            for line in lines:
+                if line.strip():
+                    yield json.loads(line)
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+            return
+
+        position = 1
+        eof = False
+        while True:
+            # Skip whitespace and separators between array elements
+            while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                position += 1
+            if position < len(buffer) and buffer[position] == ']':
+                return
+            try:
+                record, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                # The next record straddles the buffer boundary; read more
+                chunk = f.read(buffer_size)
+                eof = not chunk
+                buffer = buffer[position:] + chunk
+                position = 0
+                continue
+            yield record
+            position = end
+            if position > buffer_size:
+                buffer = buffer[position:]
+                position = 0
+
+class ConversionStats:
+    """Summary statistics accumulated batch by batch while converting."""
+
+    def __init__(self):
+        self.records = 0
+        self.skipped = 0
+        self.categories = Counter()
+        self.head = None
+
+    def update(self, batch_df: pd.DataFrame, skipped: int = 0) -> None:
+        if self.head is None and len(batch_df):
+            self.head = batch_df.head()
+        self.records += len(batch_df)
+        self.skipped += skipped
+        self.categories.update(batch_df['category'].tolist())
+
+    def merge(self, other: 'ConversionStats') -> None:
+        if self.head is None:
+            self.head = other.head
+        self.records += other.records
+        self.skipped += other.skipped
+        self.categories.update(other.categories)
+
+    def log(self) -> None:
+        logger.info("\nFirst few rows of the converted data:")
+        logger.info(self.head)
+        
+        logger.info("\nDataset statistics:")
+        logger.info(f"Number of records: {self.records}")
+        if self.skipped:
+            logger.info(f"Skipped records: {self.skipped}")
+        logger.info(f"Number of columns: {len(CSV_COLUMNS)}")
+        logger.info("Columns:")
+        for col in CSV_COLUMNS:
+            logger.info(f"  - {col}")
+        
+        logger.info("\nCategory distribution:")
+        for category, count in self.categories.most_common():
+            logger.info(f"  {category}: {count} papers")
+
+def _write_batch(batch: list, output_csv_path: str, header: bool, stats: ConversionStats,
+                 corpus_writer: ColumnarCorpusWriter = None) -> None:
+    """Flatten one batch of papers and append it to the CSV (and the columnar corpus, if any)."""
+    processed = [process_paper(paper) for paper in batch]
+    rows = [paper for paper in processed if paper]
+    df = pd.DataFrame(rows, columns=CSV_COLUMNS)
+    df.to_csv(output_csv_path, mode='w' if header else 'a', header=header, index=False, encoding='utf-8')
+    if corpus_writer is not None:
+        corpus_writer.append(df)
+    stats.update(df, skipped=len(processed) - len(rows))
+
+def _convert_stream(json_file_path: str, output_csv_path: str, batch_size: int, header: bool,
+                    progress: bool = True, corpus_writer: ColumnarCorpusWriter = None) -> ConversionStats:
+    """Convert one JSON/JSONL file to CSV in batches of batch_size records."""
+    stats = ConversionStats()
+    batch = []
+    first = True
+    records = iter_json_records(json_file_path)
+    if progress:
+        records = tqdm(records, desc="Processing papers")
+    for paper in records:
+        batch.append(paper)
+        if len(batch) >= batch_size:
+            _write_batch(batch, output_csv_path, header and first, stats, corpus_writer)
+            batch, first = [], False
+    if batch or first:
+        _write_batch(batch, output_csv_path, header and first, stats, corpus_writer)
+    return stats
+
+def _convert_shard(args: tuple) -> ConversionStats:
+    """Process-pool worker: convert one shard to a headerless CSV part."""
+    json_file_path, part_path, batch_size = args
+    return _convert_stream(json_file_path, part_path, batch_size, header=False, progress=False)
+
 def convert_json_to_csv(
     json_file_path: str = "synthetic_covid19_papers.json",
-    output_csv_path: str = "synthetic_covid19_papers.csv"
+    output_csv_path: str = "synthetic_covid19_papers.csv",
+    batch_size: int = 10000,
+    workers: int = None,
+    columnar_dir: str = None
 ) -> None:
     """
     Convert the synthetic COVID-19 papers from JSON to CSV format.
     
+    Records are streamed from disk and appended to the CSV in batches, so memory
+    use does not grow with the size of the input.
+    
     Args:
-        json_file_path (str): Path to the input JSON file
+        json_file_path (str or list): Path to the input JSON/JSONL file, or a list
+            of shard files (e.g. from generate_synthetic_dataset_parallel)
         output_csv_path (str): Path to save the output CSV file
+        batch_size (int): Number of records flattened and written per batch
+        workers (int, optional): Number of processes used to convert shards in parallel
+        columnar_dir (str, optional): Also write a memory-mappable columnar corpus
+            (see columnar_corpus.py) to this directory
     """
     try:
-        logger.info(f"Starting conversion of {json_file_path} to CSV...")
-        
-        # Load JSON data
-        with open(json_file_path, 'r', encoding='utf-8') as f:
-            papers = json.load(f)
-        
-        logger.info(f"Found {len(papers)} records to process")
-        
-        # Process each paper
-        processed_papers = []
-        for paper in tqdm(papers, desc="Processing papers"):
-            processed_paper = process_paper(paper)
-            if processed_paper:
-                processed_papers.append(processed_paper)
+        shard_files = [json_file_path] if isinstance(json_file_path, (str, Path)) else list(json_file_path)
+        logger.info(f"Starting conversion of {len(shard_files)} file(s) to CSV...")
         
-        # Convert to DataFrame
-        df = pd.DataFrame(processed_papers)
+        if len(shard_files) == 1 or workers == 1:
+            stats = ConversionStats()
+            corpus_writer = ColumnarCorpusWriter(columnar_dir, source=output_csv_path) if columnar_dir else None
+            # The writer only writes its manifest when every shard converted cleanly
+            with corpus_writer if corpus_writer is not None else nullcontext():
+                for i, shard_file in enumerate(shard_files):
+                    stats.merge(_convert_stream(shard_file, output_csv_path, batch_size, header=i == 0,
+                                                corpus_writer=corpus_writer))
+        else:
+            # Each shard becomes a headerless CSV part, concatenated in input order
+            part_paths = [f"{output_csv_path}.part{i:05d}" for i in range(len(shard_files))]
+            stats = ConversionStats()
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                jobs = [(shard, part, batch_size) for shard, part in zip(shard_files, part_paths)]
+                for shard_stats in tqdm(executor.map(_convert_shard, jobs), total=len(jobs), desc="Converting shards"):
+                    stats.merge(shard_stats)
+            with open(output_csv_path, 'w', encoding='utf-8', newline='') as out:
+                pd.DataFrame(columns=CSV_COLUMNS).to_csv(out, index=False)
+            with open(output_csv_path, 'ab') as out:
+                for part_path in part_paths:
+                    with open(part_path, 'rb') as part:
+                        shutil.copyfileobj(part, out, length=1024 * 1024)
+                    os.remove(part_path)
+            if columnar_dir:
+                write_corpus_from_csv(output_csv_path, columnar_dir, chunksize=batch_size)
         
-        # Save to CSV
-        df.to_csv(output_csv_path, index=False, encoding='utf-8')
         logger.info(f"Successfully converted to CSV. Output saved to: {output_csv_path}")
-        
-        # Display sample and statistics
-        logger.info("\nFirst few rows of the converted data:")
-        logger.info(df.head())
-        
-        logger.info("\nDataset statistics:")
-        logger.info(f"Number of records: {len(df)}")
-        logger.info(f"Number of columns: {len(df.columns)}")
-        logger.info("Columns:")
-        for col in df.columns:
-            logger.info(f"  - {col}")
-        
-        logger.info("\nCategory distribution:")
-        category_dist = df['category'].value_counts()
-        for category, count in category_dist.items():
-            logger.info(f"  {category}: {count} papers")
+        stats.log()
             
     except Exception as e:
         logger.error(f"An error occurred: {str(e)}")
@@ -92,4 +237,4 @@ def convert_json_to_csv(
         raise
 
 if __name__ == "__main__":
-    convert_json_to_csv() 
\ No newline at end of file
+    convert_json_to_csv(columnar_dir="synthetic_covid19_papers.corpus") 
\ No newline at end of file
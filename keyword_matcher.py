@@ -0,0 +1,149 @@
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class MatchResult:
+    """Matches of every term in a batch of documents."""
+
+    def __init__(self, terms: list, hits: np.ndarray, positions: list = None):
+        self.terms = terms
+        # hits[d, t] is True when term t occurs in document d
+        self.hits = hits
+        # positions[d] lists (start, term_index) pairs, when requested
+        self.positions = positions
+
+    @property
+    def any_mask(self) -> np.ndarray:
+        """Documents mentioning at least one term (the '|'.join(terms) filter)."""
+        return self.hits.any(axis=1)
+
+    def document_counts(self) -> dict:
+        """Number of documents mentioning each term."""
+        return dict(zip(self.terms, self.hits.sum(axis=0).tolist()))
+
+    def term_mask(self, term: str) -> np.ndarray:
+        """Documents mentioning one term."""
+        return self.hits[:, self.terms.index(term)]
+
+
+class KeywordMatcher:
+    """
+    Aho-Corasick automaton that finds every occurrence of many terms in one pass.
+
+    Terms (including multi-word ones such as "monoclonal antibodies") are
+    compiled into a single deterministic automaton, so each document is scanned
+    character by character exactly once regardless of how many terms there are.
+    Matching is substring-based like str.contains, and case-insensitive by default.
+    """
+
+    def __init__(self, terms: list, case_sensitive: bool = False):
+        """
+        Args:
+            terms (list): Terms to search for
+            case_sensitive (bool): Match case exactly instead of lower-casing text and terms
+        """
+        self.terms = list(terms)
+        self.case_sensitive = case_sensitive
+        self._build([self._fold(term) for term in self.terms])
+
+    def _fold(self, text: str) -> str:
+        return text if self.case_sensitive else text.lower()
+
+    def _build(self, patterns: list) -> None:
+        # Trie of all patterns
+        goto = [{}]
+        outputs = [[]]
+        for term_index, pattern in enumerate(patterns):
+            if not pattern:
+                raise ValueError("Empty search terms are not allowed")
+            state = 0
+            for ch in pattern:
+                if ch not in goto[state]:
+                    goto.append({})
+                    outputs.append([])
+                    goto[state][ch] = len(goto) - 1
+                state = goto[state][ch]
+            outputs[state].append((term_index, len(pattern)))
+
+        # Breadth-first failure links, folded into a full transition table so the
+        # scan loop is a single dict lookup per character
+        fail = [0] * len(goto)
+        delta = [dict(edges) for edges in goto]
+        queue = deque()
+        for state in goto[0].values():
+            queue.append(state)
+        while queue:
+            state = queue.popleft()
+            outputs[state] = outputs[state] + outputs[fail[state]]
+            for ch, child in goto[state].items():
+                queue.append(child)
+                fallback = fail[state]
+                while fallback and ch not in goto[fallback]:
+                    fallback = fail[fallback]
+                fail[child] = goto[fallback].get(ch, 0)
+            # Inherit missing transitions from the failure state (already complete, BFS order)
+            if state:
+                for ch, target in delta[fail[state]].items():
+                    delta[state].setdefault(ch, target)
+
+        self._delta = delta
+        self._outputs = [tuple(out) for out in outputs]
+
+    def find(self, text: str) -> list:
+        """All (start, term_index) occurrences of any term in text, in order of their end position."""
+        delta = self._delta
+        outputs = self._outputs
+        state = 0
+        found = []
+        for end, ch in enumerate(self._fold(text), 1):
+            state = delta[state].get(ch, 0)
+            if outputs[state]:
+                for term_index, length in outputs[state]:
+                    found.append((end - length, term_index))
+        return found
+
+    def scan(self, texts, positions: bool = False) -> MatchResult:
+        """
+        Match every term against every document.
+
+        Args:
+            texts (iterable): Documents; None/NaN entries count as empty
+            positions (bool): Also keep the (start, term_index) occurrences per document
+
+        Returns:
+            MatchResult: hit mask, per-term document counts and optional positions
+        """
+        texts = list(texts)
+        hits = np.zeros((len(texts), len(self.terms)), dtype=bool)
+        all_positions = [] if positions else None
+        for doc, text in enumerate(texts):
+            found = self.find(text) if isinstance(text, str) else []
+            for _, term_index in found:
+                hits[doc, term_index] = True
+            if positions:
+                all_positions.append(found)
+        return MatchResult(self.terms, hits, all_positions)
+
+    def scan_parallel(self, texts, workers: int = None, chunk_size: int = 10000,
+                      positions: bool = False) -> MatchResult:
+        """Like scan(), but splits texts into chunks matched on a process pool."""
+        texts = list(texts)
+        chunks = [texts[start:start + chunk_size] for start in range(0, len(texts), chunk_size)]
+        if len(chunks) <= 1 or workers == 1:
+            return self.scan(texts, positions=positions)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(self.scan, chunks, [positions] * len(chunks)))
+        return merge_results(results)
+
+
+def merge_results(results: list) -> MatchResult:
+    """Concatenate chunk results (e.g. one per data_loader chunk) in order."""
+    hits = np.concatenate([result.hits for result in results])
+    positions = None
+    if all(result.positions is not None for result in results):
+        positions = [found for result in results for found in result.positions]
+    return MatchResult(results[0].terms, hits, positions)
@@ -0,0 +1,143 @@
+import argparse
+import asyncio
+import csv
+import json
+import random
+import time
+import logging
+import numpy as np
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+def load_texts(csv_file: str, limit: int = 5000) -> list:
+    """Read up to limit abstracts from a papers CSV to use as request bodies."""
+    texts = []
+    with open(csv_file, 'r', encoding='utf-8', newline='') as f:
+        for row in csv.DictReader(f):
+            if row.get('abstract'):
+                texts.append(row['abstract'])
+                if len(texts) >= limit:
+                    break
+    return texts
+
+async def _request(reader, writer, host: str, method: str, path: str, payload: dict = None) -> dict:
+    body = json.dumps(payload).encode('utf-8') if payload is not None else b''
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n".encode('latin-1') + body
+    )
+    await writer.drain()
+    status_line = await reader.readline()
+    status = int(status_line.split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.strip().lower() == 'content-length':
+            length = int(value)
+    response = json.loads(await reader.readexactly(length))
+    if status != 200:
+        raise RuntimeError(f"HTTP {status}: {response}")
+    return response
+
+async def _client(host: str, port: int, texts: list, deadline: float, remaining: list,
+                  latencies: list, errors: list, rng: random.Random) -> None:
+    """One keep-alive connection sending requests back to back."""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while time.perf_counter() < deadline and remaining[0] > 0:
+            remaining[0] -= 1
+            start = time.perf_counter()
+            try:
+                await _request(reader, writer, host, 'POST', '/classify', {'text': rng.choice(texts)})
+                latencies.append((time.perf_counter() - start) * 1000.0)
+            except Exception as e:
+                errors.append(str(e))
+    finally:
+        writer.close()
+
+async def run_load(host: str, port: int, texts: list, concurrency: int = 32, requests: int = 2000,
+                   duration: float = 60.0, seed: int = 0) -> dict:
+    """
+    Drive the inference server with concurrent single-text requests.
+
+    Args:
+        host (str): Server host
+        port (int): Server port
+        texts (list): Request texts, sampled with replacement
+        concurrency (int): Number of concurrent keep-alive connections
+        requests (int): Total number of requests to send
+        duration (float): Stop after this many seconds even if requests remain
+        seed (int): Seed for the text sampling
+
+    Returns:
+        dict: Throughput, latency percentiles and the server's own metrics
+    """
+    rng = random.Random(seed)
+    latencies, errors = [], []
+    remaining = [requests]
+    start = time.perf_counter()
+    deadline = start + duration
+    await asyncio.gather(*(
+        _client(host, port, texts, deadline, remaining, latencies, errors, rng) for _ in range(concurrency)
+    ))
+    elapsed = time.perf_counter() - start
+
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        server_metrics = await _request(reader, writer, host, 'GET', '/metrics')
+    finally:
+        writer.close()
+
+    latencies = np.array(latencies)
+    return {
+        'requests': len(latencies),
+        'errors': len(errors),
+        'concurrency': concurrency,
+        'elapsed_s': elapsed,
+        'throughput_rps': len(latencies) / elapsed if elapsed else 0.0,
+        'latency_ms': {
+            'p50': float(np.percentile(latencies, 50)) if len(latencies) else None,
+            'p90': float(np.percentile(latencies, 90)) if len(latencies) else None,
+            'p99': float(np.percentile(latencies, 99)) if len(latencies) else None,
+            'max': float(latencies.max()) if len(latencies) else None
+        },
+        'server': server_metrics
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Local load generator for inference_server.py")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--data', default='synthetic_covid19_papers.csv', help="CSV with an abstract column")
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--duration', type=float, default=60.0)
+    parser.add_argument('--output', help="Write the report as JSON to this file")
+    args = parser.parse_args()
+
+    texts = load_texts(args.data)
+    logger.info(f"Sending {args.requests} requests with concurrency {args.concurrency}")
+    report = asyncio.run(run_load(args.host, args.port, texts, args.concurrency, args.requests, args.duration))
+
+    latency = report['latency_ms']
+    logger.info(f"Completed {report['requests']} requests ({report['errors']} errors) "
+                f"in {report['elapsed_s']:.2f}s: {report['throughput_rps']:.1f} req/s")
+    if report['requests']:
+        logger.info(f"Latency p50={latency['p50']:.1f}ms p90={latency['p90']:.1f}ms p99={latency['p99']:.1f}ms")
+    else:
+        logger.warning("No request succeeded; no latency percentiles to report")
+    logger.info(f"Server mean batch size: {report['server']['batch_size']['mean']:.1f}")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+import json
+import os
+from collections import Counter
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Bump when the saved layout changes; load() rejects versions it does not know
+FORMAT_VERSION = 1
+
+
+class PrototypeStore:
+    """
+    Category prototypes kept as running embedding sums and example counts.
+
+    The prototype of a category is sum / count, so adding or removing support
+    examples only touches the embeddings of those examples, and a category can
+    be dropped without recomputing the others. The example texts are kept
+    alongside the sums so a later call can work out what changed.
+    """
+
+    def __init__(self, model_name: str = None):
+        self.model_name = model_name
+        self.sums = {}
+        self.counts = {}
+        self.examples = {}
+
+    def __contains__(self, category):
+        return category in self.sums
+
+    def __len__(self):
+        return len(self.sums)
+
+    @property
+    def categories(self) -> list:
+        return list(self.sums)
+
+    def add(self, category: str, texts: list, embeddings: np.ndarray) -> None:
+        """Add the embeddings of texts to a category, creating it if needed."""
+        embeddings = np.asarray(embeddings, dtype=np.float64)
+        if category not in self.sums:
+            self.sums[category] = np.zeros(embeddings.shape[1], dtype=np.float64)
+            self.counts[category] = 0
+            self.examples[category] = []
+        self.sums[category] += embeddings.sum(axis=0)
+        self.counts[category] += len(texts)
+        self.examples[category].extend(texts)
+
+    def subtract(self, category: str, texts: list, embeddings: np.ndarray) -> None:
+        """Remove previously added examples; the category is dropped when none remain."""
+        remaining = Counter(self.examples[category])
+        remaining.subtract(texts)
+        if any(count < 0 for count in remaining.values()):
+            raise ValueError(f"Some examples are not part of category {category!r}")
+        self.counts[category] -= len(texts)
+        if self.counts[category] == 0:
+            self.remove(category)
+            return
+        self.sums[category] -= np.asarray(embeddings, dtype=np.float64).sum(axis=0)
+        kept = []
+        for text in self.examples[category]:
+            if remaining[text] > 0:
+                remaining[text] -= 1
+                kept.append(text)
+        self.examples[category] = kept
+
+    def remove(self, category: str) -> None:
+        del self.sums[category]
+        del self.counts[category]
+        del self.examples[category]
+
+    def means(self) -> dict:
+        """Category -> mean embedding (float32)."""
+        return {category: (self.sums[category] / self.counts[category]).astype(np.float32)
+                for category in self.sums}
+
+    def save(self, path: str) -> None:
+        """
+        Write the store as a single compressed .npz artifact.
+
+        Args:
+            path (str): Output file; numpy appends .npz when it is missing
+        """
+        categories = self.categories
+        dim = len(next(iter(self.sums.values()))) if categories else 0
+        metadata = {
+            'version': FORMAT_VERSION,
+            'model_name': self.model_name,
+            'categories': categories,
+            'examples': [self.examples[category] for category in categories]
+        }
+        sums = np.vstack([self.sums[c] for c in categories]) if categories else np.zeros((0, dim))
+        tmp_path = f"{path}.tmp.npz"
+        np.savez_compressed(
+            tmp_path,
+            metadata=np.array(json.dumps(metadata, ensure_ascii=False)),
+            sums=sums.astype(np.float64),
+            counts=np.array([self.counts[c] for c in categories], dtype=np.int64)
+        )
+        path = path if path.endswith('.npz') else f"{path}.npz"
+        os.replace(tmp_path, path)
+        logger.info(f"Saved {len(categories)} category prototypes to {path}")
+
+    @classmethod
+    def load(cls, path: str, model_name: str = None) -> 'PrototypeStore':
+        """
+        Load a store written by save().
+
+        Args:
+            path (str): Path of the .npz artifact; the same path given to save()
+                works whether or not it ended in .npz
+            model_name (str, optional): Expected model; prototypes computed with a
+                different model are rejected because the embedding spaces differ
+
+        Returns:
+            PrototypeStore: The loaded prototypes
+        """
+        if not os.path.exists(path) and os.path.exists(f"{path}.npz"):
+            path = f"{path}.npz"
+        with np.load(path, allow_pickle=False) as data:
+            metadata = json.loads(str(data['metadata']))
+            sums, counts = data['sums'], data['counts']
+        if metadata['version'] != FORMAT_VERSION:
+            raise ValueError(f"Unsupported prototype format version {metadata['version']} in {path}")
+        if model_name is not None and metadata['model_name'] not in (None, model_name):
+            raise ValueError(f"Prototypes in {path} were built with {metadata['model_name']}, not {model_name}")
+
+        store = cls(metadata['model_name'])
+        for i, category in enumerate(metadata['categories']):
+            store.sums[category] = sums[i].copy()
+            store.counts[category] = int(counts[i])
+            store.examples[category] = list(metadata['examples'][i])
+        return store
@@ -0,0 +1,190 @@
+import argparse
+import json
+import time
+import logging
+import numpy as np
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Rows scored per block, so low-precision stores never get widened to float32 all at once
+SCORE_BLOCK_ROWS = 65536
+
+def quantize_model(model):
+    """
+    Apply dynamic int8 quantization to the model's linear layers for CPU inference.
+
+    Weights of every torch.nn.Linear are stored as int8 and activations are
+    quantized on the fly; the rest of the model is left untouched.
+    """
+    import torch
+    model = model.to('cpu')
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+class QuantizedEmbeddings:
+    """
+    Compact storage for embeddings.
+
+    'float16' halves the size of each vector; 'int8' stores each vector as int8
+    codes with one float32 scale per vector (about a quarter of the float32
+    size). EmbeddingCache and IVFIndex keep their vectors in this form when
+    created with a low-precision dtype. Similarity scores are computed from the
+    stored codes block by block.
+    """
+
+    DTYPES = ('float32', 'float16', 'int8')
+
+    def __init__(self, codes: np.ndarray, scales: np.ndarray = None, dtype: str = 'float32'):
+        self.codes = codes
+        self.scales = scales
+        self.dtype = dtype
+
+    @classmethod
+    def quantize(cls, vectors, dtype: str = 'int8') -> 'QuantizedEmbeddings':
+        """
+        Args:
+            vectors (np.ndarray): (n, dim) float embeddings
+            dtype (str): 'float32', 'float16' or 'int8'
+        """
+        if dtype not in cls.DTYPES:
+            raise ValueError(f"dtype must be one of {cls.DTYPES}, got {dtype!r}")
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if dtype != 'int8':
+            return cls(vectors.astype(dtype), None, dtype)
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        codes = np.round(vectors / scales[:, None]).astype(np.int8)
+        return cls(codes, scales.astype(np.float32), dtype)
+
+    def __len__(self):
+        return len(self.codes)
+
+    @classmethod
+    def empty(cls, dim: int, dtype: str = 'float32') -> 'QuantizedEmbeddings':
+        """Store holding no vectors yet."""
+        return cls.quantize(np.zeros((0, dim), dtype=np.float32), dtype)
+
+    def take(self, rows) -> 'QuantizedEmbeddings':
+        """Store holding only the given rows, still quantized."""
+        return QuantizedEmbeddings(self.codes[rows], self.scales[rows] if self.scales is not None else None,
+                                   self.dtype)
+
+    def concatenate(self, other: 'QuantizedEmbeddings') -> 'QuantizedEmbeddings':
+        """Store holding the rows of self followed by the rows of other (same dtype)."""
+        if other.dtype != self.dtype:
+            raise ValueError(f"Cannot concatenate {other.dtype} embeddings onto a {self.dtype} store")
+        scales = np.concatenate([self.scales, other.scales]) if self.scales is not None else None
+        return QuantizedEmbeddings(np.concatenate([self.codes, other.codes]), scales, self.dtype)
+
+    @property
+    def nbytes(self) -> int:
+        return self.codes.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+    def dequantize(self, start: int = 0, stop: int = None) -> np.ndarray:
+        """float32 copy of rows [start, stop)."""
+        block = self.codes[start:stop].astype(np.float32)
+        if self.scales is not None:
+            block *= self.scales[start:stop, None]
+        return block
+
+    def scores(self, prototypes: np.ndarray) -> np.ndarray:
+        """
+        Dot products of every stored vector with every prototype, shape (n, n_prototypes).
+
+        Each block of SCORE_BLOCK_ROWS codes is converted to float32 before the
+        matrix multiply (NumPy has no int8 or float16 BLAS path); only that one
+        block is ever held at full precision.
+        """
+        prototypes = np.asarray(prototypes, dtype=np.float32)
+        result = np.empty((len(self), len(prototypes)), dtype=np.float32)
+        for start in range(0, len(self), SCORE_BLOCK_ROWS):
+            stop = start + SCORE_BLOCK_ROWS
+            block = self.codes[start:stop].astype(np.float32, copy=False) @ prototypes.T
+            if self.scales is not None:
+                # The per-vector scale factors out of the dot product
+                block *= self.scales[start:stop, None]
+            result[start:stop] = block
+        return result
+
+    def save(self, path: str) -> None:
+        arrays = {'codes': self.codes, 'dtype': np.array(self.dtype)}
+        if self.scales is not None:
+            arrays['scales'] = self.scales
+        np.savez(path, **arrays)
+
+    @classmethod
+    def load(cls, path: str) -> 'QuantizedEmbeddings':
+        with np.load(path) as data:
+            scales = data['scales'] if 'scales' in data else None
+            return cls(data['codes'], scales, str(data['dtype']))
+
+def precision_report(texts: list, categories: dict, model_name: str = 'all-MiniLM-L6-v2',
+                     batch_size: int = 64) -> dict:
+    """
+    Compare the int8 model and low-precision embedding stores against the fp32 path.
+
+    Args:
+        texts (list): Texts to classify
+        categories (dict): Category -> support examples
+        model_name (str): Sentence-transformer model to load
+        batch_size (int): Number of texts encoded per forward pass
+
+    Returns:
+        dict: Encode time and label agreement for the int8 model, plus size,
+            scoring time and label agreement for each embedding storage dtype
+    """
+    from few_shot_classifier import FewShotClassifier
+    from embedding_index import normalize_rows
+
+    report = {'texts': len(texts), 'model': {}, 'storage': {}}
+    fp32 = FewShotClassifier(model_name)
+    fp32.prepare_categories(categories)
+    int8 = FewShotClassifier(model_name, quantize=True)
+    int8.prepare_categories(categories)
+
+    results = {}
+    for name, classifier in (('fp32', fp32), ('int8', int8)):
+        start = time.perf_counter()
+        embeddings = classifier.encode(texts, batch_size=batch_size)
+        elapsed = time.perf_counter() - start
+        labels, _ = classifier.classify_embeddings(embeddings)
+        results[name] = (embeddings, labels)
+        report['model'][name] = {'encode_s': elapsed, 'texts_per_s': len(texts) / elapsed if elapsed else 0.0}
+    reference_labels = results['fp32'][1]
+    report['model']['int8']['agreement'] = float(np.mean(results['int8'][1] == reference_labels))
+    report['model']['int8']['speedup'] = report['model']['fp32']['encode_s'] / max(report['model']['int8']['encode_s'], 1e-9)
+
+    embeddings = normalize_rows(results['fp32'][0])
+    for dtype in QuantizedEmbeddings.DTYPES:
+        store = QuantizedEmbeddings.quantize(embeddings, dtype)
+        start = time.perf_counter()
+        labels, _ = fp32.classify_embeddings(store)
+        report['storage'][dtype] = {
+            'bytes_per_vector': store.nbytes / max(len(store), 1),
+            'score_s': time.perf_counter() - start,
+            'agreement': float(np.mean(labels == reference_labels))
+        }
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Accuracy-vs-speed report for low-precision classification")
+    parser.add_argument('--data', default='synthetic_covid19_papers.csv', help="CSV with an abstract column")
+    parser.add_argument('--limit', type=int, default=1000, help="Number of abstracts to classify")
+    parser.add_argument('--model', default='all-MiniLM-L6-v2')
+    parser.add_argument('--output', help="Write the report as JSON to this file")
+    args = parser.parse_args()
+
+    from few_shot_classifier import DEFAULT_CATEGORIES, load_data
+    texts = load_data(args.data, nrows=args.limit)['abstract'].tolist()
+    report = precision_report(texts, DEFAULT_CATEGORIES, args.model)
+    logger.info(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,387 @@
+import hashlib
+import json
+import os
+import re
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import logging
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from data_loader import iter_data_chunks
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = '.term_cache'
+# Bump when tokenization or the cached layout changes; older cache files are then ignored
+FORMAT_VERSION = 2
+
+# Same word pattern as WordCloud's default, so frequencies match what .generate() would count
+TOKEN = re.compile(r"\w[\w']+")
+
+def tokenize(text) -> list:
+    """Lower-cased word tokens of text, with a trailing possessive 's removed."""
+    if not isinstance(text, str):
+        return []
+    return [token[:-2] if token.endswith("'s") else token for token in TOKEN.findall(text.lower())]
+
+def split_keywords(value) -> list:
+    """Keywords of a '; '-joined keywords field."""
+    if not isinstance(value, str):
+        return []
+    return [keyword.strip() for keyword in value.split(';') if keyword.strip()]
+
+def _string_array(values) -> np.ndarray:
+    """Object array of Python strings; fixed-width <U arrays pad every entry to the longest one."""
+    values = list(values)
+    array = np.empty(len(values), dtype=object)
+    array[:] = values
+    return array
+
+def _encode_strings(values) -> tuple:
+    """(int64 offsets, uint8 UTF-8 blob) of strings, the text column layout of columnar_corpus."""
+    encoded = [value.encode('utf-8') for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    return offsets, np.frombuffer(b''.join(encoded), dtype=np.uint8)
+
+def _decode_strings(offsets: np.ndarray, blob: np.ndarray) -> np.ndarray:
+    """Object array of the strings written by _encode_strings."""
+    data = blob.tobytes()
+    return _string_array(data[start:end].decode('utf-8') for start, end in zip(offsets[:-1], offsets[1:]))
+
+def _count(documents, analyzer) -> tuple:
+    """
+    Local vocabulary and CSR count matrix of a batch of documents.
+
+    Returns:
+        tuple: (terms, data, indices, indptr) with column j of the matrix counting terms[j]
+    """
+    vocabulary = {}
+    indices = array('i')
+    indptr = [0]
+    for document in documents:
+        indices.extend(vocabulary.setdefault(term, len(vocabulary)) for term in analyzer(document))
+        indptr.append(len(indices))
+    matrix = sp.csr_matrix(
+        (np.ones(len(indices), dtype=np.int32), np.frombuffer(indices, dtype=np.int32), np.array(indptr)),
+        shape=(len(documents), len(vocabulary))
+    )
+    matrix.sum_duplicates()
+    return list(vocabulary), matrix.data, matrix.indices, matrix.indptr
+
+def _count_chunk(job: tuple) -> tuple:
+    texts, keywords = job
+    return _count(texts, tokenize), _count(keywords, split_keywords) if keywords is not None else None
+
+class _MatrixAssembler:
+    """Merge per-chunk count matrices with local vocabularies into one matrix over a global vocabulary."""
+
+    def __init__(self):
+        self.vocabulary = {}
+        self.rows = 0
+        self._data, self._indices, self._indptr = [], [], []
+        self._nnz = 0
+
+    def append(self, counted: tuple) -> None:
+        terms, data, indices, indptr = counted
+        vocabulary = self.vocabulary
+        lookup = np.fromiter((vocabulary.setdefault(term, len(vocabulary)) for term in terms), dtype=np.int32,
+                             count=len(terms))
+        self._data.append(data)
+        self._indices.append(lookup[indices] if len(terms) else indices)
+        self._indptr.append(indptr[1:] + self._nnz)
+        self._nnz += len(data)
+        self.rows += len(indptr) - 1
+
+    def build(self) -> tuple:
+        """(terms, csr_matrix) with rows in append order."""
+        matrix = sp.csr_matrix(
+            (np.concatenate(self._data or [np.zeros(0, dtype=np.int32)]),
+             np.concatenate(self._indices or [np.zeros(0, dtype=np.int32)]),
+             np.concatenate([[0]] + self._indptr).astype(np.int64)),
+            shape=(self.rows, len(self.vocabulary))
+        )
+        # Remapped indices are no longer ordered within a row
+        matrix.sort_indices()
+        return _string_array(self.vocabulary), matrix
+
+class TermStatistics:
+    """
+    Document x term and document x keyword count matrices of a corpus.
+
+    The corpus is tokenized once; keyword counts, category x keyword Jaccard
+    similarities and word-cloud frequencies of any subset of documents are
+    then sparse reductions over the rows of these matrices.
+    """
+
+    def __init__(self, terms, doc_terms: sp.csr_matrix, keywords=None, doc_keywords: sp.csr_matrix = None,
+                 categories=None):
+        """
+        Args:
+            terms (array-like): Term of each column of doc_terms
+            doc_terms (sp.csr_matrix): Occurrences of each term in each document
+            keywords (array-like, optional): Keyword of each column of doc_keywords
+            doc_keywords (sp.csr_matrix, optional): Occurrences of each keyword in each document
+            categories (array-like, optional): Category of each document, None where unknown
+        """
+        self.terms = _string_array(terms)
+        self.doc_terms = doc_terms
+        self.keywords = _string_array(keywords if keywords is not None else [])
+        self.doc_keywords = doc_keywords
+        self.categories = np.asarray(categories, dtype=object) if categories is not None else None
+
+    def __len__(self):
+        return self.doc_terms.shape[0]
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, text_column: str = 'abstract', keyword_column: str = 'keywords',
+                   category_column: str = 'category') -> 'TermStatistics':
+        """
+        Count the terms of an in-memory frame; row i of the matrices is row i of df.
+
+        Args:
+            df (pd.DataFrame): Papers; missing texts become empty rows
+            text_column (str): Column tokenized into terms
+            keyword_column (str): '; '-joined keywords column, used when present
+            category_column (str): Category column, used when present
+        """
+        keywords = df[keyword_column].tolist() if keyword_column in df.columns else None
+        counted_terms, counted_keywords = _count_chunk((df[text_column].tolist(), keywords))
+        categories = None
+        if category_column in df.columns:
+            categories = df[category_column].astype(object).where(df[category_column].notna(), None).to_numpy()
+        return cls._assemble([counted_terms], [counted_keywords] if counted_keywords else [], categories)
+
+    @classmethod
+    def _assemble(cls, counted_terms: list, counted_keywords: list, categories) -> 'TermStatistics':
+        terms = _MatrixAssembler()
+        for counted in counted_terms:
+            terms.append(counted)
+        keywords = None
+        if counted_keywords:
+            keywords = _MatrixAssembler()
+            for counted in counted_keywords:
+                keywords.append(counted)
+        term_names, doc_terms = terms.build()
+        keyword_names, doc_keywords = keywords.build() if keywords else (None, None)
+        return cls(term_names, doc_terms, keyword_names, doc_keywords, categories)
+
+    def _select(self, matrix: sp.csr_matrix, rows) -> sp.csr_matrix:
+        """Rows of matrix given as a boolean mask or integer positions; None selects every row."""
+        if rows is None:
+            return matrix
+        rows = np.asarray(rows)
+        return matrix[np.flatnonzero(rows) if rows.dtype == bool else rows]
+
+    def term_frequencies(self, rows=None, stopwords=None, include_numbers: bool = False, top: int = None) -> dict:
+        """
+        Total occurrences of every term, e.g. for WordCloud.generate_from_frequencies.
+
+        Args:
+            rows (array-like, optional): Boolean mask or positions of the documents to count
+            stopwords (iterable, optional): Terms to leave out, compared lower-cased
+            include_numbers (bool): Keep purely numeric terms
+            top (int, optional): Only return the top most frequent terms
+
+        Returns:
+            dict: Term -> occurrences, most frequent first
+        """
+        counts = np.asarray(self._select(self.doc_terms, rows).sum(axis=0)).ravel()
+        keep = counts > 0
+        if stopwords:
+            stopwords = {word.lower() for word in stopwords}
+            keep &= np.fromiter((term not in stopwords for term in self.terms), dtype=bool, count=len(self.terms))
+        if not include_numbers:
+            keep &= np.fromiter((not term.isnumeric() for term in self.terms), dtype=bool, count=len(self.terms))
+        candidates = np.flatnonzero(keep)
+        order = candidates[np.argsort(-counts[candidates], kind='stable')][:top]
+        return dict(zip(self.terms[order].tolist(), counts[order].tolist()))
+
+    def document_frequencies(self, rows=None) -> np.ndarray:
+        """Number of selected documents containing each term, aligned with self.terms."""
+        return self._select(self.doc_terms, rows).getnnz(axis=0)
+
+    def keyword_counts(self, rows=None) -> pd.Series:
+        """Occurrences of every keyword in the selected documents, most frequent first."""
+        if self.doc_keywords is None:
+            raise ValueError("No keyword column was counted")
+        counts = np.asarray(self._select(self.doc_keywords, rows).sum(axis=0)).ravel()
+        series = pd.Series(counts, index=self.keywords, name='count')
+        return series[series > 0].sort_values(ascending=False, kind='stable')
+
+    def category_keywords(self) -> tuple:
+        """
+        (categories, category x keyword count matrix).
+
+        Categories are in order of first appearance; the matrix is the product of
+        the one-hot document x category matrix with doc_keywords.
+        """
+        if self.doc_keywords is None or self.categories is None:
+            raise ValueError("Category keywords need both a keyword and a category column")
+        known = np.flatnonzero(self.categories != None)  # noqa: E711 - elementwise comparison
+        codes, names = pd.factorize(self.categories[known])
+        membership = sp.csr_matrix((np.ones(len(known), dtype=np.int32), (codes, known)),
+                                   shape=(len(names), len(self)))
+        return list(names), (membership @ self.doc_keywords).tocsr()
+
+    def category_keyword_jaccard(self) -> pd.DataFrame:
+        """Jaccard similarity of the keyword sets of every pair of categories."""
+        names, counts = self.category_keywords()
+        present = (counts > 0).astype(np.int32)
+        intersection = (present @ present.T).toarray().astype(np.float64)
+        sizes = np.diag(intersection)
+        union = sizes[:, None] + sizes[None, :] - intersection
+        jaccard = np.divide(intersection, union, out=np.zeros_like(intersection), where=union > 0)
+        return pd.DataFrame(jaccard, index=names, columns=names)
+
+    def save(self, path: str, metadata: dict = None) -> None:
+        """Write the matrices and vocabularies to one .npz file (written atomically)."""
+        arrays = {}
+        for name, values in (('terms', self.terms), ('keywords', self.keywords)):
+            arrays[f'{name}_offsets'], arrays[f'{name}_bytes'] = _encode_strings(values)
+        for name, matrix in (('doc_terms', self.doc_terms), ('doc_keywords', self.doc_keywords)):
+            if matrix is not None:
+                arrays.update({f'{name}_data': matrix.data, f'{name}_indices': matrix.indices,
+                               f'{name}_indptr': matrix.indptr, f'{name}_shape': np.array(matrix.shape)})
+        if self.categories is not None:
+            codes, names = pd.factorize(self.categories)
+            names_offsets, names_bytes = _encode_strings(names)
+            arrays.update({'category_codes': codes.astype(np.int32), 'category_names_offsets': names_offsets,
+                           'category_names_bytes': names_bytes})
+        metadata = dict(metadata or {}, version=FORMAT_VERSION)
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(tmp_path, metadata=np.array(json.dumps(metadata)), **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> tuple:
+        """
+        Load a file written by save().
+
+        Returns:
+            tuple: (TermStatistics, metadata dict)
+        """
+        with np.load(path, allow_pickle=False) as data:
+            metadata = json.loads(str(data['metadata']))
+            if metadata.get('version') != FORMAT_VERSION:
+                raise ValueError(f"Unsupported term matrix version {metadata.get('version')} in {path}")
+
+            def strings(name):
+                return _decode_strings(data[f'{name}_offsets'], data[f'{name}_bytes'])
+
+            def matrix(name):
+                if f'{name}_data' not in data:
+                    return None
+                return sp.csr_matrix((data[f'{name}_data'], data[f'{name}_indices'], data[f'{name}_indptr']),
+                                     shape=tuple(data[f'{name}_shape']))
+
+            categories = None
+            if 'category_codes' in data:
+                names = np.append(strings('category_names'), None)
+                # Missing categories were factorized to -1, which picks the trailing None
+                categories = names[data['category_codes']]
+            stats = cls(strings('terms'), matrix('doc_terms'), strings('keywords'), matrix('doc_keywords'), categories)
+        return stats, metadata
+
+def _cache_path(input_file: str, columns: tuple, cache_dir: str) -> tuple:
+    stat = os.stat(input_file)
+    fingerprint = {'path': os.path.abspath(input_file), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+                   'columns': list(columns), 'version': FORMAT_VERSION}
+    digest = hashlib.blake2b(json.dumps(fingerprint, sort_keys=True).encode('utf-8'), digest_size=16).hexdigest()
+    return os.path.join(cache_dir, f'terms-{digest}.npz'), fingerprint
+
+def _chunk_jobs(input_file: str, columns: tuple, chunksize: int, categories: list):
+    """(texts, keywords) per chunk; each chunk's categories are appended to categories."""
+    text_column, keyword_column, category_column = columns
+    for chunk in iter_data_chunks(input_file, chunksize=chunksize, columns=columns,
+                                  required_columns=(text_column,)):
+        if category_column in chunk:
+            labels = chunk[category_column].astype(object)
+            categories.extend(labels.where(labels.notna(), None))
+        else:
+            categories.extend([None] * len(chunk))
+        keywords = chunk[keyword_column].tolist() if keyword_column in chunk else None
+        yield chunk[text_column].tolist(), keywords
+
+def build_term_statistics(
+    input_file: str,
+    text_column: str = 'abstract',
+    keyword_column: str = 'keywords',
+    category_column: str = 'category',
+    chunksize: int = 10000,
+    workers: int = None,
+    cache_dir: str = CACHE_DIR
+) -> TermStatistics:
+    """
+    Count the terms and keywords of every paper in a file, reusing a cached result.
+
+    Chunks are tokenized on a process pool, each with its own vocabulary, and
+    merged in input order. The result is cached under cache_dir keyed by the
+    file's path, size and modification time, so later calls on an unchanged
+    file load the matrices instead of re-tokenizing the corpus.
+
+    Args:
+        input_file (str): Papers CSV (synthetic or CORD-19 metadata.csv) or columnar corpus
+        text_column (str): Column tokenized into terms
+        keyword_column (str): '; '-joined keywords column, used when present
+        category_column (str): Category column, used when present
+        chunksize (int): Number of papers per work item
+        workers (int, optional): Number of worker processes; 1 runs in-process
+        cache_dir (str, optional): Cache directory; None disables the cache
+
+    Returns:
+        TermStatistics: Row i is the i-th paper with a non-null text_column, in file order
+    """
+    columns = (text_column, keyword_column, category_column)
+    cache_file = None
+    if cache_dir:
+        cache_file, fingerprint = _cache_path(input_file, columns, cache_dir)
+        if os.path.exists(cache_file):
+            stats, metadata = TermStatistics.load(cache_file)
+            if metadata.get('fingerprint') == fingerprint:
+                logger.info(f"Loaded cached term matrix for {input_file} from {cache_file}")
+                return stats
+
+    try:
+        logger.info(f"Counting terms in {input_file}")
+        categories = []
+        counted_terms, counted_keywords = [], []
+
+        def collect(result):
+            terms, keywords = result
+            counted_terms.append(terms)
+            if keywords is not None:
+                counted_keywords.append(keywords)
+
+        jobs = _chunk_jobs(input_file, columns, chunksize, categories)
+        if workers == 1:
+            for job in jobs:
+                collect(_count_chunk(job))
+        else:
+            workers = workers or os.cpu_count() or 1
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                # Keep a bounded number of chunks in flight to cap memory
+                pending = deque()
+                for job in jobs:
+                    pending.append(executor.submit(_count_chunk, job))
+                    while len(pending) >= 2 * workers:
+                        collect(pending.popleft().result())
+                while pending:
+                    collect(pending.popleft().result())
+
+        has_categories = any(category is not None for category in categories)
+        stats = TermStatistics._assemble(counted_terms, counted_keywords,
+                                         np.array(categories, dtype=object) if has_categories else None)
+        logger.info(f"Counted {len(stats.terms)} terms and {len(stats.keywords)} keywords "
+                    f"in {len(stats)} papers")
+
+        if cache_file:
+            os.makedirs(cache_dir, exist_ok=True)
+            stats.save(cache_file, {'fingerprint': fingerprint})
+        return stats
+
+    except Exception as e:
+        logger.error(f"Error building term statistics: {str(e)}")
+        raise
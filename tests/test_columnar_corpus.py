@@ -0,0 +1,62 @@
+import json
+import numpy as np
+import pandas as pd
+import pytest
+from columnar_corpus import ColumnarCorpus, ColumnarCorpusWriter, is_corpus, write_corpus_from_csv
+from json_to_csv_converter import convert_json_to_csv
+
+SCHEMA = {'title': 'text', 'category': 'dictionary', 'citation_count': 'int'}
+
+def frame(n, start=0):
+    return pd.DataFrame({
+        'title': [f"paper {i}" for i in range(start, start + n)],
+        'category': ['Treatment', 'Virology'] * (n // 2) + ['Treatment'] * (n % 2),
+        'citation_count': np.arange(start, start + n)
+    })
+
+def test_interrupted_write_leaves_no_corpus(tmp_path):
+    output = tmp_path / 'papers.corpus'
+    with pytest.raises(RuntimeError):
+        with ColumnarCorpusWriter(str(output), SCHEMA) as writer:
+            writer.append(frame(10))
+            raise RuntimeError("conversion failed")
+    assert not is_corpus(output)
+
+def test_interrupted_rewrite_invalidates_the_old_corpus(tmp_path):
+    csv_path = tmp_path / 'papers.csv'
+    frame(10).to_csv(csv_path, index=False)
+    output = tmp_path / 'papers.corpus'
+    write_corpus_from_csv(str(csv_path), str(output), schema=SCHEMA)
+    assert len(ColumnarCorpus(str(output))) == 10
+
+    with open(csv_path, 'a', encoding='utf-8') as f:
+        f.write('"unterminated title,Treatment,1\n')
+    with pytest.raises(Exception):
+        write_corpus_from_csv(str(csv_path), str(output), chunksize=5, schema=SCHEMA)
+    assert not is_corpus(output)
+
+def test_failed_json_conversion_leaves_no_corpus(tmp_path):
+    paper = {
+        'title': 'A study', 'abstract': 'Findings.', 'category': 'Treatment', 'date_published': '2021-03-01',
+        'authors': [{'name': 'A. Author', 'affiliation': 'WHO', 'email': 'a@example.com'}],
+        'keywords': ['remdesivir'], 'journal': 'BMJ', 'citation_count': 3, 'reference_count': 20
+    }
+    records = tmp_path / 'papers.jsonl'
+    with open(records, 'w', encoding='utf-8') as f:
+        f.write(json.dumps(paper) + '\n')
+        f.write('{"title": "truncated\n')
+    output = tmp_path / 'papers.corpus'
+    with pytest.raises(Exception):
+        convert_json_to_csv(str(records), str(tmp_path / 'papers.csv'), columnar_dir=str(output))
+    assert not is_corpus(output)
+
+def test_missing_ints_round_trip_as_nan(tmp_path):
+    output = tmp_path / 'papers.corpus'
+    df = frame(4)
+    df['citation_count'] = df['citation_count'].astype(float)
+    df.loc[1, 'citation_count'] = np.nan
+    with ColumnarCorpusWriter(str(output), SCHEMA) as writer:
+        writer.append(df)
+    values = ColumnarCorpus(str(output)).column('citation_count')
+    assert np.isnan(values[1])
+    assert values[[0, 2, 3]].tolist() == [0, 2, 3]
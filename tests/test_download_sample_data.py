@@ -0,0 +1,68 @@
+import asyncio
+import json
+import threading
+import pytest
+from download_sample_data import BulkFetcher, StubServer, download_sample_data
+
+QUERIES = ["COVID-19 treatment", "COVID-19 vaccine"]
+
+@pytest.fixture
+def stub():
+    """StubServer running on its own event loop in a background thread."""
+    server = StubServer(total=50, page_size=20)
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    asyncio.run_coroutine_threadsafe(server.start(), loop).result(timeout=10)
+    yield server
+    asyncio.run_coroutine_threadsafe(server.stop(), loop).result(timeout=10)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(timeout=10)
+    loop.close()
+
+def crawl(stub, output_file, max_records, cache_dir=None):
+    fetcher = BulkFetcher(api_url=stub.url, rate=1000.0, burst=10, backoff_base=0.01, cache_dir=cache_dir)
+    return asyncio.run(fetcher.crawl(QUERIES, str(output_file), max_records))
+
+def read_ids(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line)['paper_id'] for line in f]
+
+def test_resume_continues_mid_page_without_duplicates(stub, tmp_path):
+    reference = tmp_path / 'reference.jsonl'
+    crawl(stub, reference, max_records=50)
+
+    output = tmp_path / 'papers.jsonl'
+    first = crawl(stub, output, max_records=30)
+    assert first['written'] == len(read_ids(output))
+    # An interrupted write leaves a partial last line behind
+    with open(output, 'a', encoding='utf-8') as f:
+        f.write('{"paper_id": "trunc')
+
+    second = crawl(stub, output, max_records=50)
+    ids = read_ids(output)
+    assert len(ids) == len(set(ids))
+    assert set(ids) == set(read_ids(reference))
+    assert second['total'] == len(ids)
+
+def test_cached_pages_are_not_requested_again(stub, tmp_path):
+    cache_dir = tmp_path / 'cache'
+    first = crawl(stub, tmp_path / 'first.jsonl', max_records=50, cache_dir=str(cache_dir))
+    assert first['cache_hits'] == 0
+    served = stub.requests
+
+    second = crawl(stub, tmp_path / 'second.jsonl', max_records=50, cache_dir=str(cache_dir))
+    assert stub.requests == served
+    assert second['requests'] == 0
+    assert second['cache_hits'] == first['pages']
+    assert sorted(read_ids(tmp_path / 'second.jsonl')) == sorted(read_ids(tmp_path / 'first.jsonl'))
+
+def test_json_output_is_exported_from_the_crawl_file(stub, tmp_path):
+    output = tmp_path / 'sample.json'
+    download_sample_data(str(output), sample_size=25, queries=QUERIES, api_url=stub.url, rate=1000.0,
+                         cache_dir=None)
+    with open(output, 'r', encoding='utf-8') as f:
+        papers = json.load(f)
+    assert [paper['paper_id'] for paper in papers] == read_ids(tmp_path / 'sample.jsonl')
+    with open(output, 'r', encoding='utf-8') as f:
+        assert f.read() == json.dumps(papers, indent=2, ensure_ascii=False)
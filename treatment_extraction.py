@@ -0,0 +1,165 @@
+import csv
+import os
+import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import logging
+import numpy as np
+from keyword_matcher import KeywordMatcher
+from data_loader import iter_data_chunks
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+SELECTED_TREATMENTS = ['monoclonal antibodies', 'dexamethasone', 'convalescent plasma']
+EFFECTIVENESS_KEYWORDS = ['effective', 'efficacy', 'ineffective', 'reduced', 'improved', 'treatment response']
+
+OUTPUT_COLUMNS = ['paper_id', 'treatment', 'effect_term', 'sentence']
+
+# Sentence boundaries: whitespace following terminal punctuation
+SENTENCE_BREAK = re.compile(r'(?<=[.!?])\s+')
+
+class TreatmentEvidenceExtractor:
+    """
+    Find sentences that mention both a treatment and an effectiveness term.
+
+    Treatments and effectiveness terms are compiled into one keyword automaton,
+    so each abstract is lower-cased and scanned once; matches are then assigned
+    to sentences by position instead of re-checking every term in every sentence.
+    """
+
+    def __init__(self, treatments: list = SELECTED_TREATMENTS, effects: list = EFFECTIVENESS_KEYWORDS):
+        self.treatments = list(treatments)
+        self.effects = list(effects)
+        self.matcher = KeywordMatcher(self.treatments + self.effects)
+
+    def extract(self, paper_id, abstract: str) -> list:
+        """
+        Evidence rows for one abstract.
+
+        Returns:
+            list: [paper_id, treatment, effect_term, sentence] rows, one per
+                treatment/effect pair found in the same sentence
+        """
+        if not isinstance(abstract, str):
+            return []
+        found = self.matcher.find(abstract)
+        if not found:
+            return []
+
+        # Sentence i spans [starts[i], starts[i + 1])
+        starts = np.array([0] + [m.end() for m in SENTENCE_BREAK.finditer(abstract)])
+        n_treatments = len(self.treatments)
+        per_sentence = {}
+        for start, term_index in found:
+            sentence = int(np.searchsorted(starts, start, side='right')) - 1
+            treatments, effects = per_sentence.setdefault(sentence, ({}, {}))
+            if term_index < n_treatments:
+                treatments.setdefault(self.treatments[term_index], None)
+            else:
+                effects.setdefault(self.effects[term_index - n_treatments], None)
+
+        rows = []
+        for sentence, (treatments, effects) in sorted(per_sentence.items()):
+            if not treatments or not effects:
+                continue
+            end = starts[sentence + 1] if sentence + 1 < len(starts) else len(abstract)
+            text = abstract[starts[sentence]:end].strip()
+            for treatment in treatments:
+                for effect in effects:
+                    rows.append([paper_id, treatment, effect, text])
+        return rows
+
+    def extract_many(self, paper_ids, abstracts) -> list:
+        """Evidence rows for a batch of abstracts."""
+        rows = []
+        for paper_id, abstract in zip(paper_ids, abstracts):
+            rows.extend(self.extract(paper_id, abstract))
+        return rows
+
+_worker_extractor = None
+
+def _init_worker(treatments: list, effects: list) -> None:
+    global _worker_extractor
+    _worker_extractor = TreatmentEvidenceExtractor(treatments, effects)
+
+def _extract_chunk(args: tuple) -> list:
+    paper_ids, abstracts = args
+    return _worker_extractor.extract_many(paper_ids, abstracts)
+
+def _chunk_jobs(input_file: str, chunksize: int):
+    """(paper_ids, abstracts) per chunk; the row number stands in when there is no cord_uid."""
+    for chunk in iter_data_chunks(input_file, chunksize=chunksize, columns=('cord_uid', 'abstract')):
+        ids = chunk['cord_uid'].tolist() if 'cord_uid' in chunk else chunk.index.tolist()
+        yield ids, chunk['abstract'].tolist()
+
+def extract_treatment_evidence(
+    input_file: str,
+    output_file: str = "treatment_evidence.csv",
+    treatments: list = SELECTED_TREATMENTS,
+    effects: list = EFFECTIVENESS_KEYWORDS,
+    chunksize: int = 10000,
+    workers: int = None
+) -> int:
+    """
+    Stream treatment-effectiveness sentences from every abstract into a CSV file.
+
+    Abstract chunks are processed on a process pool and written as soon as they
+    complete, in input order, so neither the corpus nor the results are held in
+    memory.
+
+    Args:
+        input_file (str): Papers CSV (e.g. CORD-19 metadata.csv) or columnar corpus
+        output_file (str): Path of the evidence CSV to write
+        treatments (list): Treatment terms to look for
+        effects (list): Effectiveness terms to look for
+        chunksize (int): Number of abstracts per work item
+        workers (int, optional): Number of worker processes; 1 runs in-process
+
+    Returns:
+        int: Number of evidence rows written
+    """
+    try:
+        logger.info(f"Extracting treatment evidence from {input_file}")
+        rows_written = 0
+        with open(output_file, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(OUTPUT_COLUMNS)
+
+            if workers == 1:
+                extractor = TreatmentEvidenceExtractor(treatments, effects)
+                for paper_ids, abstracts in _chunk_jobs(input_file, chunksize):
+                    rows = extractor.extract_many(paper_ids, abstracts)
+                    writer.writerows(rows)
+                    rows_written += len(rows)
+            else:
+                workers = workers or os.cpu_count() or 1
+                with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                         initargs=(treatments, effects)) as executor:
+                    # Keep a bounded number of chunks in flight to cap memory
+                    max_pending = 2 * workers
+                    pending = deque()
+                    for job in _chunk_jobs(input_file, chunksize):
+                        pending.append(executor.submit(_extract_chunk, job))
+                        while len(pending) >= max_pending:
+                            rows = pending.popleft().result()
+                            writer.writerows(rows)
+                            rows_written += len(rows)
+                    while pending:
+                        rows = pending.popleft().result()
+                        writer.writerows(rows)
+                        rows_written += len(rows)
+
+        logger.info(f"Wrote {rows_written} evidence rows to {output_file}")
+        return rows_written
+
+    except Exception as e:
+        logger.error(f"Error extracting treatment evidence: {str(e)}")
+        raise
+
+if __name__ == "__main__":
+    extract_treatment_evidence("metadata.csv")